@@ -0,0 +1,75 @@
+import json
+import time
+import uuid
+
+import msgpack
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from app.models.analytics_event import AnalyticsEvent
+
+SOURCE = "benchmark"
+
+
+class Command(BaseCommand):
+    help = "Report events/sec for the per-event endpoint vs. bulk NDJSON/MessagePack ingest at several batch sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=20000, help="Events per bulk run.")
+        parser.add_argument("--single-events", type=int, default=1000, help="Events for the per-event baseline.")
+        parser.add_argument("--batch-sizes", default="1,100,10000")
+        parser.add_argument("--writer", choices=["copy", "bulk_create"], default=None)
+
+    def handle(self, *args, **options):
+        self.client = Client()
+        tenant_id = str(uuid.uuid4())
+        try:
+            baseline = self._single(self._events(tenant_id, options["single_events"]))
+            for size in [int(s) for s in options["batch_sizes"].split(",")]:
+                events = self._events(tenant_id, options["events"])
+                for fmt in ("ndjson", "msgpack"):
+                    self._bulk(events, size, fmt, options["writer"], baseline)
+        finally:
+            deleted, _ = AnalyticsEvent.objects.filter(service_source=SOURCE).delete()
+            self.stdout.write(f"cleaned up {deleted:,} benchmark rows")
+
+    def _events(self, tenant_id, count):
+        now = timezone.now().isoformat()
+        return [
+            {
+                "event_type": "courier_location",
+                "tenant_id": tenant_id,
+                "service_source": SOURCE,
+                "payload": {"courier_id": str(uuid.uuid4()), "lat": 6.45 + i * 1e-6, "lon": 3.38, "timestamp": now},
+            }
+            for i in range(count)
+        ]
+
+    def _single(self, events):
+        started = time.perf_counter()
+        for event in events:
+            response = self.client.post("/api/v1/analytics/events/", event, content_type="application/json")
+            assert response.status_code == 201, response.content
+        rate = len(events) / (time.perf_counter() - started)
+        self.stdout.write(f"{'per-event serializer':<32} {rate:>10,.0f} events/s")
+        return rate
+
+    def _bulk(self, events, size, fmt, writer, baseline):
+        overrides = {"ANALYTICS_BULK_INGEST_WRITER": writer} if writer else {}
+        with override_settings(**overrides):
+            started = time.perf_counter()
+            for i in range(0, len(events), size):
+                batch = events[i : i + size]
+                if fmt == "ndjson":
+                    body = "\n".join(json.dumps(event) for event in batch).encode()
+                    content_type = "application/x-ndjson"
+                else:
+                    body = msgpack.packb(batch)
+                    content_type = "application/msgpack"
+                response = self.client.post("/api/v1/analytics/events/bulk/", body, content_type=content_type)
+                assert response.status_code == 200, response.content
+            rate = len(events) / (time.perf_counter() - started)
+        label = f"bulk {fmt}, batch {size:,}"
+        self.stdout.write(f"{label:<32} {rate:>10,.0f} events/s  ({rate / baseline:.1f}x)")
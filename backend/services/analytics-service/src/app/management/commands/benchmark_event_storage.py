@@ -0,0 +1,154 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.models.analytics_event import AnalyticsEvent
+from app.models.courier_location_event import CourierLocationEvent
+
+SOURCE = "benchmark"
+RAW = AnalyticsEvent._meta.db_table
+TYPED = CourierLocationEvent._meta.db_table
+
+GENERATE_RAW = f"""
+    INSERT INTO {RAW} (id, event_type, tenant_id, service_source, payload, created_at)
+    SELECT gen_random_uuid(), 'courier_location', %(tenant)s, '{SOURCE}',
+           jsonb_build_object(
+               'courier_id', md5(%(tenant)s::text || (g %% %(couriers)s))::uuid::text,
+               'lat', 6.4 + random() * 0.3, 'lon', 3.3 + random() * 0.3, 'timestamp', ts::text
+           ),
+           ts
+    FROM (
+        SELECT g, %(start)s + g * %(step)s * interval '1 microsecond' AS ts
+        FROM generate_series(%(first)s, %(last)s) g
+    ) s
+"""
+
+# Typed rows are extracted from the raw ones, as a backfill of the columnar store would do.
+EXTRACT_TYPED = f"""
+    INSERT INTO {TYPED} (event_id, tenant_id, courier_id, lat, lon, recorded_at, created_at)
+    SELECT id, tenant_id, (payload->>'courier_id')::uuid, (payload->>'lat')::float8,
+           (payload->>'lon')::float8, (payload->>'timestamp')::timestamptz, created_at
+    FROM {RAW}
+    WHERE tenant_id = %(tenant)s AND created_at >= %(from)s AND created_at < %(to)s
+"""
+
+QUERIES = {
+    "one hour, count per courier": (
+        f"""SELECT payload->>'courier_id', count(*) FROM {RAW}
+            WHERE event_type = 'courier_location' AND tenant_id = %(tenant)s
+              AND created_at >= %(from)s AND created_at < %(to)s GROUP BY 1""",
+        f"""SELECT courier_id, count(*) FROM {TYPED}
+            WHERE tenant_id = %(tenant)s AND created_at >= %(from)s AND created_at < %(to)s GROUP BY 1""",
+    ),
+    "all hours, count + avg lat per courier/hour": (
+        f"""SELECT date_trunc('hour', created_at), payload->>'courier_id', count(*),
+                   avg((payload->>'lat')::float8)
+            FROM {RAW} WHERE event_type = 'courier_location' AND tenant_id = %(tenant)s GROUP BY 1, 2""",
+        f"""SELECT date_trunc('hour', created_at), courier_id, count(*), avg(lat)
+            FROM {TYPED} WHERE tenant_id = %(tenant)s GROUP BY 1, 2""",
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = "Compare hourly aggregation over JSON AnalyticsEvent rows vs. the typed courier_location store."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=50_000_000)
+        parser.add_argument("--couriers", type=int, default=5000)
+        parser.add_argument("--hours", type=int, default=24)
+        parser.add_argument("--chunk", type=int, default=1_000_000, help="Rows generated per statement.")
+        parser.add_argument("--skip-orm", action="store_true", help="Skip the row-by-row payload loop.")
+        parser.add_argument("--keep", action="store_true", help="Keep the generated rows.")
+
+    def handle(self, *args, **options):
+        tenant = str(uuid.uuid4())
+        end = timezone.now().replace(minute=0, second=0, microsecond=0)
+        start = end - timedelta(hours=options["hours"])
+        try:
+            sizes_before = self._sizes()
+            self._generate(tenant, start, end, options)
+            sizes_after = self._sizes()
+            for table in (RAW, TYPED):
+                grown = sizes_after[table] - sizes_before[table]
+                self.stdout.write(f"{table:<36} +{grown / 1e9:6.2f} GB ({grown / options['events']:.0f} B/event)")
+
+            hour = {"tenant": tenant, "from": end - timedelta(hours=1), "to": end}
+            for label, (raw_sql, typed_sql) in QUERIES.items():
+                raw_s = self._time(raw_sql, hour)
+                typed_s = self._time(typed_sql, hour)
+                self.stdout.write(
+                    f"{label:<44} json {raw_s:8.2f}s  typed {typed_s:8.2f}s  ({raw_s / typed_s:.1f}x)"
+                )
+            if not options["skip_orm"]:
+                self._orm_loop(tenant, hour)
+        finally:
+            if not options["keep"]:
+                with transaction.atomic():
+                    CourierLocationEvent.objects.filter(tenant_id=tenant).delete()
+                    AnalyticsEvent.objects.filter(tenant_id=tenant, service_source=SOURCE).delete()
+
+    def _generate(self, tenant, start, end, options):
+        n = options["events"]
+        step = int((end - start).total_seconds() * 1_000_000 / n)
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            for first in range(0, n, options["chunk"]):
+                last = min(n, first + options["chunk"]) - 1
+                cursor.execute(
+                    GENERATE_RAW,
+                    {"tenant": tenant, "couriers": options["couriers"], "start": start, "step": step,
+                     "first": first, "last": last},
+                )
+                self.stdout.write(f"  generated {last + 1:,}/{n:,} raw events", ending="\r")
+            self.stdout.write("")
+            for h in range(options["hours"]):
+                cursor.execute(
+                    EXTRACT_TYPED,
+                    {"tenant": tenant, "from": start + timedelta(hours=h), "to": start + timedelta(hours=h + 1)},
+                )
+            cursor.execute(f"ANALYZE {RAW}")
+            cursor.execute(f"ANALYZE {TYPED}")
+        self.stdout.write(f"generated {n:,} events in {time.perf_counter() - started:.0f}s")
+
+    def _sizes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_total_relation_size(%s), pg_total_relation_size(%s)", [RAW, TYPED])
+            raw, typed = cursor.fetchone()
+        return {RAW: raw, TYPED: typed}
+
+    def _time(self, sql, params):
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            return time.perf_counter() - started
+
+    def _orm_loop(self, tenant, hour):
+        """The pre-columnar aggregation: load full rows and read payload["courier_id"] in Python."""
+        started = time.perf_counter()
+        counts = {}
+        events = AnalyticsEvent.objects.filter(
+            event_type="courier_location", tenant_id=tenant, created_at__gte=hour["from"], created_at__lt=hour["to"]
+        )
+        for event in events.iterator(chunk_size=10000):
+            cid = event.payload.get("courier_id")
+            counts[cid] = counts.get(cid, 0) + 1
+        legacy = time.perf_counter() - started
+
+        started = time.perf_counter()
+        typed_counts = {}
+        ids = CourierLocationEvent.objects.filter(
+            tenant_id=tenant, created_at__gte=hour["from"], created_at__lt=hour["to"]
+        ).values_list("courier_id", flat=True)
+        for cid in ids.iterator(chunk_size=10000):
+            typed_counts[cid] = typed_counts.get(cid, 0) + 1
+        typed = time.perf_counter() - started
+        self.stdout.write(
+            f"{'one hour, ORM loop (aggregation task)':<44} json {legacy:8.2f}s  typed {typed:8.2f}s  "
+            f"({legacy / typed:.1f}x)"
+        )
@@ -0,0 +1,63 @@
+import resource
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from app.models.courier_metrics import CourierMetrics
+from app.utils import streaming_export
+from app.views.analytics_export_view import CourierMetricsExportView
+
+GENERATE = f"""
+    INSERT INTO {CourierMetrics._meta.db_table}
+        (id, tenant_id, courier_id, deliveries_completed, average_delivery_time, sla_compliance,
+         distance_covered_km, rating, time_period, created_at)
+    SELECT gen_random_uuid(), %(tenant)s, md5(%(tenant)s::text || (g / %(days)s))::uuid,
+           (random() * 40)::int, 20 + random() * 20, 90 + random() * 10, random() * 80, 4 + random(),
+           %(first_day)s::date + (g %% %(days)s), now()
+    FROM generate_series(%(first)s, %(last)s) g
+"""
+
+
+class Command(BaseCommand):
+    help = "Stream N courier metric rows as CSV and Parquet and report rows/s and worker peak RSS growth."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000_000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--chunk", type=int, default=1_000_000)
+        parser.add_argument("--formats", default=",".join(streaming_export.formats()))
+
+    def handle(self, *args, **options):
+        tenant = str(uuid.uuid4())
+        first_day = timezone.now().date() - timedelta(days=options["days"])
+        n = options["rows"]
+        try:
+            with connection.cursor() as cursor:
+                for first in range(0, n, options["chunk"]):
+                    cursor.execute(
+                        GENERATE,
+                        {"tenant": tenant, "days": options["days"], "first_day": first_day, "first": first,
+                         "last": min(n, first + options["chunk"]) - 1},
+                    )
+                cursor.execute(f"ANALYZE {CourierMetrics._meta.db_table}")
+            self.stdout.write(f"generated {n:,} courier metric rows")
+
+            view = CourierMetricsExportView
+            rows = CourierMetrics.objects.filter(tenant_id=tenant)
+            for fmt in options["formats"].split(","):
+                rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                started = time.perf_counter()
+                response = streaming_export.export_response(rows, view.fields, view.key_fields, fmt, view.filename)
+                size = sum(len(chunk) for chunk in response.streaming_content)
+                elapsed = time.perf_counter() - started
+                rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                self.stdout.write(
+                    f"{fmt:<8} {size / 1e6:10.1f} MB in {elapsed:7.1f}s ({n / elapsed:,.0f} rows/s), "
+                    f"worker peak RSS +{(rss_after - rss_before) / 1024:.1f} MB"
+                )
+        finally:
+            CourierMetrics.objects.filter(tenant_id=tenant).delete()
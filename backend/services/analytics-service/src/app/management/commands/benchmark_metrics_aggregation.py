@@ -0,0 +1,87 @@
+import resource
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.models.courier_location_event import CourierLocationEvent
+from app.models.rollup_watermark import RollupWatermark
+from app.utils import metric_rollups
+
+# Events are spread evenly over [start, start + span); they arrive as created unless `ingested` is given.
+GENERATE = f"""
+    INSERT INTO {CourierLocationEvent._meta.db_table}
+        (event_id, tenant_id, courier_id, lat, lon, recorded_at, created_at, ingested_at)
+    SELECT gen_random_uuid(), %(tenant)s, md5(%(tenant)s::text || (g %% %(couriers)s))::uuid,
+           6.4 + random() * 0.3, 3.3 + random() * 0.3, ts, ts, COALESCE(%(ingested)s, ts)
+    FROM (
+        SELECT g, %(start)s + g * %(step)s * interval '1 microsecond' AS ts
+        FROM generate_series(%(first)s, %(last)s) g
+    ) s
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a from-scratch rollup of one hour of N events against an incremental run that merges "
+        "one new minute plus late arrivals, and report worker memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=10_000_000)
+        parser.add_argument("--couriers", type=int, default=20000)
+        parser.add_argument("--late", type=int, default=10000, help="Late events spread over the hour.")
+        parser.add_argument("--chunk", type=int, default=1_000_000)
+
+    def handle(self, *args, **options):
+        tenant = str(uuid.uuid4())
+        end = timezone.now().replace(minute=0, second=0, microsecond=0)
+        start = end - timedelta(hours=1)
+        n = options["events"]
+        settle = timedelta(seconds=settings.ANALYTICS_ROLLUP_SETTLE_SECONDS)
+        spec = metric_rollups.COURIER._replace(name=f"benchmark:{tenant}")
+        try:
+            self._generate(tenant, start, timedelta(hours=1), n, None, options)
+            self.stdout.write(f"generated {n:,} events for the hour starting {start:%H:%M}")
+
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Rollups cover every tenant in the window; roll them back so real metrics are untouched.
+            with transaction.atomic():
+                RollupWatermark.objects.create(name=spec.name, high_water=start, ingested_through=start)
+                started = time.perf_counter()
+                stats = metric_rollups.run(spec, now=end + settle)
+                self._report("from scratch, 1 hour", n, stats, time.perf_counter() - started)
+
+                minute = n // 60
+                self._generate(tenant, end, timedelta(minutes=1), minute, None, options)
+                self._generate(tenant, start, timedelta(hours=1), options["late"], end + timedelta(seconds=30), options)
+                started = time.perf_counter()
+                stats = metric_rollups.run(spec, now=end + timedelta(minutes=1) + settle)
+                self._report("incremental, 1 minute + late", minute + options["late"], stats,
+                             time.perf_counter() - started)
+                transaction.set_rollback(True)
+            rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.stdout.write(f"worker peak RSS +{(rss_after - rss_before) / 1024:.1f} MB")
+        finally:
+            CourierLocationEvent.objects.filter(tenant_id=tenant).delete()
+
+    def _generate(self, tenant, start, span, count, ingested, options):
+        with connection.cursor() as cursor:
+            for first in range(0, count, options["chunk"]):
+                cursor.execute(
+                    GENERATE,
+                    {"tenant": tenant, "couriers": options["couriers"], "start": start,
+                     "step": int(span.total_seconds() * 1_000_000 / count), "first": first,
+                     "last": min(count, first + options["chunk"]) - 1, "ingested": ingested},
+                )
+            cursor.execute(f"ANALYZE {CourierLocationEvent._meta.db_table}")
+
+    def _report(self, label, events, stats, elapsed):
+        self.stdout.write(
+            f"{label:<30} {events:>12,} events in {elapsed:8.2f}s  late minutes {stats['late_minutes']:>4}  "
+            f"buckets {stats['minute_buckets']:,}/{stats['hour_buckets']:,}  metrics rows {stats['metrics_rows']:,}"
+        )
@@ -0,0 +1,29 @@
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
+
+
+class CourierLocationEvent(models.Model):
+    """Typed, append-only store for `courier_location` events (one column per payload field)."""
+    id = models.BigAutoField(primary_key=True)
+    event_id = models.UUIDField(unique=True)
+    tenant_id = models.UUIDField()
+    courier_id = models.UUIDField()
+    lat = models.FloatField()
+    lon = models.FloatField()
+    recorded_at = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Set by the database on insert; lets rollups find events that arrived late.
+    ingested_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        db_table = "analytics_courier_location_events"
+        indexes = [
+            BrinIndex(fields=["created_at"], name="acle_created_brin"),
+            BrinIndex(fields=["ingested_at"], name="acle_ingested_brin"),
+            models.Index(fields=["tenant_id", "courier_id", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Courier {self.courier_id} at {self.created_at}"
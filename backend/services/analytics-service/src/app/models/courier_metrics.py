@@ -17,7 +17,12 @@ class CourierMetrics(models.Model):
 
     class Meta:
         db_table = "courier_metrics"
-        indexes = [models.Index(fields=["tenant_id", "courier_id", "time_period"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant_id", "courier_id", "time_period"], name="uniq_courier_metrics_period"
+            )
+        ]
+        indexes = [models.Index(fields=["tenant_id", "-time_period", "-id"])]
 
     def __str__(self):
         return f"Courier {self.courier_id} ({self.time_period})"
@@ -0,0 +1,26 @@
+from django.db import models
+from django.utils import timezone
+
+
+class CourierMetricsBucket(models.Model):
+    """Per-courier rollup of courier_location events for one minute or one hour."""
+    id = models.BigAutoField(primary_key=True)
+    granularity = models.CharField(max_length=8, choices=[("minute", "Minute"), ("hour", "Hour")])
+    tenant_id = models.UUIDField()
+    courier_id = models.UUIDField()
+    bucket_start = models.DateTimeField()
+    event_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "courier_metrics_buckets"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "tenant_id", "courier_id", "bucket_start"],
+                name="uniq_courier_metrics_bucket",
+            )
+        ]
+        indexes = [models.Index(fields=["granularity", "bucket_start"])]
+
+    def __str__(self):
+        return f"Courier {self.courier_id} {self.granularity} {self.bucket_start}: {self.event_count}"
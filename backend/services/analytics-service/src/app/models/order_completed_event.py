@@ -0,0 +1,29 @@
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
+
+
+class OrderCompletedEvent(models.Model):
+    """Typed, append-only store for `order_completed` events."""
+    id = models.BigAutoField(primary_key=True)
+    event_id = models.UUIDField(unique=True)
+    tenant_id = models.UUIDField()
+    order_id = models.UUIDField(null=True)
+    courier_id = models.UUIDField(null=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    delivery_minutes = models.FloatField(null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Set by the database on insert; lets rollups find events that arrived late.
+    ingested_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        db_table = "analytics_order_completed_events"
+        indexes = [
+            BrinIndex(fields=["created_at"], name="aoce_created_brin"),
+            BrinIndex(fields=["ingested_at"], name="aoce_ingested_brin"),
+            models.Index(fields=["tenant_id", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id} completed ({self.amount})"
@@ -14,7 +14,9 @@ class RevenueMetrics(models.Model):
 
     class Meta:
         db_table = "revenue_metrics"
-        indexes = [models.Index(fields=["tenant_id", "time_period"])]
+        constraints = [
+            models.UniqueConstraint(fields=["tenant_id", "time_period"], name="uniq_revenue_metrics_period")
+        ]
 
     def __str__(self):
         return f"Revenue ({self.tenant_id}) - {self.time_period}"
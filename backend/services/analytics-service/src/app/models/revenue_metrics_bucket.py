@@ -0,0 +1,25 @@
+from django.db import models
+from django.utils import timezone
+
+
+class RevenueMetricsBucket(models.Model):
+    """Per-tenant rollup of order_completed events for one minute or one hour."""
+    id = models.BigAutoField(primary_key=True)
+    granularity = models.CharField(max_length=8, choices=[("minute", "Minute"), ("hour", "Hour")])
+    tenant_id = models.UUIDField()
+    bucket_start = models.DateTimeField()
+    event_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "revenue_metrics_buckets"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "tenant_id", "bucket_start"], name="uniq_revenue_metrics_bucket"
+            )
+        ]
+        indexes = [models.Index(fields=["granularity", "bucket_start"])]
+
+    def __str__(self):
+        return f"Revenue {self.tenant_id} {self.granularity} {self.bucket_start}: {self.amount}"
@@ -0,0 +1,19 @@
+from django.db import models
+from django.utils import timezone
+
+
+class RollupWatermark(models.Model):
+    """
+    Progress of an incremental rollup: events with created_at below `high_water` have been
+    bucketed, and arrivals up to `ingested_through` have been checked for late events.
+    """
+    name = models.CharField(max_length=64, primary_key=True)
+    high_water = models.DateTimeField()
+    ingested_through = models.DateTimeField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "rollup_watermarks"
+
+    def __str__(self):
+        return f"{self.name} @ {self.high_water}"
@@ -0,0 +1,30 @@
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
+
+
+class SLAEventRecord(models.Model):
+    """Typed, append-only store for `sla_event` events emitted by the tracking service."""
+    id = models.BigAutoField(primary_key=True)
+    event_id = models.UUIDField(unique=True)
+    tenant_id = models.UUIDField()
+    route_id = models.UUIDField()
+    courier_id = models.UUIDField(null=True)
+    sla_type = models.CharField(max_length=64)
+    notes = models.TextField(blank=True)
+    event_time = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Set by the database on insert; lets rollups find events that arrived late.
+    ingested_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        db_table = "analytics_sla_events"
+        indexes = [
+            BrinIndex(fields=["created_at"], name="ase_created_brin"),
+            BrinIndex(fields=["ingested_at"], name="ase_ingested_brin"),
+            models.Index(fields=["tenant_id", "sla_type", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.sla_type} on route {self.route_id}"
@@ -1,9 +1,13 @@
 from django.urls import path
-from app.views.analytics_ingest_view import AnalyticsIngestView
+from app.views.analytics_ingest_view import AnalyticsBulkIngestView, AnalyticsIngestView
 from app.views.analytics_dashboard_view import CourierMetricsView, RevenueMetricsView
+from app.views.analytics_export_view import CourierMetricsExportView, RevenueMetricsExportView
 
 urlpatterns = [
     path("api/v1/analytics/events/", AnalyticsIngestView.as_view(), name="analytics_ingest"),
+    path("api/v1/analytics/events/bulk/", AnalyticsBulkIngestView.as_view(), name="analytics_bulk_ingest"),
     path("api/v1/analytics/couriers/", CourierMetricsView.as_view(), name="courier_metrics"),
     path("api/v1/analytics/revenue/", RevenueMetricsView.as_view(), name="revenue_metrics"),
+    path("api/v1/analytics/couriers/export/", CourierMetricsExportView.as_view(), name="courier_metrics_export"),
+    path("api/v1/analytics/revenue/export/", RevenueMetricsExportView.as_view(), name="revenue_metrics_export"),
 ]
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+r = redis.StrictRedis.from_url(settings.CELERY_BROKER_URL)
+
+# Each (metric, tenant) has a generation token that the rollup replaces whenever it rewrites that
+# tenant's metrics. Cache keys and ETags embed it, so invalidation is one SET per tenant and stale
+# entries simply stop being addressed until their TTL drops them.
+GENERATION_KEY = "analytics:dashboard:gen:{metric}:{tenant_id}"
+ENTRY_KEY = "analytics:dashboard:{metric}:{tenant_id}:{tag}"
+
+
+def _generation(metric, tenant_id):
+    key = GENERATION_KEY.format(metric=metric, tenant_id=tenant_id)
+    value = r.get(key)
+    if value is None:
+        value = str(time.time_ns()).encode()
+        if not r.set(key, value, nx=True):
+            value = r.get(key) or value
+    return value.decode()
+
+
+def etag(metric, tenant_id, params):
+    """Strong ETag for a query against the tenant's current generation, or None if Redis is down."""
+    try:
+        generation = _generation(metric, tenant_id)
+    except redis.RedisError as e:
+        logger.warning(f"[DashboardCache] Generation lookup failed: {e}")
+        return None
+    raw = json.dumps([metric, str(tenant_id), generation, sorted(params.items())], cls=DjangoJSONEncoder)
+    return '"%s"' % hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def get_or_build(metric, tenant_id, tag, build):
+    """Read-through: the cached body for `tag`, or `build()` stored under it. Redis errors fall back to `build()`."""
+    if tag is None:
+        return build()
+    key = ENTRY_KEY.format(metric=metric, tenant_id=tenant_id, tag=tag.strip('"'))
+    try:
+        cached = r.get(key)
+    except redis.RedisError:
+        cached = None
+    if cached is not None:
+        return json.loads(cached)
+    body = build()
+    try:
+        r.set(key, json.dumps(body, cls=DjangoJSONEncoder), ex=settings.ANALYTICS_DASHBOARD_CACHE_TTL_SECONDS)
+    except redis.RedisError as e:
+        logger.warning(f"[DashboardCache] Could not cache {metric} for {tenant_id}: {e}")
+    return body
+
+
+def invalidate(metric, tenant_ids):
+    """Move the given tenants to a new generation; called by the rollup after it commits."""
+    if not tenant_ids:
+        return
+    generation = str(time.time_ns())
+    try:
+        with r.pipeline(transaction=False) as pipe:
+            for tenant_id in tenant_ids:
+                pipe.set(GENERATION_KEY.format(metric=metric, tenant_id=tenant_id), generation)
+            pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"[DashboardCache] Invalidation of {metric} failed, entries expire by TTL: {e}")
@@ -0,0 +1,131 @@
+import json
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+import msgpack
+from django.conf import settings
+from django.utils import timezone
+
+from app.models.analytics_event import AnalyticsEvent
+from app.utils import event_store
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonlines")
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+MAX_EVENT_TYPE_LENGTH = AnalyticsEvent._meta.get_field("event_type").max_length
+DECODE_ERRORS = (ValueError, msgpack.UnpackException)
+
+
+class _PeekedStream:
+    """File-like that replays bytes already read from the head of a stream."""
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size=-1):
+        if not self.head:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            data, self.head = self.head + self.stream.read(), b""
+            return data
+        data, self.head = self.head[:size], self.head[size:]
+        if len(data) < size:
+            data += self.stream.read(size - len(data))
+        return data
+
+
+def iter_ndjson(stream):
+    """Yield one decoded object per non-empty line, reading the body line by line."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield e
+
+
+def iter_msgpack(stream):
+    """
+    Yield events from either one MessagePack array of maps or a sequence of maps.
+    Array elements are unpacked one at a time, so the body is never held whole.
+    """
+    head = stream.read(1)
+    if not head:
+        return
+    unpacker = msgpack.Unpacker(_PeekedStream(head, stream), raw=False, read_size=64 * 1024)
+    if head[0] in (0xDC, 0xDD) or 0x90 <= head[0] <= 0x9F:
+        for _ in range(unpacker.read_array_header()):
+            yield unpacker.unpack()
+    else:
+        yield from unpacker
+
+
+def parse_event(obj, source):
+    """
+    Validate one raw event without a serializer. Returns a tuple in event_store.RAW_COLUMNS order,
+    or raises ValueError with a short reason.
+    """
+    if isinstance(obj, Exception):
+        raise ValueError(f"undecodable: {obj}")
+    if not isinstance(obj, dict):
+        raise ValueError("event must be an object")
+    event_type = obj.get("event_type")
+    if not isinstance(event_type, str) or not event_type or len(event_type) > MAX_EVENT_TYPE_LENGTH:
+        raise ValueError("event_type must be a non-empty string")
+    try:
+        tenant_id = uuid.UUID(str(obj["tenant_id"]))
+    except (KeyError, ValueError):
+        raise ValueError("tenant_id must be a UUID")
+    payload = obj.get("payload", obj.get("data"))
+    if not isinstance(payload, (dict, list)):
+        raise ValueError("payload must be an object or array")
+    try:
+        event_id = uuid.UUID(str(obj["id"])) if obj.get("id") else uuid.uuid4()
+    except ValueError:
+        raise ValueError("id must be a UUID")
+    created_at = obj.get("created_at")
+    if created_at is None:
+        created_at = timezone.now()
+    elif isinstance(created_at, (int, float)):
+        created_at = datetime.fromtimestamp(created_at, tz=dt_timezone.utc)
+    else:
+        try:
+            created_at = datetime.fromisoformat(str(created_at))
+        except ValueError:
+            raise ValueError("created_at must be ISO-8601 or a unix timestamp")
+        if timezone.is_naive(created_at):
+            created_at = created_at.replace(tzinfo=dt_timezone.utc)
+    return (event_id, event_type, tenant_id, obj.get("service_source") or source, payload, created_at)
+
+
+def ingest(events, source, writer=None, chunk_size=None, max_errors=100):
+    """
+    Validate and store an iterable of raw events in chunks of `chunk_size`, each chunk in
+    its own transaction. Events that fail validation are skipped and reported; if the body
+    itself turns out malformed, chunks already written stay committed (resend with ids).
+    Returns (accepted, rejected, errors) where rejected lists the index of every skipped
+    event and errors holds (index, reason) for the first `max_errors` of them.
+    """
+    writer = writer or settings.ANALYTICS_BULK_INGEST_WRITER
+    chunk_size = chunk_size or settings.ANALYTICS_BULK_INGEST_CHUNK_SIZE
+    accepted = 0
+    rejected = []
+    errors = []
+    chunk = []
+    for index, obj in enumerate(events):
+        try:
+            chunk.append(parse_event(obj, source))
+        except ValueError as e:
+            rejected.append(index)
+            if len(errors) < max_errors:
+                errors.append((index, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            event_store.write(chunk, writer)
+            accepted += len(chunk)
+            chunk = []
+    if chunk:
+        event_store.write(chunk, writer)
+        accepted += len(chunk)
+    return accepted, rejected, errors
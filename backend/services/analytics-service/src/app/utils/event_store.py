@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+
+from app.models.analytics_event import AnalyticsEvent
+from app.models.courier_location_event import CourierLocationEvent
+from app.models.order_completed_event import OrderCompletedEvent
+from app.models.sla_event_record import SLAEventRecord
+
+# Raw rows arrive as (id, event_type, tenant_id, service_source, payload, created_at).
+RAW_COLUMNS = ("id", "event_type", "tenant_id", "service_source", "payload", "created_at")
+
+
+def _uuid(value, required=True):
+    if value in (None, ""):
+        if required:
+            raise ValueError("missing id")
+        return None
+    return uuid.UUID(str(value))
+
+
+def _timestamp(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value).replace(" ", "T", 1))
+
+
+def _courier_location(event_id, tenant_id, payload, created_at):
+    return (
+        event_id,
+        tenant_id,
+        _uuid(payload.get("courier_id")),
+        float(payload["lat"]),
+        float(payload["lon"]),
+        _timestamp(payload.get("timestamp")),
+        created_at,
+    )
+
+
+def _sla_event(event_id, tenant_id, payload, created_at):
+    return (
+        event_id,
+        tenant_id,
+        _uuid(payload.get("route_id")),
+        _uuid(payload.get("courier_id"), required=False),
+        str(payload.get("type") or ""),
+        str(payload.get("notes") or ""),
+        _timestamp(payload.get("timestamp")),
+        created_at,
+    )
+
+
+def _order_completed(event_id, tenant_id, payload, created_at):
+    minutes = payload.get("delivery_minutes")
+    return (
+        event_id,
+        tenant_id,
+        _uuid(payload.get("order_id"), required=False),
+        _uuid(payload.get("courier_id"), required=False),
+        Decimal(str(payload.get("amount", 0))).quantize(Decimal("0.01")),
+        float(minutes) if minutes is not None else None,
+        created_at,
+    )
+
+
+# event_type -> (model, columns, extractor). Extractors raise on payloads that do not fit
+# the typed schema; such events are kept in the raw JSON table instead of being lost.
+TYPED_STORES = {
+    "courier_location": (
+        CourierLocationEvent,
+        ("event_id", "tenant_id", "courier_id", "lat", "lon", "recorded_at", "created_at"),
+        _courier_location,
+    ),
+    "sla_event": (
+        SLAEventRecord,
+        ("event_id", "tenant_id", "route_id", "courier_id", "sla_type", "notes", "event_time", "created_at"),
+        _sla_event,
+    ),
+    "order_completed": (
+        OrderCompletedEvent,
+        ("event_id", "tenant_id", "order_id", "courier_id", "amount", "delivery_minutes", "created_at"),
+        _order_completed,
+    ),
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def copy_rows(model, columns, rows, conflict_column):
+    """COPY rows into a temp staging table, then insert them skipping conflicting keys."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+    buf.seek(0)
+    column_list = ", ".join(columns)
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {table}_stage ON COMMIT DELETE ROWS "
+            f"AS SELECT {column_list} FROM {table} WITH NO DATA"
+        )
+        cursor.copy_expert(f"COPY {table}_stage ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+        cursor.execute(
+            f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {table}_stage "
+            f"ON CONFLICT ({conflict_column}) DO NOTHING"
+        )
+        return cursor.rowcount
+
+
+def bulk_create_rows(model, columns, rows, conflict_column):
+    model.objects.bulk_create([model(**dict(zip(columns, row))) for row in rows], ignore_conflicts=True)
+    return len(rows)
+
+
+WRITERS = {"copy": copy_rows, "bulk_create": bulk_create_rows}
+
+
+def split(rows):
+    """Route raw rows to their typed store; returns ({event_type: typed_rows}, raw_rows)."""
+    typed, raw = {}, []
+    for row in rows:
+        event_id, event_type, tenant_id, _, payload, created_at = row
+        store = TYPED_STORES.get(event_type)
+        if store is not None and isinstance(payload, dict):
+            try:
+                typed.setdefault(event_type, []).append(store[2](event_id, tenant_id, payload, created_at))
+                continue
+            except (KeyError, TypeError, ValueError, InvalidOperation):
+                pass
+        raw.append(row)
+    return typed, raw
+
+
+def write(rows, writer="copy"):
+    """Store raw rows in one transaction: typed event types in their columnar table, the rest as JSON."""
+    write_rows = WRITERS[writer]
+    typed, raw = split(rows)
+    with transaction.atomic():
+        for event_type, typed_rows in typed.items():
+            model, columns, _ = TYPED_STORES[event_type]
+            write_rows(model, columns, typed_rows, "event_id")
+        if raw:
+            write_rows(AnalyticsEvent, RAW_COLUMNS, raw, "id")
+    return len(rows)
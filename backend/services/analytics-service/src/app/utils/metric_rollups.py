@@ -0,0 +1,231 @@
+from collections import namedtuple
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.models.courier_location_event import CourierLocationEvent
+from app.models.courier_metrics import CourierMetrics
+from app.models.courier_metrics_bucket import CourierMetricsBucket
+from app.models.order_completed_event import OrderCompletedEvent
+from app.models.revenue_metrics import RevenueMetrics
+from app.models.revenue_metrics_bucket import RevenueMetricsBucket
+from app.models.rollup_watermark import RollupWatermark
+from app.utils import dashboard_cache
+
+# How one typed event table rolls up: `measures` maps bucket columns to aggregates over the
+# source rows (hour buckets sum the minute columns), `merge_sql` folds hour buckets into a
+# daily metrics table for %(start)s..%(end)s, limited to keys touched by the current run.
+Rollup = namedtuple("Rollup", "name source bucket dimensions measures merge_sql")
+
+COURIER_MERGE = f"""
+    INSERT INTO {CourierMetrics._meta.db_table} AS m
+        (id, tenant_id, courier_id, deliveries_completed, average_delivery_time, sla_compliance,
+         distance_covered_km, rating, time_period, created_at)
+    SELECT gen_random_uuid(), tenant_id, courier_id, sum(event_count), 30.0, 98.5,
+           sum(event_count) * 0.5, 0.0, (bucket_start AT TIME ZONE 'UTC')::date, now()
+    FROM {CourierMetricsBucket._meta.db_table}
+    WHERE granularity = 'hour' AND bucket_start >= %(start)s AND bucket_start < %(end)s
+      AND (tenant_id, courier_id) IN (
+          SELECT tenant_id, courier_id FROM {CourierMetricsBucket._meta.db_table}
+          WHERE granularity = 'hour' AND bucket_start >= %(start)s AND bucket_start < %(end)s
+            AND updated_at = now()
+      )
+    GROUP BY tenant_id, courier_id, (bucket_start AT TIME ZONE 'UTC')::date
+    ON CONFLICT (tenant_id, courier_id, time_period) DO UPDATE SET
+        deliveries_completed = EXCLUDED.deliveries_completed,
+        distance_covered_km = EXCLUDED.distance_covered_km
+"""
+
+REVENUE_MERGE = f"""
+    INSERT INTO {RevenueMetrics._meta.db_table} AS m
+        (id, tenant_id, total_revenue, total_cost, profit_margin, time_period, created_at)
+    SELECT gen_random_uuid(), tenant_id, sum(amount), sum(amount) * 0.75,
+           CASE WHEN sum(amount) > 0 THEN 25.00 ELSE 0 END, (bucket_start AT TIME ZONE 'UTC')::date, now()
+    FROM {RevenueMetricsBucket._meta.db_table}
+    WHERE granularity = 'hour' AND bucket_start >= %(start)s AND bucket_start < %(end)s
+      AND tenant_id IN (
+          SELECT tenant_id FROM {RevenueMetricsBucket._meta.db_table}
+          WHERE granularity = 'hour' AND bucket_start >= %(start)s AND bucket_start < %(end)s
+            AND updated_at = now()
+      )
+    GROUP BY tenant_id, (bucket_start AT TIME ZONE 'UTC')::date
+    ON CONFLICT (tenant_id, time_period) DO UPDATE SET
+        total_revenue = EXCLUDED.total_revenue,
+        total_cost = EXCLUDED.total_cost,
+        profit_margin = EXCLUDED.profit_margin
+"""
+
+COURIER = Rollup(
+    name="courier_metrics",
+    source=CourierLocationEvent._meta.db_table,
+    bucket=CourierMetricsBucket._meta.db_table,
+    dimensions=("tenant_id", "courier_id"),
+    measures={"event_count": "count(*)"},
+    merge_sql=COURIER_MERGE,
+)
+
+REVENUE = Rollup(
+    name="revenue_metrics",
+    source=OrderCompletedEvent._meta.db_table,
+    bucket=RevenueMetricsBucket._meta.db_table,
+    dimensions=("tenant_id",),
+    measures={"event_count": "count(*)", "amount": "sum(amount)"},
+    merge_sql=REVENUE_MERGE,
+)
+
+
+def _minute_sql(spec):
+    dims = ", ".join(spec.dimensions)
+    cols = ", ".join(spec.measures)
+    exprs = ", ".join(spec.measures.values())
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in spec.measures)
+    return f"""
+        INSERT INTO {spec.bucket} (granularity, {dims}, bucket_start, {cols}, updated_at)
+        SELECT 'minute', {dims}, date_trunc('minute', created_at), {exprs}, now()
+        FROM {spec.source}
+        WHERE created_at >= %(start)s AND created_at < %(end)s
+        GROUP BY {dims}, date_trunc('minute', created_at)
+        ON CONFLICT (granularity, {dims}, bucket_start) DO UPDATE SET {updates}, updated_at = now()
+    """
+
+
+def _hour_sql(spec):
+    dims = ", ".join(spec.dimensions)
+    cols = ", ".join(spec.measures)
+    sums = ", ".join(f"sum({col})" for col in spec.measures)
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in spec.measures)
+    return f"""
+        INSERT INTO {spec.bucket} (granularity, {dims}, bucket_start, {cols}, updated_at)
+        SELECT 'hour', {dims}, date_trunc('hour', bucket_start), {sums}, now()
+        FROM {spec.bucket}
+        WHERE granularity = 'minute' AND bucket_start >= %(start)s AND bucket_start < %(end)s
+          AND ({dims}) IN (
+              SELECT {dims} FROM {spec.bucket}
+              WHERE granularity = 'minute' AND bucket_start >= %(start)s AND bucket_start < %(end)s
+                AND updated_at = now()
+          )
+        GROUP BY {dims}, date_trunc('hour', bucket_start)
+        ON CONFLICT (granularity, {dims}, bucket_start) DO UPDATE SET {updates}, updated_at = now()
+        RETURNING tenant_id
+    """
+
+
+def _late_minutes_sql(spec):
+    return f"""
+        SELECT DISTINCT date_trunc('minute', created_at) FROM {spec.source}
+        WHERE ingested_at > %(after)s AND ingested_at <= %(through)s AND created_at < %(high_water)s
+        ORDER BY 1
+    """
+
+
+def _prune_sql(spec):
+    return f"""
+        DELETE FROM {spec.bucket} WHERE id IN (
+            SELECT id FROM {spec.bucket}
+            WHERE granularity = 'minute' AND bucket_start < %(before)s
+            LIMIT %(limit)s
+        )
+    """
+
+
+def _floor(value, unit):
+    if unit == "minute":
+        return value.replace(second=0, microsecond=0)
+    if unit == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _widen(ranges, unit, step):
+    """Expand ranges to whole `unit`s and merge the ones that overlap or touch."""
+    widened = []
+    for start, end in sorted(ranges):
+        start = _floor(start, unit)
+        end = _floor(end, unit) if _floor(end, unit) == end else _floor(end, unit) + step
+        if widened and start <= widened[-1][1]:
+            widened[-1] = (widened[-1][0], max(widened[-1][1], end))
+        else:
+            widened.append((start, end))
+    return widened
+
+
+def run(spec, now=None):
+    """
+    Bring `spec`'s buckets and daily metrics up to date and return run statistics.
+
+    New events are those with created_at in [high_water, settled minute). Events ingested since
+    the last run with created_at below the mark are late: only their minutes are recomputed from
+    source, then only the touched hours and days. Every bucket write replaces its value, so
+    recomputing a minute twice is harmless. `settled` trails now by ANALYTICS_ROLLUP_SETTLE_SECONDS
+    so rows from ingest transactions that have not committed yet are picked up by the next run.
+    Dashboard cache entries of the tenants whose hour buckets changed are invalidated on commit.
+
+    Minute buckets of final hours older than ANALYTICS_ROLLUP_MINUTE_RETENTION_HOURS are pruned
+    (at most ANALYTICS_ROLLUP_PRUNE_BATCH_SIZE rows per run). A late event in such an hour has its
+    whole hour of minutes rebuilt from source, so the hour sum never misses pruned minutes.
+    """
+    now = now or timezone.now()
+    settled = now - timedelta(seconds=settings.ANALYTICS_ROLLUP_SETTLE_SECONDS)
+    max_range = timedelta(minutes=settings.ANALYTICS_ROLLUP_MAX_RANGE_MINUTES)
+    retained_from = _floor(now - timedelta(hours=settings.ANALYTICS_ROLLUP_MINUTE_RETENTION_HOURS), "hour")
+    stats = {
+        "new_minutes": 0, "late_minutes": 0, "minute_buckets": 0, "hour_buckets": 0, "metrics_rows": 0,
+        "pruned_minute_buckets": 0,
+    }
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(
+            name=spec.name, defaults={"high_water": _floor(settled, "day"), "ingested_through": settled}
+        )
+        high_water = mark.high_water
+        end = min(_floor(settled, "minute"), high_water + max_range)
+
+        minute_ranges = []
+        if end > high_water:
+            minute_ranges.append((high_water, end))
+            stats["new_minutes"] = int((end - high_water).total_seconds() // 60)
+        if settled > mark.ingested_through:
+            cursor.execute(
+                _late_minutes_sql(spec),
+                {"after": mark.ingested_through, "through": settled, "high_water": high_water},
+            )
+            late = [
+                (row[0], row[0] + timedelta(minutes=1)) if row[0] >= retained_from
+                else (_floor(row[0], "hour"), _floor(row[0], "hour") + timedelta(hours=1))
+                for row in cursor.fetchall()
+            ]
+            stats["late_minutes"] = len(late)
+            minute_ranges.extend(late)
+        minute_ranges = _widen(minute_ranges, "minute", timedelta(minutes=1))
+
+        minute_sql, hour_sql = _minute_sql(spec), _hour_sql(spec)
+        for start, stop in minute_ranges:
+            cursor.execute(minute_sql, {"start": start, "end": stop})
+            stats["minute_buckets"] += cursor.rowcount
+        tenants = set()
+        for start, stop in _widen(minute_ranges, "hour", timedelta(hours=1)):
+            cursor.execute(hour_sql, {"start": start, "end": stop})
+            stats["hour_buckets"] += cursor.rowcount
+            tenants.update(str(row[0]) for row in cursor.fetchall())
+        for start, stop in _widen(minute_ranges, "day", timedelta(days=1)):
+            cursor.execute(spec.merge_sql, {"start": start, "end": stop})
+            stats["metrics_rows"] += cursor.rowcount
+
+        mark.high_water = max(high_water, end)
+        mark.ingested_through = max(mark.ingested_through, settled)
+        mark.updated_at = now
+        mark.save(update_fields=["high_water", "ingested_through", "updated_at"])
+
+        # Only hours entirely below the high-water mark are final.
+        cursor.execute(
+            _prune_sql(spec),
+            {"before": min(retained_from, _floor(mark.high_water, "hour")),
+             "limit": settings.ANALYTICS_ROLLUP_PRUNE_BATCH_SIZE},
+        )
+        stats["pruned_minute_buckets"] = cursor.rowcount
+        transaction.on_commit(partial(dashboard_cache.invalidate, spec.name, tenants))
+    stats["tenants"] = len(tenants)
+    return stats
@@ -1,18 +1,131 @@
-from rest_framework import generics, permissions
+import base64
+import uuid
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
 from app.models.courier_metrics import CourierMetrics
 from app.models.revenue_metrics import RevenueMetrics
 from app.serializers.courier_metrics_serializer import CourierMetricsSerializer
 from app.serializers.revenue_metrics_serializer import RevenueMetricsSerializer
+from app.utils import dashboard_cache
 
-class CourierMetricsView(generics.ListAPIView):
-    """Provides courier performance analytics to dashboards."""
-    queryset = CourierMetrics.objects.all().order_by("-time_period")
-    serializer_class = CourierMetricsSerializer
+
+def request_tenant_id(request):
+    """Tenant from the user or the token's `tenant_id` claim; staff may pass ?tenant_id= instead."""
+    tenant_id = getattr(request.user, "tenant_id", None)
+    if tenant_id is None and hasattr(request.auth, "get"):
+        tenant_id = request.auth.get("tenant_id")
+    if tenant_id is None and getattr(request.user, "is_staff", False):
+        tenant_id = request.query_params.get("tenant_id")
+    return uuid.UUID(str(tenant_id)) if tenant_id else None
+
+
+def _encode_cursor(row):
+    return base64.urlsafe_b64encode(f"{row.time_period.isoformat()}|{row.id}".encode()).decode()
+
+
+def _decode_cursor(value):
+    period, row_id = base64.urlsafe_b64decode(value.encode()).decode().split("|")
+    return date.fromisoformat(period), uuid.UUID(row_id)
+
+
+def _not_modified(request, tag):
+    header = request.headers.get("If-None-Match")
+    if not header or tag is None:
+        return False
+    candidates = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in candidates or tag in candidates
+
+
+class DashboardMetricsView(APIView):
+    """
+    Tenant-scoped, time-bounded metrics, newest period first, keyset-paginated on
+    (time_period, id) via an opaque `cursor`. Pages are served from a read-through cache
+    that the rollup invalidates, and carry an ETag so polling clients get 304s.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    model = None
+    serializer_class = None
+    metric = None
+    filter_fields = ()
+
+    def get(self, request):
+        try:
+            tenant_id = request_tenant_id(request)
+            params = self._params(request)
+        except ValueError as e:
+            return Response({"error": f"Invalid query: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if tenant_id is None:
+            return Response({"error": "No tenant in token"}, status=status.HTTP_403_FORBIDDEN)
+
+        tag = dashboard_cache.etag(self.metric, tenant_id, params)
+        if _not_modified(request, tag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            body = dashboard_cache.get_or_build(self.metric, tenant_id, tag, lambda: self._page(tenant_id, params))
+            response = Response(body)
+        if tag is not None:
+            response["ETag"] = tag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def _params(self, request):
+        query = request.query_params
+        end = date.fromisoformat(query["to"]) if query.get("to") else timezone.now().date()
+        if query.get("from"):
+            start = date.fromisoformat(query["from"])
+        else:
+            start = end - timedelta(days=settings.ANALYTICS_DASHBOARD_DEFAULT_RANGE_DAYS)
+        if start > end:
+            raise ValueError("'from' is after 'to'")
+        if (end - start).days > settings.ANALYTICS_DASHBOARD_MAX_RANGE_DAYS:
+            raise ValueError(f"range exceeds {settings.ANALYTICS_DASHBOARD_MAX_RANGE_DAYS} days")
+        limit = int(query.get("limit", settings.ANALYTICS_DASHBOARD_PAGE_SIZE))
+        if not 1 <= limit <= settings.ANALYTICS_DASHBOARD_MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {settings.ANALYTICS_DASHBOARD_MAX_PAGE_SIZE}")
+        params = {"from": start, "to": end, "limit": limit, "cursor": query.get("cursor") or None}
+        if params["cursor"]:
+            _decode_cursor(params["cursor"])
+        for field in self.filter_fields:
+            if query.get(field):
+                params[field] = str(uuid.UUID(query[field]))
+        return params
 
+    def _page(self, tenant_id, params):
+        rows = self.model.objects.filter(
+            tenant_id=tenant_id, time_period__gte=params["from"], time_period__lte=params["to"]
+        )
+        for field in self.filter_fields:
+            if field in params:
+                rows = rows.filter(**{field: params[field]})
+        if params["cursor"]:
+            period, row_id = _decode_cursor(params["cursor"])
+            rows = rows.filter(Q(time_period__lt=period) | Q(time_period=period, id__lt=row_id))
+        rows = list(rows.order_by("-time_period", "-id")[: params["limit"] + 1])
+        more = len(rows) > params["limit"]
+        rows = rows[: params["limit"]]
+        return {
+            "results": self.serializer_class(rows, many=True).data,
+            "next_cursor": _encode_cursor(rows[-1]) if more else None,
+        }
 
-class RevenueMetricsView(generics.ListAPIView):
+
+class CourierMetricsView(DashboardMetricsView):
+    """Provides courier performance analytics to dashboards; filter with ?courier_id=."""
+    model = CourierMetrics
+    serializer_class = CourierMetricsSerializer
+    metric = "courier_metrics"
+    filter_fields = ("courier_id",)
+
+
+class RevenueMetricsView(DashboardMetricsView):
     """Provides financial performance metrics."""
-    queryset = RevenueMetrics.objects.all().order_by("-time_period")
+    model = RevenueMetrics
     serializer_class = RevenueMetricsSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    metric = "revenue_metrics"
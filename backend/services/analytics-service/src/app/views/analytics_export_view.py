@@ -0,0 +1,61 @@
+from datetime import date
+
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from app.models.courier_metrics import CourierMetrics
+from app.models.revenue_metrics import RevenueMetrics
+from app.utils import streaming_export
+from app.views.analytics_dashboard_view import request_tenant_id
+
+
+class MetricsExportView(APIView):
+    """
+    Streams a tenant's metrics for a from/to date range as CSV or Parquet (?file_format=),
+    ordered by (time_period, id). Interrupted CSV downloads resume with
+    ?after=<time_period>,<id>; Parquet cannot, as a cut-off stream has no footer.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    model = None
+    fields = ()
+    key_fields = ("time_period", "id")
+    filename = None
+
+    def get(self, request):
+        query = request.query_params
+        fmt = query.get("file_format", "csv")
+        if fmt not in streaming_export.formats():
+            return Response(
+                {"error": f"file_format must be one of {streaming_export.formats()}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            tenant_id = request_tenant_id(request)
+            rows = self.model.objects.all()
+            if query.get("from"):
+                rows = rows.filter(time_period__gte=date.fromisoformat(query["from"]))
+            if query.get("to"):
+                rows = rows.filter(time_period__lte=date.fromisoformat(query["to"]))
+            if query.get("after"):
+                key = streaming_export.parse_after(self.model, self.key_fields, query["after"])
+                rows = streaming_export.after(rows, self.key_fields, key)
+        except ValueError as e:
+            return Response({"error": f"Invalid query: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if tenant_id is None:
+            return Response({"error": "No tenant in token"}, status=status.HTTP_403_FORBIDDEN)
+        rows = rows.filter(tenant_id=tenant_id)
+        return streaming_export.export_response(rows, self.fields, self.key_fields, fmt, self.filename)
+
+
+class CourierMetricsExportView(MetricsExportView):
+    model = CourierMetrics
+    fields = ("time_period", "id", "courier_id", "deliveries_completed", "average_delivery_time",
+              "sla_compliance", "distance_covered_km", "rating")
+    filename = "courier_metrics"
+
+
+class RevenueMetricsExportView(MetricsExportView):
+    model = RevenueMetrics
+    fields = ("time_period", "id", "total_revenue", "total_cost", "profit_margin")
+    filename = "revenue_metrics"
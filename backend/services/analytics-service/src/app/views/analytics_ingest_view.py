@@ -2,8 +2,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from app.serializers.analytics_event_serializer import AnalyticsEventSerializer
-from app.models.analytics_event import AnalyticsEvent
+from app.utils import event_ingest, event_store
+from django.conf import settings
+from django.utils import timezone
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +16,87 @@ class AnalyticsIngestView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
+        if isinstance(request.data, list):
+            return self.post_batch(request)
         serializer = AnalyticsEventSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(service_source=request.headers.get("X-Service-Name", "unknown"))
+            source = request.headers.get("X-Service-Name", "unknown")
+            event_store.write([self._row(serializer.validated_data, source)], writer="bulk_create")
             logger.info(f"[AnalyticsIngest] Event received: {serializer.validated_data['event_type']}")
             return Response({"message": "Event recorded"}, status=status.HTTP_201_CREATED)
         logger.error(f"[AnalyticsIngest] Invalid event: {serializer.errors}")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def post_batch(self, request):
+        """
+        Batch of events (e.g. from a service's outbox relay). Events may carry their own
+        `id`; redelivered ids are ignored, so at-least-once senders do not create duplicates.
+        """
+        serializer = AnalyticsEventSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            logger.error(f"[AnalyticsIngest] Invalid batch: {serializer.errors}")
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        source = request.headers.get("X-Service-Name", "unknown")
+        events = [
+            self._row(data, source, event_id=raw.get("id"))
+            for raw, data in zip(request.data, serializer.validated_data)
+        ]
+        event_store.write(events, writer=settings.ANALYTICS_BULK_INGEST_WRITER)
+        logger.info(f"[AnalyticsIngest] Batch received: {len(events)} events from {source}")
+        return Response({"message": "Events recorded", "count": len(events)}, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _row(data, source, event_id=None):
+        """Validated serializer data as an event_store row (typed types go to their columnar table)."""
+        return (
+            uuid.UUID(str(event_id)) if event_id else uuid.uuid4(),
+            data["event_type"],
+            data["tenant_id"],
+            source,
+            data["payload"],
+            data.get("created_at") or timezone.now(),
+        )
+
+
+class AnalyticsBulkIngestView(APIView):
+    """
+    High-volume ingest: NDJSON (one event per line) or MessagePack (an array of events or
+    a sequence of maps). The body is read as a stream and written in chunks, so memory
+    stays flat for any batch size. Invalid events are skipped and reported: the response
+    lists the index of every rejected event so senders can single them out.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        content_type = request.content_type.split(";")[0].strip().lower()
+        if content_type in event_ingest.NDJSON_TYPES:
+            events = event_ingest.iter_ndjson
+        elif content_type in event_ingest.MSGPACK_TYPES:
+            events = event_ingest.iter_msgpack
+        else:
+            return Response(
+                {"error": "Use application/x-ndjson or application/msgpack"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        if request.stream is None:
+            return Response({"error": "Empty body"}, status=status.HTTP_400_BAD_REQUEST)
+
+        source = request.headers.get("X-Service-Name", "unknown")
+        try:
+            accepted, rejected, errors = event_ingest.ingest(events(request.stream), source)
+        except event_ingest.DECODE_ERRORS as e:
+            logger.error(f"[AnalyticsIngest] Bulk ingest from {source} aborted: {e}")
+            return Response({"error": "Malformed body"}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"[AnalyticsIngest] Bulk from {source}: {accepted} accepted, {len(rejected)} rejected")
+        return Response(
+            {
+                "accepted": accepted,
+                "rejected": len(rejected),
+                "rejected_indexes": rejected,
+                "errors": [{"index": index, "error": reason} for index, reason in errors],
+            },
+            status=status.HTTP_200_OK if accepted or not rejected else status.HTTP_400_BAD_REQUEST,
+        )
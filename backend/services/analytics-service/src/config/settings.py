@@ -60,13 +60,13 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
 CELERY_BEAT_SCHEDULE = {
-    "aggregate_courier_metrics": {
-        "task": "analytics.aggregate_courier_metrics",
-        "schedule": timedelta(hours=1),
+    "rollup_courier_metrics": {
+        "task": "analytics.rollup_courier_metrics",
+        "schedule": timedelta(minutes=1),
     },
-    "aggregate_revenue_metrics": {
-        "task": "analytics.aggregate_revenue_metrics",
-        "schedule": timedelta(days=1),
+    "rollup_revenue_metrics": {
+        "task": "analytics.rollup_revenue_metrics",
+        "schedule": timedelta(minutes=1),
     },
 }
 
@@ -92,6 +92,30 @@ SIMPLE_JWT = {
     "SIGNING_KEY": SECRET_KEY,
 }
 
+# Bulk event ingest: events are written in chunks via COPY (or "bulk_create")
+ANALYTICS_BULK_INGEST_WRITER = os.getenv("ANALYTICS_BULK_INGEST_WRITER", "copy")
+ANALYTICS_BULK_INGEST_CHUNK_SIZE = int(os.getenv("ANALYTICS_BULK_INGEST_CHUNK_SIZE", "5000"))
+
+# Incremental metric rollups: how far behind now the high-water mark trails (so in-flight
+# ingest transactions are not missed) and how many minutes one run may advance it
+ANALYTICS_ROLLUP_SETTLE_SECONDS = int(os.getenv("ANALYTICS_ROLLUP_SETTLE_SECONDS", "30"))
+ANALYTICS_ROLLUP_MAX_RANGE_MINUTES = int(os.getenv("ANALYTICS_ROLLUP_MAX_RANGE_MINUTES", "60"))
+# Minute buckets of final hours are kept this long (late events inside it touch single
+# minutes; older ones rebuild their hour from source) and pruned in batches per run
+ANALYTICS_ROLLUP_MINUTE_RETENTION_HOURS = int(os.getenv("ANALYTICS_ROLLUP_MINUTE_RETENTION_HOURS", "48"))
+ANALYTICS_ROLLUP_PRUNE_BATCH_SIZE = int(os.getenv("ANALYTICS_ROLLUP_PRUNE_BATCH_SIZE", "100000"))
+
+# Dashboard metric endpoints: read-through Redis cache (invalidated by the rollups) and query bounds
+ANALYTICS_DASHBOARD_CACHE_TTL_SECONDS = int(os.getenv("ANALYTICS_DASHBOARD_CACHE_TTL_SECONDS", "300"))
+ANALYTICS_DASHBOARD_DEFAULT_RANGE_DAYS = int(os.getenv("ANALYTICS_DASHBOARD_DEFAULT_RANGE_DAYS", "30"))
+ANALYTICS_DASHBOARD_MAX_RANGE_DAYS = int(os.getenv("ANALYTICS_DASHBOARD_MAX_RANGE_DAYS", "366"))
+ANALYTICS_DASHBOARD_PAGE_SIZE = int(os.getenv("ANALYTICS_DASHBOARD_PAGE_SIZE", "100"))
+ANALYTICS_DASHBOARD_MAX_PAGE_SIZE = int(os.getenv("ANALYTICS_DASHBOARD_MAX_PAGE_SIZE", "1000"))
+
+# Streaming exports: rows fetched per server-side cursor round trip / CSV chunk, rows per Parquet row group
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_SIZE", "100000"))
+
 # Service URLs
 TRACKING_SERVICE_URL = os.getenv("TRACKING_SERVICE_URL", "http://tracking-service:8000")
 
@@ -0,0 +1,81 @@
+import random
+import time
+import uuid
+
+import numpy as np
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from app.models import Assignment, CourierLoad
+from app.utils import assignment_engine, load_ledger
+
+# Synthetic fleet spread over a Lagos-sized box.
+BOX = {"lat": (6.40, 6.70), "lon": (3.20, 3.60)}
+
+GENERATE_FLEET = f"""
+    INSERT INTO {CourierLoad._meta.db_table}
+        (id, tenant_id, courier_id, active_assignments, performance_score, status, last_location, updated_at)
+    SELECT gen_random_uuid(), %(tenant)s, gen_random_uuid(), (random() * 2)::int, 60 + random() * 40,
+           CASE WHEN random() < 0.8 THEN 'available' ELSE 'offline' END,
+           ST_SetSRID(ST_MakePoint(%(lon0)s + random() * %(dlon)s, %(lat0)s + random() * %(dlat)s), 4326)::geography,
+           now()
+    FROM generate_series(1, %(couriers)s)
+"""
+
+
+class Command(BaseCommand):
+    help = "Assign orders against a synthetic fleet of N couriers per tenant and report latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--couriers", type=int, default=50000, help="Couriers per tenant.")
+        parser.add_argument("--tenants", type=int, default=4, help="Tenants sharing the courier_loads table.")
+        parser.add_argument("--orders", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        tenants = [str(uuid.uuid4()) for _ in range(options["tenants"])]
+        try:
+            with connection.cursor() as cursor:
+                for tenant in tenants:
+                    cursor.execute(
+                        GENERATE_FLEET,
+                        {"tenant": tenant, "couriers": options["couriers"], "lat0": BOX["lat"][0],
+                         "dlat": BOX["lat"][1] - BOX["lat"][0], "lon0": BOX["lon"][0],
+                         "dlon": BOX["lon"][1] - BOX["lon"][0]},
+                    )
+                cursor.execute(f"ANALYZE {CourierLoad._meta.db_table}")
+            self.stdout.write(f"generated {options['couriers']:,} couriers x {len(tenants)} tenants")
+
+            orders = Assignment.objects.bulk_create(
+                [
+                    Assignment(tenant_id=tenants[0], order_id=uuid.uuid4(),
+                               pickup_location=self._point(), dropoff_location=self._point())
+                    for _ in range(options["orders"])
+                ]
+            )
+            latencies, unassigned = [], 0
+            for order in orders:
+                started = time.perf_counter()
+                try:
+                    assignment_engine.assign(order.id)
+                except assignment_engine.NoCourierAvailable:
+                    unassigned += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            self.stdout.write(
+                f"{len(orders):,} assignments: p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms  "
+                f"max {max(latencies):.2f} ms  unassigned {unassigned}"
+            )
+        finally:
+            courier_ids = [str(c) for c in Assignment.objects.filter(tenant_id__in=tenants)
+                           .exclude(courier_id=None).values_list("courier_id", flat=True).distinct()]
+            for i in range(0, len(courier_ids), 1000):
+                batch = courier_ids[i : i + 1000]
+                load_ledger.r.delete(*[load_ledger.LOAD_KEY.format(c) for c in batch])
+                load_ledger.r.srem(load_ledger.DIRTY_KEY, *batch)
+            Assignment.objects.filter(tenant_id__in=tenants).delete()
+            CourierLoad.objects.filter(tenant_id__in=tenants).delete()
+
+    def _point(self):
+        return Point(random.uniform(*BOX["lon"]), random.uniform(*BOX["lat"]), srid=4326)
@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from app.utils import assignment_engine, batch_assignment
+
+BOX = {"lat": (6.40, 6.70), "lon": (3.20, 3.60)}
+
+
+class Command(BaseCommand):
+    help = "Time cost-matrix build and Hungarian solve for NxN waves and compare the result with greedy assignment."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,5000")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        for n in [int(s) for s in options["sizes"].split(",")]:
+            orders, couriers = self._wave(rng, n)
+            started = time.perf_counter()
+            cost, _, _ = batch_assignment.cost_matrix(orders, couriers)
+            built = time.perf_counter() - started
+
+            started = time.perf_counter()
+            rows, cols = batch_assignment.solve(cost)
+            solved = time.perf_counter() - started
+            optimal = float(cost[rows, cols].sum())
+
+            started = time.perf_counter()
+            greedy_cost, greedy_count = self._greedy(cost)
+            greedy = time.perf_counter() - started
+            self.stdout.write(
+                f"{n:>5} x {cost.shape[1]:<5} build {built:6.2f}s  solve {solved:7.2f}s  greedy {greedy:6.2f}s | "
+                f"assigned {len(rows):,} vs {greedy_count:,}  cost/order {optimal / max(len(rows), 1):.3f} "
+                f"vs {greedy_cost / max(greedy_count, 1):.3f}"
+            )
+
+    def _wave(self, rng, n):
+        """n orders and n couriers with exactly one free slot each, so the matrix is square."""
+        def points():
+            return rng.uniform(*BOX["lat"], n), rng.uniform(*BOX["lon"], n)
+
+        lat, lon = points()
+        drop_lat, drop_lon = points()
+        orders = {
+            "lat": lat,
+            "lon": lon,
+            "trip_km": np.hypot(drop_lat - lat, drop_lon - lon) * 111.0,
+            "minutes_left": rng.uniform(20, 90, n),
+        }
+        c_lat, c_lon = points()
+        couriers = {
+            "lat": c_lat,
+            "lon": c_lon,
+            "load": np.full(n, assignment_engine.MAX_ACTIVE_ASSIGNMENTS - 1, dtype=np.float64),
+            "performance": rng.uniform(60, 100, n),
+        }
+        return orders, couriers
+
+    def _greedy(self, cost):
+        """One order at a time, in arrival order, to the cheapest free slot (the single-order engine)."""
+        free = np.ones(cost.shape[1], dtype=bool)
+        total, count = 0.0, 0
+        for row in cost:
+            masked = np.where(free, row, np.inf)
+            col = int(masked.argmin())
+            if masked[col] >= batch_assignment.INFEASIBLE:
+                continue
+            free[col] = False
+            total += float(row[col])
+            count += 1
+        return total, count
@@ -1,5 +1,7 @@
 import uuid
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GistIndex
+from django.db.models import Q
 from django.utils import timezone
 
 class CourierLoad(models.Model):
@@ -25,6 +27,12 @@ class CourierLoad(models.Model):
         indexes = [
             models.Index(fields=["tenant_id"]),
             models.Index(fields=["status"]),
+            # KNN candidate search for the assignment engine (needs the btree_gist extension for tenant_id).
+            GistIndex(
+                fields=["tenant_id", "last_location"],
+                name="courier_loads_available_knn",
+                condition=Q(status="available"),
+            ),
         ]
 
     def __str__(self):
@@ -0,0 +1,20 @@
+from celery import shared_task
+from app.utils import batch_assignment
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="dispatch.run_assignment_waves")
+def run_assignment_waves():
+    """Solve one wave per tenant whose oldest pending order has waited DISPATCH_BATCH_WINDOW_SECONDS.
+
+    Schedule it every DISPATCH_BATCH_WINDOW_SECONDS so no order waits more than about two windows.
+    """
+    totals = {"assigned": 0, "pending": 0}
+    for tenant_id in batch_assignment.due_tenants():
+        assigned, pending = batch_assignment.run_wave(tenant_id)
+        totals["assigned"] += assigned
+        totals["pending"] += pending
+        logger.info(f"[Dispatch] Wave for tenant {tenant_id}: {assigned} assigned, {pending} left pending")
+    return totals
@@ -0,0 +1,23 @@
+from celery import shared_task
+from app.utils import load_ledger
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="dispatch.write_back_courier_loads")
+def write_back_courier_loads():
+    """Persist changed ledger counters to courier_loads (schedule every few seconds)."""
+    written = load_ledger.write_back()
+    if written:
+        logger.info(f"[Dispatch] Wrote back load counters for {written} couriers")
+    return written
+
+
+@shared_task(name="dispatch.reconcile_courier_loads")
+def reconcile_courier_loads():
+    """Repair ledger counters that disagree with open Assignments on two consecutive runs."""
+    corrected = load_ledger.reconcile()
+    if corrected:
+        logger.warning(f"[Dispatch] Reconciled load counters for {corrected} couriers")
+    return corrected
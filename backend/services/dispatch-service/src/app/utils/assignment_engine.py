@@ -0,0 +1,126 @@
+"""
+Nearest-courier assignment. Candidates come from a KNN index scan (`<->` on
+CourierLoad.last_location), are scored in one NumPy pass on distance, load and
+performance, and the best one that still has capacity is claimed in the Redis
+load ledger before the transaction that assigns the order and inserts it into
+the courier's route plan; the claim is handed back if that transaction does not
+commit.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from app.models import Assignment, CourierLoad
+from app.utils import geodesy, load_ledger, route_planner
+
+# Tunables; the service reads them from settings when present.
+CANDIDATE_LIMIT = getattr(settings, "DISPATCH_CANDIDATE_LIMIT", 32)
+MAX_PICKUP_KM = getattr(settings, "DISPATCH_MAX_PICKUP_KM", 15.0)
+MAX_ACTIVE_ASSIGNMENTS = getattr(settings, "DISPATCH_MAX_ACTIVE_ASSIGNMENTS", 3)
+AVERAGE_SPEED_KMH = getattr(settings, "DISPATCH_AVERAGE_SPEED_KMH", 25.0)
+# Relative weight of each normalized cost term (distance / MAX_PICKUP_KM, load / capacity,
+# shortfall from a perfect performance_score of 100).
+WEIGHTS = getattr(settings, "DISPATCH_SCORE_WEIGHTS", {"distance": 0.6, "load": 0.25, "performance": 0.15})
+
+# The partial GiST index on (tenant_id, last_location) keeps this an index-ordered scan that
+# stops after LIMIT rows, independent of fleet size.
+CANDIDATES_SQL = f"""
+    SELECT courier_id, ST_Y(last_location::geometry), ST_X(last_location::geometry),
+           active_assignments, performance_score
+    FROM {CourierLoad._meta.db_table}
+    WHERE tenant_id = %(tenant_id)s AND status = 'available' AND last_location IS NOT NULL
+      AND active_assignments < %(capacity)s
+    ORDER BY last_location <-> ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)::geography
+    LIMIT %(limit)s
+"""
+
+
+class NoCourierAvailable(Exception):
+    """No available courier with spare capacity within MAX_PICKUP_KM of the pickup."""
+
+
+def candidates(tenant_id, lat, lon, limit=CANDIDATE_LIMIT):
+    """Nearest available couriers as column arrays: ids, lats, lons, loads, scores."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            CANDIDATES_SQL,
+            {"tenant_id": str(tenant_id), "lat": lat, "lon": lon, "limit": limit, "capacity": MAX_ACTIVE_ASSIGNMENTS},
+        )
+        rows = cursor.fetchall()
+    if not rows:
+        return None
+    ids, lats, lons, loads, perf = zip(*rows)
+    return {
+        "courier_id": list(ids),
+        "lat": np.array(lats),
+        "lon": np.array(lons),
+        "load": np.array(loads, dtype=np.float64),
+        "performance": np.array(perf, dtype=np.float64),
+    }
+
+
+def score(cands, lat, lon):
+    """(cost, distance_km) per candidate; lower cost is better, out-of-range candidates get +inf."""
+    distance = geodesy.haversine(cands["lat"], cands["lon"], lat, lon)
+    cost = (
+        WEIGHTS["distance"] * distance / MAX_PICKUP_KM
+        + WEIGHTS["load"] * cands["load"] / MAX_ACTIVE_ASSIGNMENTS
+        + WEIGHTS["performance"] * (100.0 - np.clip(cands["performance"], 0.0, 100.0)) / 100.0
+    )
+    cost[distance > MAX_PICKUP_KM] = np.inf
+    return cost, distance
+
+
+def claim(courier_id):
+    """Take one unit of a courier's capacity if it is still available; True on success."""
+    return load_ledger.claim(courier_id, MAX_ACTIVE_ASSIGNMENTS)
+
+
+def assign(assignment_id):
+    """
+    Assign a pending Assignment to the best-scoring nearby courier and return it.
+
+    Candidates are tried in cost order; one that filled up concurrently (the ledger refuses
+    the claim) is skipped, so two dispatchers never over-fill a courier. Raises
+    NoCourierAvailable and leaves the assignment pending when nobody fits.
+    """
+    claimed = None
+    try:
+        with transaction.atomic():
+            assignment = Assignment.objects.select_for_update().get(id=assignment_id)
+            if assignment.status != "pending":
+                return assignment
+            lat, lon = assignment.pickup_location.y, assignment.pickup_location.x
+            cands = candidates(assignment.tenant_id, lat, lon)
+            if cands is None:
+                raise NoCourierAvailable(f"No available courier for assignment {assignment_id}")
+
+            cost, distance = score(cands, lat, lon)
+            for i in np.argsort(cost, kind="stable"):
+                if not np.isfinite(cost[i]):
+                    break
+                if not claim(cands["courier_id"][i]):
+                    continue
+                claimed = cands["courier_id"][i]
+                trip_km = float(geodesy.haversine(
+                    lat, lon, assignment.dropoff_location.y, assignment.dropoff_location.x
+                ))
+                assignment.courier_id = claimed
+                assignment.status = "assigned"
+                assignment.distance_km = round(trip_km, 3)
+                assignment.estimated_duration_min = int(
+                    np.ceil((float(distance[i]) + trip_km) / AVERAGE_SPEED_KMH * 60)
+                )
+                assignment.save(
+                    update_fields=["courier_id", "status", "distance_km", "estimated_duration_min", "updated_at"]
+                )
+                route_planner.replan(assignment.courier_id, new_ids=[assignment.id])
+                assignment.refresh_from_db(fields=["route_data", "estimated_duration_min"])
+                return assignment
+    except Exception:
+        # Also covers a failed COMMIT (serialization error, dropped connection), raised on
+        # leaving the atomic block after the body succeeded.
+        if claimed is not None:
+            load_ledger.release(claimed, MAX_ACTIVE_ASSIGNMENTS)
+        raise
+    raise NoCourierAvailable(f"No courier within {MAX_PICKUP_KM} km has capacity for assignment {assignment_id}")
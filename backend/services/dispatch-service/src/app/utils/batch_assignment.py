@@ -0,0 +1,200 @@
+"""
+Wave (batch) assignment. Pending Assignments accumulate for up to BATCH_WINDOW_SECONDS;
+each wave builds one order x courier-slot cost matrix from pickup distance, courier load
+and performance, and projected SLA lateness, and solves it optimally with the Hungarian
+method (scipy's linear_sum_assignment) instead of assigning greedily order by order.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from scipy.optimize import linear_sum_assignment
+
+from app.models import Assignment, CourierLoad
+from app.utils import assignment_engine, geodesy, load_ledger, route_planner
+
+BATCH_WINDOW_SECONDS = getattr(settings, "DISPATCH_BATCH_WINDOW_SECONDS", 15)
+BATCH_MAX_ORDERS = getattr(settings, "DISPATCH_BATCH_MAX_ORDERS", 5000)
+# Cost per minute of projected lateness, relative to the engine's normalized weights.
+SLA_WEIGHT = getattr(settings, "DISPATCH_BATCH_SLA_WEIGHT", 0.02)
+# Nearest couriers kept per order when a wave's area holds many more couriers than orders.
+CANDIDATES_PER_ORDER = getattr(settings, "DISPATCH_BATCH_CANDIDATES_PER_ORDER", 16)
+INFEASIBLE = 1e6
+
+COURIERS_SQL = f"""
+    SELECT courier_id, ST_Y(last_location::geometry), ST_X(last_location::geometry),
+           active_assignments, performance_score
+    FROM {CourierLoad._meta.db_table}
+    WHERE tenant_id = %(tenant_id)s AND status = 'available' AND last_location IS NOT NULL
+      AND active_assignments < %(capacity)s
+      AND last_location && ST_MakeEnvelope(%(west)s, %(south)s, %(east)s, %(north)s, 4326)::geography
+"""
+
+
+def _nearest_columns(order_lat, order_lon, courier_lat, courier_lon, k, rows_per_chunk=256):
+    """Union of each order's k nearest couriers, computed in row chunks to bound memory."""
+    keep = set()
+    for start in range(0, len(order_lat), rows_per_chunk):
+        dist = geodesy.distance_matrix(
+            order_lat[start : start + rows_per_chunk], order_lon[start : start + rows_per_chunk],
+            courier_lat, courier_lon, dtype=np.float32,
+        )
+        keep.update(np.argpartition(dist, k - 1, axis=1)[:, :k].ravel().tolist())
+    return np.array(sorted(keep))
+
+
+def cost_matrix(orders, couriers):
+    """
+    Cost of giving each order to each courier slot, plus the pickup distance per slot.
+
+    `orders` holds arrays lat, lon, trip_km and minutes_left (inf without deadline);
+    `couriers` holds lat, lon, load, performance. A courier contributes one column per
+    unit of spare capacity, each priced at the load the courier already carries by then, so
+    the solver can hand a courier several orders of the same wave.
+    """
+    capacity = assignment_engine.MAX_ACTIVE_ASSIGNMENTS
+    weights = assignment_engine.WEIGHTS
+    spare = (capacity - couriers["load"]).astype(np.int64)
+    slot_courier = np.repeat(np.arange(len(spare)), spare)
+    slot_load = couriers["load"][slot_courier] + (
+        np.arange(len(slot_courier)) - np.repeat(np.cumsum(spare) - spare, spare)
+    )
+
+    pickup_km = geodesy.distance_matrix(
+        orders["lat"], orders["lon"], couriers["lat"][slot_courier], couriers["lon"][slot_courier], dtype=np.float32
+    )
+    # Built in place in float32: a 5k x 5k wave stays around 100 MB per matrix.
+    speed = np.float32(assignment_engine.AVERAGE_SPEED_KMH / 60)
+    lateness = (pickup_km + orders["trip_km"].astype(np.float32)[:, None]) / speed
+    lateness -= orders["minutes_left"].astype(np.float32)[:, None]
+    np.maximum(lateness, 0, out=lateness)
+    cost = lateness
+    cost *= np.float32(SLA_WEIGHT)
+    cost += pickup_km * np.float32(weights["distance"] / assignment_engine.MAX_PICKUP_KM)
+    slot_cost = (
+        weights["load"] * slot_load / capacity
+        + weights["performance"] * (100.0 - np.clip(couriers["performance"][slot_courier], 0, 100)) / 100.0
+    )
+    cost += slot_cost.astype(np.float32)[None, :]
+    cost[pickup_km > assignment_engine.MAX_PICKUP_KM] = INFEASIBLE
+    return cost, pickup_km, slot_courier
+
+
+def solve(cost):
+    """Minimum-cost matching as (order_rows, slot_columns), without infeasible pairs."""
+    rows, cols = linear_sum_assignment(cost)
+    feasible = cost[rows, cols] < INFEASIBLE
+    return rows[feasible], cols[feasible]
+
+
+def _couriers(tenant_id, order_lat, order_lon):
+    margin_lat = assignment_engine.MAX_PICKUP_KM / 111.0
+    margin_lon = margin_lat / max(np.cos(np.radians(np.abs(order_lat).max())), 0.01)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            COURIERS_SQL,
+            {"tenant_id": str(tenant_id), "capacity": assignment_engine.MAX_ACTIVE_ASSIGNMENTS,
+             "west": float(order_lon.min() - margin_lon), "east": float(order_lon.max() + margin_lon),
+             "south": float(order_lat.min() - margin_lat), "north": float(order_lat.max() + margin_lat)},
+        )
+        rows = cursor.fetchall()
+    if not rows:
+        return None
+    ids, lats, lons, loads, perf = zip(*rows)
+    couriers = {
+        "courier_id": np.array(ids, dtype=object),
+        "lat": np.array(lats),
+        "lon": np.array(lons),
+        "load": np.array(loads, dtype=np.float64),
+        "performance": np.array(perf, dtype=np.float64),
+    }
+    if len(ids) > CANDIDATES_PER_ORDER * len(order_lat):
+        keep = _nearest_columns(order_lat, order_lon, couriers["lat"], couriers["lon"], CANDIDATES_PER_ORDER)
+        couriers = {key: values[keep] for key, values in couriers.items()}
+    return couriers
+
+
+def run_wave(tenant_id, now=None):
+    """
+    Solve and write one wave for a tenant: returns (assigned, left_pending).
+
+    Pending rows are locked with SKIP LOCKED so a concurrent single-order assign or another
+    wave never blocks this one. Winning slots are claimed in the load ledger; an order whose
+    courier filled up concurrently stays pending for the next wave, and every claim is handed
+    back if the wave does not commit.
+    """
+    now = now or timezone.now()
+    claimed = []
+    try:
+        return _write_wave(tenant_id, now, claimed)
+    except Exception:
+        # Also covers a failed COMMIT, raised on leaving the atomic block after the body succeeded.
+        for courier_id in claimed:
+            load_ledger.release(courier_id, assignment_engine.MAX_ACTIVE_ASSIGNMENTS)
+        raise
+
+
+def _write_wave(tenant_id, now, claimed):
+    """Body of run_wave; every courier whose slot is claimed is appended to `claimed`."""
+    with transaction.atomic():
+        pending = list(
+            Assignment.objects.select_for_update(skip_locked=True)
+            .filter(tenant_id=tenant_id, status="pending")
+            .order_by("created_at")[:BATCH_MAX_ORDERS]
+        )
+        if not pending:
+            return 0, 0
+        orders = {
+            "lat": np.array([a.pickup_location.y for a in pending]),
+            "lon": np.array([a.pickup_location.x for a in pending]),
+            "drop_lat": np.array([a.dropoff_location.y for a in pending]),
+            "drop_lon": np.array([a.dropoff_location.x for a in pending]),
+            "minutes_left": np.array(
+                [(a.sla_deadline - now).total_seconds() / 60 if a.sla_deadline else np.inf for a in pending]
+            ),
+        }
+        orders["trip_km"] = geodesy.haversine(orders["lat"], orders["lon"], orders["drop_lat"], orders["drop_lon"])
+        couriers = _couriers(tenant_id, orders["lat"], orders["lon"])
+        if couriers is None:
+            return 0, len(pending)
+
+        cost, pickup_km, slot_courier = cost_matrix(orders, couriers)
+        rows, cols = solve(cost)
+        updated = []
+        for row, col in zip(rows, cols):
+            courier_id = couriers["courier_id"][slot_courier[col]]
+            if not assignment_engine.claim(courier_id):
+                continue
+            claimed.append(courier_id)
+            assignment = pending[row]
+            trip_km = float(orders["trip_km"][row])
+            assignment.courier_id = courier_id
+            assignment.status = "assigned"
+            assignment.distance_km = round(trip_km, 3)
+            assignment.estimated_duration_min = int(
+                np.ceil((float(pickup_km[row, col]) + trip_km) / assignment_engine.AVERAGE_SPEED_KMH * 60)
+            )
+            assignment.updated_at = now
+            updated.append(assignment)
+        Assignment.objects.bulk_update(
+            updated, ["courier_id", "status", "distance_km", "estimated_duration_min", "updated_at"],
+            batch_size=1000,
+        )
+        by_courier = {}
+        for assignment in updated:
+            by_courier.setdefault(assignment.courier_id, []).append(assignment.id)
+        for courier_id, new_ids in by_courier.items():
+            route_planner.replan(courier_id, new_ids=new_ids, now=now)
+    return len(updated), len(pending) - len(updated)
+
+
+def due_tenants(now=None):
+    """Tenants whose oldest pending order has waited a full window."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=BATCH_WINDOW_SECONDS)
+    return list(
+        Assignment.objects.filter(status="pending", created_at__lte=cutoff)
+        .values_list("tenant_id", flat=True)
+        .distinct()
+    )
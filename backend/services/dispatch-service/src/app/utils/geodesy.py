@@ -0,0 +1,45 @@
+"""
+Vectorized great-circle helpers. All functions take degrees and return kilometers,
+matching the scalar `haversine_distance` in tracking-service. Inputs may be scalars,
+lists or NumPy arrays; pass dtype=np.float32 to halve memory on large batches at
+the cost of roughly meter-level precision.
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine(lat1, lon1, lat2, lon2, dtype=np.float64):
+    """Element-wise haversine distance between two broadcastable sets of points."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=dtype)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))).astype(dtype, copy=False)
+
+
+def distance_matrix(lats_a, lons_a, lats_b, lons_b, dtype=np.float64):
+    """N x M matrix of distances from each point in A to each point in B."""
+    lats_a = np.asarray(lats_a, dtype=dtype)[:, None]
+    lons_a = np.asarray(lons_a, dtype=dtype)[:, None]
+    lats_b = np.asarray(lats_b, dtype=dtype)[None, :]
+    lons_b = np.asarray(lons_b, dtype=dtype)[None, :]
+    return haversine(lats_a, lons_a, lats_b, lons_b, dtype=dtype)
+
+
+def segment_lengths(lats, lons, dtype=np.float64):
+    """Lengths of the consecutive segments of a trace (len(trace) - 1 values)."""
+    lats = np.asarray(lats, dtype=dtype)
+    lons = np.asarray(lons, dtype=dtype)
+    return haversine(lats[:-1], lons[:-1], lats[1:], lons[1:], dtype=dtype)
+
+
+def cumulative_path_length(lats, lons, dtype=np.float64):
+    """Distance travelled up to each point of a trace; the first value is 0."""
+    lengths = segment_lengths(lats, lons, dtype=dtype)
+    return np.concatenate((np.zeros(1, dtype=dtype), np.cumsum(lengths, dtype=dtype)))
+
+
+def path_length(lats, lons, dtype=np.float64):
+    """Total length of a trace."""
+    if len(lats) < 2:
+        return 0.0
+    return float(segment_lengths(lats, lons, dtype=dtype).sum(dtype=np.float64))
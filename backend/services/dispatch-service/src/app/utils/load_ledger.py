@@ -0,0 +1,212 @@
+"""
+Redis load ledger for CourierLoad. `active_assignments` and the available/busy status
+live in one hash per courier and are changed only by Lua scripts, so the capacity check
+and the increment are a single atomic step and concurrent dispatchers never serialize on
+Postgres row locks. Changed couriers are queued in a dirty set and written back to
+`courier_loads` in batches; a reconciliation job repairs drift against open Assignments.
+Once a courier is in the ledger, availability changes go through set_status().
+"""
+import logging
+
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from psycopg2.extras import execute_values
+
+from app.models import Assignment, CourierLoad
+
+logger = logging.getLogger(__name__)
+
+r = redis.StrictRedis.from_url(getattr(settings, "CELERY_BROKER_URL", "redis://redis:6379/0"))
+
+CAPACITY = getattr(settings, "DISPATCH_MAX_ACTIVE_ASSIGNMENTS", 3)
+WRITE_BACK_BATCH = getattr(settings, "DISPATCH_LOAD_WRITE_BACK_BATCH", 5000)
+OPEN_STATUSES = ("assigned", "accepted", "in_transit")
+
+LOAD_KEY = "dispatch:load:courier:{}"
+DIRTY_KEY = "dispatch:load:dirty"
+DRIFT_KEY = "dispatch:load:drift"
+
+# KEYS: load hash, dirty set. ARGV: courier_id, capacity.
+# Returns the new active count, 0 when the courier is not available or full, -1 when not seeded.
+CLAIM = r.register_script("""
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status then return -1 end
+if status ~= 'available' then return 0 end
+local active = tonumber(redis.call('HGET', KEYS[1], 'active'))
+local capacity = tonumber(ARGV[2])
+if active >= capacity then return 0 end
+active = redis.call('HINCRBY', KEYS[1], 'active', 1)
+if active >= capacity then redis.call('HSET', KEYS[1], 'status', 'busy') end
+redis.call('SADD', KEYS[2], ARGV[1])
+return active
+""")
+
+# Same keys/args as CLAIM. Returns the new active count, -1 when not seeded.
+RELEASE = r.register_script("""
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status then return -1 end
+local active = tonumber(redis.call('HGET', KEYS[1], 'active'))
+if active > 0 then active = redis.call('HINCRBY', KEYS[1], 'active', -1) end
+if status == 'busy' and active < tonumber(ARGV[2]) then redis.call('HSET', KEYS[1], 'status', 'available') end
+redis.call('SADD', KEYS[2], ARGV[1])
+return active
+""")
+
+# KEYS: load hash, dirty set. ARGV: courier_id, capacity, expected active, corrected active.
+# Compare-and-set used by reconciliation: only applies if nobody moved the counter meanwhile.
+CORRECT = r.register_script("""
+local active = redis.call('HGET', KEYS[1], 'active')
+if not active or tonumber(active) ~= tonumber(ARGV[3]) then return 0 end
+local corrected = tonumber(ARGV[4])
+redis.call('HSET', KEYS[1], 'active', corrected)
+local status = redis.call('HGET', KEYS[1], 'status')
+if status ~= 'offline' then
+    redis.call('HSET', KEYS[1], 'status', corrected >= tonumber(ARGV[2]) and 'busy' or 'available')
+end
+redis.call('SADD', KEYS[2], ARGV[1])
+return 1
+""")
+
+
+def _keys(courier_id):
+    return [LOAD_KEY.format(courier_id), DIRTY_KEY]
+
+
+def seed(courier_id):
+    """Load a courier's counters from courier_loads unless the ledger already has them."""
+    load = CourierLoad.objects.filter(courier_id=courier_id).values("active_assignments", "status").first()
+    if load is None:
+        return False
+    key = LOAD_KEY.format(courier_id)
+    pipe = r.pipeline()
+    pipe.hsetnx(key, "active", load["active_assignments"])
+    pipe.hsetnx(key, "status", load["status"])
+    pipe.execute()
+    return True
+
+
+def claim(courier_id, capacity=CAPACITY):
+    """Atomically take one unit of capacity; True if the courier was available and not full."""
+    result = CLAIM(keys=_keys(courier_id), args=[str(courier_id), capacity])
+    if result == -1 and seed(courier_id):
+        result = CLAIM(keys=_keys(courier_id), args=[str(courier_id), capacity])
+    return result > 0
+
+
+def release(courier_id, capacity=CAPACITY):
+    """Return one unit of capacity when an assignment completes, fails or is reassigned."""
+    result = RELEASE(keys=_keys(courier_id), args=[str(courier_id), capacity])
+    if result == -1 and seed(courier_id):
+        result = RELEASE(keys=_keys(courier_id), args=[str(courier_id), capacity])
+    return max(result, 0)
+
+
+def set_status(courier_id, status, capacity=CAPACITY):
+    """Courier went on- or offline. Coming back online resolves to available/busy from the counter."""
+    key = LOAD_KEY.format(courier_id)
+    if not r.exists(key):
+        seed(courier_id)
+    if status != "offline":
+        status = "busy" if int(r.hget(key, "active") or 0) >= capacity else "available"
+    pipe = r.pipeline()
+    pipe.hset(key, "status", status)
+    pipe.sadd(DIRTY_KEY, str(courier_id))
+    pipe.execute()
+
+
+def get(courier_id):
+    values = r.hgetall(LOAD_KEY.format(courier_id))
+    if not values:
+        return None
+    return {"active_assignments": int(values[b"active"]), "status": values[b"status"].decode()}
+
+
+def write_back(batch_size=WRITE_BACK_BATCH):
+    """
+    Flush dirty counters to courier_loads with one UPDATE ... FROM (VALUES ...) per batch.
+    Couriers popped but not written (e.g. on a database error) are re-queued.
+    """
+    written = 0
+    while True:
+        courier_ids = [c.decode() for c in r.spop(DIRTY_KEY, batch_size) or []]
+        if not courier_ids:
+            return written
+        pipe = r.pipeline(transaction=False)
+        for courier_id in courier_ids:
+            pipe.hmget(LOAD_KEY.format(courier_id), "active", "status")
+        rows = [
+            (courier_id, int(active), status.decode())
+            for courier_id, (active, status) in zip(courier_ids, pipe.execute())
+            if active is not None and status is not None
+        ]
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                execute_values(
+                    cursor,
+                    f"""
+                    UPDATE {CourierLoad._meta.db_table} AS c
+                    SET active_assignments = v.active, status = v.status, updated_at = now()
+                    FROM (VALUES %s) AS v (courier_id, active, status)
+                    WHERE c.courier_id = v.courier_id::uuid
+                    """,
+                    rows,
+                    page_size=len(rows) or 1,
+                )
+        except Exception:
+            r.sadd(DIRTY_KEY, *courier_ids)
+            raise
+        written += len(rows)
+
+
+def reconcile():
+    """
+    Compare ledger counters with open Assignments and repair drift.
+
+    A mismatch is corrected only when the same (ledger, actual) pair was seen by the previous
+    run too. Assignments claimed in Redis but not committed yet look like drift for a moment;
+    requiring two runs, spaced far wider than a dispatch transaction, filters those out. The
+    fix is a compare-and-set, so a claim or release that lands in between wins. Returns the
+    number of corrected couriers.
+    """
+    actual = {
+        str(courier_id): n
+        for courier_id, n in Assignment.objects.filter(status__in=OPEN_STATUSES, courier_id__isnull=False)
+        .order_by()
+        .values_list("courier_id")
+        .annotate(n=Count("id"))
+        .values_list("courier_id", "n")
+    }
+    previous = {k.decode(): v.decode() for k, v in r.hgetall(DRIFT_KEY).items()}
+    drift, corrected = {}, 0
+
+    cursor = 0
+    while True:
+        cursor, keys = r.scan(cursor, match=LOAD_KEY.format("*"), count=1000)
+        if keys:
+            pipe = r.pipeline(transaction=False)
+            for key in keys:
+                pipe.hget(key, "active")
+            for key, active in zip(keys, pipe.execute()):
+                if active is None:
+                    continue
+                courier_id = key.decode().rsplit(":", 1)[1]
+                expected = actual.get(courier_id, 0)
+                if int(active) == expected:
+                    continue
+                observed = f"{int(active)}:{expected}"
+                if previous.get(courier_id) == observed:
+                    corrected += CORRECT(keys=_keys(courier_id), args=[courier_id, CAPACITY, int(active), expected])
+                    logger.warning(f"[LoadLedger] Courier {courier_id} drifted: ledger {int(active)}, open {expected}")
+                else:
+                    drift[courier_id] = observed
+        if cursor == 0:
+            break
+
+    pipe = r.pipeline()
+    pipe.delete(DRIFT_KEY)
+    if drift:
+        pipe.hset(DRIFT_KEY, mapping=drift)
+    pipe.execute()
+    return corrected
@@ -0,0 +1,207 @@
+"""
+Multi-drop route planning per courier. A courier's open assignments become pickup and
+drop-off stops; the sequence starts from the courier's last location, keeps every pickup
+before its drop-off and is priced as distance plus a penalty per minute a drop-off lands
+after its `sla_deadline`. New orders are cheapest-inserted into the stored sequence and
+then polished with 2-opt and or-opt moves over a precomputed distance matrix, so adding
+an order reuses the existing plan instead of re-solving from scratch.
+
+The plan (stop sequence, leg distances, ETAs) is written to `route_data` of each of the
+courier's open assignments.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from app.models import Assignment, CourierLoad
+from app.utils import geodesy
+
+OPEN_STATUSES = ("assigned", "accepted", "in_transit")
+AVERAGE_SPEED_KMH = getattr(settings, "DISPATCH_AVERAGE_SPEED_KMH", 25.0)
+STOP_SERVICE_MIN = getattr(settings, "DISPATCH_STOP_SERVICE_MIN", 3.0)
+# Kilometres of detour worth accepting to save one minute of SLA lateness.
+LATE_PENALTY_KM_PER_MIN = getattr(settings, "DISPATCH_LATE_PENALTY_KM_PER_MIN", 2.0)
+MAX_SEARCH_PASSES = getattr(settings, "DISPATCH_ROUTE_MAX_PASSES", 20)
+OR_OPT_SEGMENT = 3
+
+
+class Problem:
+    """Stops of one courier: node 0 is the start, nodes 1..n are stops."""
+
+    def __init__(self, start, stops, now):
+        self.stops = stops
+        lats = np.array([start[0]] + [s["lat"] for s in stops])
+        lons = np.array([start[1]] + [s["lon"] for s in stops])
+        self.dist = geodesy.distance_matrix(lats, lons, lats, lons)
+        self.minutes_per_km = 60.0 / AVERAGE_SPEED_KMH
+        self.deadline = np.array(
+            [np.inf] + [
+                (s["deadline"] - now).total_seconds() / 60 if s["type"] == "dropoff" and s["deadline"] else np.inf
+                for s in stops
+            ]
+        )
+        # pickup node -> its drop-off node
+        self.pairs = {}
+        by_key = {(s["assignment_id"], s["type"]): i + 1 for i, s in enumerate(stops)}
+        for (assignment_id, kind), node in by_key.items():
+            if kind == "pickup":
+                self.pairs[node] = by_key[(assignment_id, "dropoff")]
+
+    def feasible(self, route):
+        position = {node: i for i, node in enumerate(route)}
+        return all(position[p] < position[d] for p, d in self.pairs.items() if p in position and d in position)
+
+    def schedule(self, route):
+        """(leg_km, arrival minutes) per stop of `route`."""
+        legs = self.dist[[0] + route[:-1], route] if route else np.zeros(0)
+        arrival = np.cumsum(legs * self.minutes_per_km + STOP_SERVICE_MIN) - STOP_SERVICE_MIN
+        return legs, arrival
+
+    def cost(self, route):
+        legs, arrival = self.schedule(route)
+        lateness = np.maximum(arrival - self.deadline[route], 0).sum() if route else 0.0
+        return float(legs.sum() + LATE_PENALTY_KM_PER_MIN * lateness)
+
+
+def cheapest_insertion(problem, route, pickup, dropoff):
+    """Insert a pickup/drop-off pair (dropoff alone when pickup is None) at its cheapest positions."""
+    best, best_cost = None, np.inf
+    pickup_slots = [None] if pickup is None else range(len(route) + 1)
+    for i in pickup_slots:
+        base = route if i is None else route[:i] + [pickup] + route[i:]
+        first = 0 if i is None else i + 1
+        for j in range(first, len(base) + 1):
+            candidate = base[:j] + [dropoff] + base[j:]
+            cost = problem.cost(candidate)
+            if cost < best_cost:
+                best, best_cost = candidate, cost
+    return best
+
+
+def improve(problem, route, max_passes=MAX_SEARCH_PASSES):
+    """First-improvement 2-opt (segment reversal) and or-opt (move 1-3 stops) until a local optimum."""
+    current = problem.cost(route)
+    for _ in range(max_passes):
+        improved = False
+        n = len(route)
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                candidate = route[:i] + route[i : j + 1][::-1] + route[j + 1 :]
+                if problem.feasible(candidate):
+                    cost = problem.cost(candidate)
+                    if cost < current - 1e-9:
+                        route, current, improved = candidate, cost, True
+        for length in range(1, OR_OPT_SEGMENT + 1):
+            for i in range(n - length + 1):
+                segment, rest = route[i : i + length], route[:i] + route[i + length :]
+                for k in range(len(rest) + 1):
+                    if k == i:
+                        continue
+                    candidate = rest[:k] + segment + rest[k:]
+                    if problem.feasible(candidate):
+                        cost = problem.cost(candidate)
+                        if cost < current - 1e-9:
+                            route, current, improved = candidate, cost, True
+                            break
+        if not improved:
+            break
+    return route
+
+
+def _stops(assignments):
+    stops = []
+    for a in assignments:
+        if a.status != "in_transit":
+            stops.append({"assignment_id": str(a.id), "order_id": str(a.order_id), "type": "pickup",
+                          "lat": a.pickup_location.y, "lon": a.pickup_location.x, "deadline": None})
+        stops.append({"assignment_id": str(a.id), "order_id": str(a.order_id), "type": "dropoff",
+                      "lat": a.dropoff_location.y, "lon": a.dropoff_location.x, "deadline": a.sla_deadline})
+    return stops
+
+
+def _previous_sequence(assignments):
+    """Stop keys of the most recent stored plan among the courier's open assignments."""
+    plans = [a.route_data for a in assignments if a.route_data.get("stops")]
+    if not plans:
+        return []
+    latest = max(plans, key=lambda plan: plan.get("planned_at", ""))
+    return [(stop["assignment_id"], stop["type"]) for stop in latest["stops"]]
+
+
+def plan(start, assignments, now, new_ids=()):
+    """
+    Order the stops of `assignments` from `start` (lat, lon) and return route_data.
+
+    Stops already in the stored plan keep their order; stops of `new_ids` (and any open
+    assignment the stored plan does not know yet) are cheapest-inserted, then the whole
+    sequence goes through local search.
+    """
+    stops = _stops(assignments)
+    problem = Problem(start, stops, now)
+    node = {(s["assignment_id"], s["type"]): i + 1 for i, s in enumerate(stops)}
+    new_ids = {str(i) for i in new_ids}
+
+    route = [node[key] for key in _previous_sequence(assignments) if key in node and key[0] not in new_ids]
+    placed = set(route)
+    for a in assignments:
+        pickup, dropoff = node.get((str(a.id), "pickup")), node[(str(a.id), "dropoff")]
+        if dropoff in placed:
+            continue
+        route = [n for n in route if n != pickup]
+        route = cheapest_insertion(problem, route, pickup, dropoff)
+        placed.update(n for n in (pickup, dropoff) if n is not None)
+    route = improve(problem, route)
+
+    legs, arrival = problem.schedule(route)
+    return {
+        "planned_at": now.isoformat(),
+        "total_km": round(float(legs.sum()), 3),
+        "stops": [
+            {
+                "assignment_id": stops[n - 1]["assignment_id"],
+                "order_id": stops[n - 1]["order_id"],
+                "type": stops[n - 1]["type"],
+                "lat": stops[n - 1]["lat"],
+                "lon": stops[n - 1]["lon"],
+                "leg_km": round(float(leg), 3),
+                "eta": (now + timedelta(minutes=float(minutes))).isoformat(),
+                "eta_min": round(float(minutes), 1),
+                "late_min": round(max(float(minutes - problem.deadline[n]), 0.0), 1),
+            }
+            for n, leg, minutes in zip(route, legs, arrival)
+        ],
+    }
+
+
+def replan(courier_id, new_ids=(), now=None):
+    """
+    Recompute and store the route of one courier, inserting `new_ids` into the current plan.
+    Each open assignment's estimated_duration_min becomes the ETA of its drop-off.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        assignments = list(
+            Assignment.objects.select_for_update()
+            .filter(courier_id=courier_id, status__in=OPEN_STATUSES)
+            .order_by("created_at")
+        )
+        if not assignments:
+            return None
+        load = CourierLoad.objects.filter(courier_id=courier_id).only("last_location").first()
+        if load is not None and load.last_location is not None:
+            start = (load.last_location.y, load.last_location.x)
+        else:
+            first = assignments[0]
+            start = (first.pickup_location.y, first.pickup_location.x)
+
+        route_data = plan(start, assignments, now, new_ids)
+        eta = {s["assignment_id"]: s["eta_min"] for s in route_data["stops"] if s["type"] == "dropoff"}
+        for a in assignments:
+            a.route_data = route_data
+            a.estimated_duration_min = int(np.ceil(eta[str(a.id)]))
+            a.updated_at = now
+        Assignment.objects.bulk_update(assignments, ["route_data", "estimated_duration_min", "updated_at"])
+    return route_data
@@ -1,19 +1,37 @@
+import logging
 import requests
 import os
+from app.utils.http_client import get_client
+
+logger = logging.getLogger(__name__)
 
 IDENTITY_SERVICE_URL = os.getenv("IDENTITY_SERVICE_URL", "http://identity-service:8000")
 DISPATCH_SERVICE_URL = os.getenv("DISPATCH_SERVICE_URL", "http://dispatch-service:8003")
 TRACKING_SERVICE_URL = os.getenv("TRACKING_SERVICE_URL", "http://tracking-service:8004")
 NOTIFICATION_SERVICE_URL = os.getenv("NOTIFICATION_SERVICE_URL", "http://notification-service:8005")
 
+# Pooled keep-alive clients, one per downstream service (see app.utils.http_client).
+dispatch = get_client("dispatch-service", DISPATCH_SERVICE_URL, timeout=10)
+tracking = get_client("tracking-service", TRACKING_SERVICE_URL, timeout=10)
+notification = get_client("notification-service", NOTIFICATION_SERVICE_URL, timeout=10)
+
+
+def _post(client, path, payload):
+    """POST through a pooled client; HTTP error statuses are logged, transport errors raise."""
+    try:
+        return client.post(path, json=payload)
+    except requests.HTTPError as e:
+        logger.warning(f"[ServiceClients] {path} rejected: {e}")
+        return e.response
+
 def notify_dispatch_service(order_id, tenant_id):
     payload = {"order_id": str(order_id), "tenant_id": str(tenant_id)}
-    requests.post(f"{DISPATCH_SERVICE_URL}/api/v1/dispatch/assign/", json=payload, timeout=10)
+    _post(dispatch, "/api/v1/dispatch/assign/", payload)
 
 def update_tracking(order_id, status):
     payload = {"order_id": str(order_id), "status": status}
-    requests.post(f"{TRACKING_SERVICE_URL}/api/v1/tracking/update/", json=payload, timeout=10)
+    _post(tracking, "/api/v1/tracking/update/", payload)
 
 def send_notification(recipient_id, title, message):
     payload = {"recipient_id": str(recipient_id), "title": title, "message": message}
-    requests.post(f"{NOTIFICATION_SERVICE_URL}/api/v1/notify/", json=payload, timeout=10)
+    _post(notification, "/api/v1/notify/", payload)
@@ -25,7 +25,10 @@ class Transaction(models.Model):
 
     class Meta:
         db_table = "transactions"
-        indexes = [models.Index(fields=["tenant_id", "status", "provider"])]
+        indexes = [
+            models.Index(fields=["tenant_id", "status", "provider"]),
+            models.Index(fields=["tenant_id", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.reference} ({self.status})"
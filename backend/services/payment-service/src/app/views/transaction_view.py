@@ -1,27 +1,85 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import BasePermission, IsAuthenticated
 from rest_framework.decorators import action
 from app.models.transaction import Transaction
 from app.serializers.transaction_serializer import TransactionSerializer
 from app.integrations.paystack_client import PaystackClient
 from app.integrations.flutterwave_client import FlutterwaveClient
 from app.integrations.stripe_client import StripeClient
+from app.utils import streaming_export
 from django.conf import settings
 from django.utils import timezone
+from datetime import datetime
 import uuid, logging
 
 logger = logging.getLogger(__name__)
 
+class CanExportTransactions(BasePermission):
+    """Tenant-wide transaction exports are for staff and finance roles, not customers."""
+
+    def has_permission(self, request, view):
+        if request.user.is_staff:
+            return True
+        role = getattr(request.user, "role", None)
+        if role is None and hasattr(request.auth, "get"):
+            role = request.auth.get("role")
+        return role in settings.TRANSACTION_EXPORT_ROLES
+
+
 class TransactionViewSet(viewsets.ModelViewSet):
     queryset = Transaction.objects.all().order_by("-created_at")
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
 
+    EXPORT_FIELDS = ("created_at", "id", "reference", "order_id", "customer_id", "amount", "currency",
+                     "provider", "status", "metadata", "updated_at")
+    EXPORT_KEY = ("created_at", "id")
+
     def get_queryset(self):
         user = self.request.user
         return Transaction.objects.filter(customer_id=user.id)
 
+    @action(
+        detail=False, methods=["get"], url_path="export",
+        permission_classes=[IsAuthenticated, CanExportTransactions],
+    )
+    def export(self, request):
+        """
+        Stream a tenant's transactions as CSV or Parquet (?file_format=), optionally bounded by
+        ?from=/?to= (ISO datetimes) and ?status=. Staff and TRANSACTION_EXPORT_ROLES only.
+        Rows are ordered by (created_at, id); resume an interrupted CSV download with
+        ?after=<created_at>,<id> of the last row received. Parquet cannot resume: a cut-off
+        stream has no footer, so the download must be restarted.
+        """
+        query = request.query_params
+        fmt = query.get("file_format", "csv")
+        if fmt not in streaming_export.formats():
+            return Response({"error": f"file_format must be one of {streaming_export.formats()}"}, status=400)
+
+        tenant_id = getattr(request.user, "tenant_id", None)
+        if tenant_id is None and hasattr(request.auth, "get"):
+            tenant_id = request.auth.get("tenant_id")
+        if tenant_id is None and request.user.is_staff:
+            tenant_id = query.get("tenant_id")
+        if not tenant_id:
+            return Response({"error": "No tenant in token"}, status=403)
+
+        try:
+            rows = Transaction.objects.filter(tenant_id=uuid.UUID(str(tenant_id)))
+            if query.get("from"):
+                rows = rows.filter(created_at__gte=datetime.fromisoformat(query["from"]))
+            if query.get("to"):
+                rows = rows.filter(created_at__lt=datetime.fromisoformat(query["to"]))
+            if query.get("status"):
+                rows = rows.filter(status=query["status"])
+            if query.get("after"):
+                key = streaming_export.parse_after(Transaction, self.EXPORT_KEY, query["after"])
+                rows = streaming_export.after(rows, self.EXPORT_KEY, key)
+        except ValueError as e:
+            return Response({"error": f"Invalid query: {e}"}, status=400)
+        return streaming_export.export_response(rows, self.EXPORT_FIELDS, self.EXPORT_KEY, fmt, "transactions")
+
     @action(detail=False, methods=["post"], url_path="initialize")
     def initialize_payment(self, request):
         """Initialize transaction with selected payment gateway"""
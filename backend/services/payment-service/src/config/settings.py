@@ -112,6 +112,12 @@ STATIC_ROOT = BASE_DIR / "static"
 NOTIFICATION_SERVICE_URL = os.getenv("NOTIFICATION_SERVICE_URL", "http://notification-service:8000")
 ANALYTICS_SERVICE_URL = os.getenv("ANALYTICS_SERVICE_URL", "http://analytics-service:8000")
 
+# Streaming exports: rows fetched per server-side cursor round trip / CSV chunk, rows per Parquet row group
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_SIZE", "100000"))
+# Token roles allowed to export a whole tenant's transactions (staff users always are)
+TRANSACTION_EXPORT_ROLES = set(os.getenv("TRANSACTION_EXPORT_ROLES", "admin,finance").split(","))
+
 # Prometheus Metrics Endpoint
 PROMETHEUS_EXPORT_MIGRATIONS = False
 INSTALLED_APPS += ["django_prometheus"]
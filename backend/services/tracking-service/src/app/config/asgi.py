@@ -1,7 +1,6 @@
 import os
 import django
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
 from app.routing import websocket_urlpatterns
@@ -9,11 +8,14 @@ from app.routing import websocket_urlpatterns
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.config.settings")
 django.setup()
 
+# Imported after setup: the middleware resolves the user model at import time.
+from app.middleware.jwt_auth_middleware import JWTAuthMiddleware  # noqa: E402
+
 application = ProtocolTypeRouter(
     {
         "http": get_asgi_application(),
         "websocket": AllowedHostsOriginValidator(
-            AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+            JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
         ),
     }
 )
@@ -1,75 +1,133 @@
+import asyncio
 import json
+import time
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.gis.geos import Point
+from django.conf import settings
 from django.utils import timezone
-from app.models.tracking import Courier, CourierLocation
-from app.tasks.tracking_tasks import check_sla_compliance, detect_route_deviation
+from app.utils import ping_codec
+from app.utils.location_buffer import location_buffer
+
+
+def location_message(latitude, longitude, timestamp=None):
+    """Group message for a courier position; the frame is JSON-encoded once for all subscribers."""
+    return {
+        "type": "broadcast_location",
+        "text": json.dumps(
+            {
+                "event": "courier_location",
+                "latitude": latitude,
+                "longitude": longitude,
+                "timestamp": timestamp or str(timezone.now()),
+            }
+        ),
+    }
 
 
 class TrackingConsumer(AsyncWebsocketConsumer):
     """
     Real-time WebSocket consumer for live courier location updates and tracking stream.
+
+    Subscribers pick a broadcast mode with `?mode=` (see TRACKING_BROADCAST_MODES): map
+    viewers are throttled, ops dashboards get every point. In both modes a subscriber
+    that falls behind only receives the latest position.
     """
 
     async def connect(self):
         self.courier_id = self.scope["url_route"]["kwargs"].get("courier_id")
         self.room_group_name = f"tracking_{self.courier_id}"
 
+        params = parse_qs(self.scope.get("query_string", b"").decode())
+        modes = settings.TRACKING_BROADCAST_MODES
+        mode = params.get("mode", [settings.TRACKING_BROADCAST_DEFAULT_MODE])[0]
+        self.min_interval = modes.get(mode, modes[settings.TRACKING_BROADCAST_DEFAULT_MODE])
+        self._latest_frame = None
+        self._last_sent = 0.0
+        self._writer = None
+
+        subprotocol = None
+        if ping_codec.SUBPROTOCOL in self.scope.get("subprotocols", []):
+            subprotocol = ping_codec.SUBPROTOCOL
+        self.binary_uploads = subprotocol is not None or params.get("protocol") == ["msgpack"]
+
         # Add this connection to Redis group
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
+        await self.accept(subprotocol=subprotocol)
         await self.send(json.dumps({"message": "Tracking connection established"}))
 
     async def disconnect(self, close_code):
+        if self._writer is not None:
+            self._writer.cancel()
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Handles location updates sent by courier apps"""
+        if bytes_data is not None:
+            await self.receive_points(bytes_data)
+            return
+
         data = json.loads(text_data)
         latitude = data.get("latitude")
         longitude = data.get("longitude")
 
         if latitude and longitude:
-            await self.save_location(latitude, longitude)
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "broadcast_location",
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "timestamp": str(timezone.now()),
-                },
+            await self.save_location(
+                latitude, longitude, speed=data.get("speed"), accuracy=data.get("accuracy")
             )
+            await self.channel_layer.group_send(self.room_group_name, location_message(latitude, longitude))
 
-    async def broadcast_location(self, event):
-        """Broadcast courier location to all WebSocket clients"""
-        await self.send(
-            json.dumps(
-                {
-                    "event": "courier_location",
-                    "latitude": event["latitude"],
-                    "longitude": event["longitude"],
-                    "timestamp": event["timestamp"],
-                }
+    async def receive_points(self, bytes_data):
+        """Handles a compact binary frame, possibly a buffered trace of many points"""
+        if not self.binary_uploads:
+            await self.send(json.dumps({"error": "Binary frames require the msgpack protocol"}))
+            return
+        try:
+            points = ping_codec.decode_frame(
+                bytes_data,
+                now=timezone.now(),
+                max_age_s=settings.PING_MAX_AGE_SECONDS,
+                max_skew_s=settings.PING_MAX_CLOCK_SKEW_SECONDS,
             )
+        except ValueError as e:
+            await self.send(json.dumps({"error": str(e)}))
+            return
+        if not points:
+            await self.send(json.dumps({"error": "No point within the accepted time window"}))
+            return
+
+        await self.save_locations(points)
+        # Subscribers only care where the courier is now, not the replayed trace.
+        latitude, longitude, timestamp, _, _ = max(points, key=lambda point: point[2])
+        await self.channel_layer.group_send(
+            self.room_group_name, location_message(latitude, longitude, str(timestamp))
         )
 
+    async def broadcast_location(self, event):
+        """Queue the pre-encoded frame; only the newest pending frame is kept"""
+        self._latest_frame = event["text"]
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._drain())
+
+    async def _drain(self):
+        """Write pending frames no faster than this subscriber's mode allows"""
+        while self._latest_frame is not None:
+            wait = self._last_sent + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            frame, self._latest_frame = self._latest_frame, None
+            await self.send(text_data=frame)
+            self._last_sent = time.monotonic()
+
     @database_sync_to_async
-    def save_location(self, lat, lon):
-        """Persist courier location in DB"""
-        try:
-            courier = Courier.objects.get(id=self.courier_id)
-            CourierLocation.objects.create(
-                courier=courier,
-                location=Point(float(lon), float(lat)),
-                timestamp=timezone.now(),
+    def save_location(self, lat, lon, speed=None, accuracy=None):
+        """Queue courier location for the next batched write"""
+        location_buffer.add(self.courier_id, lat, lon, speed=speed, accuracy=accuracy)
+
+    @database_sync_to_async
+    def save_locations(self, points):
+        """Queue a batch of decoded (lat, lon, timestamp, speed, accuracy) points"""
+        for lat, lon, timestamp, speed, accuracy in points:
+            location_buffer.add(
+                self.courier_id, lat, lon, speed=speed, accuracy=accuracy, timestamp=timestamp
             )
-            courier.last_reported = timezone.now()
-            courier.save(update_fields=["last_reported"])
-
-            # Trigger background SLA checks
-            check_sla_compliance.delay(str(courier.id))
-            detect_route_deviation.delay(str(courier.id))
-        except Courier.DoesNotExist:
-            pass
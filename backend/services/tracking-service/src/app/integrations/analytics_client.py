@@ -1,6 +1,8 @@
+import json
 import requests
 import logging
 from django.conf import settings
+from app.utils.http_client import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -8,18 +10,49 @@ class AnalyticsClient:
     """Handles posting courier tracking & SLA metrics to the Analytics Service."""
 
     def __init__(self):
-        self.base_url = settings.ANALYTICS_SERVICE_URL
-        self.service_token = settings.SERVICE_TOKENS.get("analytics-service")
+        self.client = get_client(
+            "analytics-service",
+            settings.ANALYTICS_SERVICE_URL,
+            token=settings.SERVICE_TOKENS.get("analytics-service"),
+        )
 
     def send_event(self, event_type: str, payload: dict):
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "X-Service-Token": self.service_token,
-            }
-            url = f"{self.base_url}/api/v1/analytics/events/"
-            res = requests.post(url, json={"event_type": event_type, "data": payload}, headers=headers, timeout=5)
-            res.raise_for_status()
+            self.client.post("/api/v1/analytics/events/", json={"event_type": event_type, "data": payload})
             logger.info(f"[AnalyticsClient] Event sent: {event_type}")
         except requests.RequestException as e:
             logger.error(f"[AnalyticsClient] Failed: {e}")
+
+    def send_events(self, events: list):
+        """
+        Ship a batch of events as NDJSON in one request. Returns [(index, reason)] of the
+        events analytics rejected (the rest were stored); raises on failure so the caller
+        can retry.
+        """
+        try:
+            response = self.client.post(
+                "/api/v1/analytics/events/bulk/",
+                data="\n".join(json.dumps(event) for event in events).encode(),
+                headers={"Content-Type": "application/x-ndjson", "X-Service-Name": "tracking-service"},
+            )
+        except requests.HTTPError as e:
+            # Every event rejected: the 400 still lists them, unless the body itself was bad.
+            rejected = self._rejected(e.response)
+            if not rejected:
+                raise
+            return rejected
+        rejected = self._rejected(response) or []
+        logger.info(f"[AnalyticsClient] Batch sent: {len(events) - len(rejected)} events, {len(rejected)} rejected")
+        return rejected
+
+    @staticmethod
+    def _rejected(response):
+        """[(index, reason)] of the events a bulk response reports as rejected, or None."""
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        if not isinstance(body, dict) or "rejected_indexes" not in body:
+            return None
+        reasons = {error["index"]: error["error"] for error in body.get("errors", [])}
+        return [(index, reasons.get(index, "Rejected by analytics")) for index in body["rejected_indexes"]]
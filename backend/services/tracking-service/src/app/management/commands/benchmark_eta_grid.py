@@ -0,0 +1,54 @@
+import random
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.utils import eta_grid
+
+
+class Command(BaseCommand):
+    help = "Time ETA queries against a synthetic travel-speed grid (or the published one with --published)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cells", type=int, default=200, help="Side of the synthetic N x N cell area.")
+        parser.add_argument("--queries", type=int, default=100000)
+        parser.add_argument("--published", action="store_true", help="Use the snapshot published in Redis.")
+
+    def handle(self, *args, **options):
+        grid = eta_grid.current() if options["published"] else self._synthetic(options["cells"])
+        self.stdout.write(f"grid: {len(grid.keys):,} cells, snapshot {len(grid.to_bytes()) / 1e6:.1f} MB")
+
+        n = options["queries"]
+        span = max(len(grid.keys) ** 0.5, 10) * grid.cell_deg
+        lats = 6.4 + np.random.rand(2, n) * span
+        lons = 3.3 + np.random.rand(2, n) * span
+        start = eta_grid.minute_of_week(timezone.now())
+
+        started = time.perf_counter()
+        scalar = [grid.minutes(lats[0, i], lons[0, i], lats[1, i], lons[1, i], start) for i in range(n)]
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"single queries:  {elapsed / n * 1e6:8.1f} us/query")
+
+        started = time.perf_counter()
+        batched = grid.minutes_many(lats[0], lons[0], lats[1], lons[1], start)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"batched queries: {elapsed / n * 1e6:8.2f} us/query")
+        drift = np.abs(batched - np.array(scalar))
+        self.stdout.write(f"batched vs single: max {drift.max():.3f} min, mean {drift.mean():.4f} min")
+
+    def _synthetic(self, side):
+        """Every cell of a side x side area around Lagos with a rush-hour dip; a few hours left sparse."""
+        cell_deg = settings.ETA_GRID_CELL_DEG
+        base_lat, base_lon = int(6.4 / cell_deg), int(3.3 / cell_deg)
+        cells = np.arange(side * side)
+        cell_lat = np.repeat(base_lat + cells // side, eta_grid.HOURS_PER_WEEK)
+        cell_lon = np.repeat(base_lon + cells % side, eta_grid.HOURS_PER_WEEK)
+        hour = np.tile(np.arange(eta_grid.HOURS_PER_WEEK), side * side)
+        rush = np.isin(hour % 24, (7, 8, 17, 18))
+        speed = np.where(rush, 12.0, 28.0) * (0.7 + 0.6 * np.repeat(np.random.rand(side * side), eta_grid.HOURS_PER_WEEK))
+        samples = np.array([random.choice((0, 3, 40, 200)) for _ in range(len(hour))], dtype=np.float64)
+        duration = samples * 0.01
+        return eta_grid.compile_grid(cell_lat, cell_lon, hour, speed * duration, duration, samples)
@@ -0,0 +1,51 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.utils import fleet_state
+from app.utils.location_buffer import PendingPing
+
+
+class Command(BaseCommand):
+    help = "Measure live fleet state read latency for point, nearest-N and radius queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--couriers", type=int, default=50000)
+        parser.add_argument("--queries", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        tenant_id = str(uuid.uuid4())
+        now = timezone.now()
+        pings = [
+            PendingPing(str(uuid.uuid4()), 6.4 + random.random() * 0.3, 3.3 + random.random() * 0.3, 8.0, 5.0, now)
+            for _ in range(options["couriers"])
+        ]
+        courier_ids = [ping.courier_id for ping in pings]
+        for start in range(0, len(pings), 5000):
+            chunk = pings[start:start + 5000]
+            fleet_state.update(chunk, {ping.courier_id: tenant_id for ping in chunk})
+
+        try:
+            n = options["queries"]
+            self._time("get_position", n, lambda: fleet_state.get_position(random.choice(courier_ids)))
+            self._time("nearest(10)", n, lambda: fleet_state.nearest(tenant_id, *self._point(), count=10))
+            self._time("within_radius(1km)", n, lambda: fleet_state.within_radius(tenant_id, *self._point(), 1.0))
+        finally:
+            fleet_state.remove(courier_ids)
+
+    def _point(self):
+        return 6.4 + random.random() * 0.3, 3.3 + random.random() * 0.3
+
+    def _time(self, label, n, query):
+        samples = []
+        for _ in range(n):
+            started = time.perf_counter()
+            query()
+            samples.append((time.perf_counter() - started) * 1e6)
+        samples.sort()
+        self.stdout.write(
+            f"{label:<20} p50 {samples[len(samples) // 2]:8.0f} us   p99 {samples[int(len(samples) * 0.99)]:8.0f} us"
+        )
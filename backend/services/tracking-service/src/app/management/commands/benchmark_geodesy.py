@@ -0,0 +1,48 @@
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from app.tasks.tracking_tasks import haversine_distance
+from app.utils import geodesy
+
+
+class Command(BaseCommand):
+    help = "Compare the scalar haversine against the vectorized geodesy module."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=1000000)
+        parser.add_argument("--matrix", type=int, default=2000, help="Side of the N x N distance matrix.")
+
+    def handle(self, *args, **options):
+        n = options["points"]
+        lats = [6.4 + random.random() * 0.3 for _ in range(n)]
+        lons = [3.3 + random.random() * 0.3 for _ in range(n)]
+
+        started = time.perf_counter()
+        scalar_total = sum(
+            haversine_distance(lats[i], lons[i], lats[i + 1], lons[i + 1]) for i in range(n - 1)
+        )
+        scalar = time.perf_counter() - started
+        self._report("scalar path length", n - 1, scalar)
+
+        lat_arr, lon_arr = np.asarray(lats), np.asarray(lons)
+        for dtype in (np.float64, np.float32):
+            started = time.perf_counter()
+            total = geodesy.path_length(lat_arr, lon_arr, dtype=dtype)
+            elapsed = time.perf_counter() - started
+            self._report(
+                f"vectorized path length ({np.dtype(dtype).name})",
+                n - 1,
+                elapsed,
+                f"speedup {scalar / elapsed:.0f}x, drift {abs(total - scalar_total) * 1000:.2f} m",
+            )
+
+        m = options["matrix"]
+        started = time.perf_counter()
+        geodesy.distance_matrix(lat_arr[:m], lon_arr[:m], lat_arr[m:2 * m], lon_arr[m:2 * m])
+        self._report(f"distance matrix {m}x{m}", m * m, time.perf_counter() - started)
+
+    def _report(self, label, pairs, elapsed, extra=""):
+        self.stdout.write(f"{label:<36} {elapsed * 1000:9.1f} ms  {pairs / elapsed:>14,.0f} pairs/sec  {extra}")
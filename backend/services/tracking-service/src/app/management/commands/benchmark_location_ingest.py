@@ -0,0 +1,79 @@
+import random
+import time
+import uuid
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app.models.tracking import Courier, CourierLocation
+from app.utils.location_buffer import LocationIngestBuffer
+
+
+class _NoTaskBuffer(LocationIngestBuffer):
+    """Buffer variant without Redis side effects or timer thread, so only DB cost is measured."""
+
+    def _after_flush(self, tenants, pings):
+        pass
+
+    def _ensure_flusher(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Measure sustained pings/sec for per-ping writes vs. the batched ingest buffer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pings", type=int, default=20000)
+        parser.add_argument("--couriers", type=int, default=500)
+        parser.add_argument("--max-rows", type=int, default=500)
+        parser.add_argument("--keep", action="store_true", help="Commit the generated rows.")
+
+    def handle(self, *args, **options):
+        # Both paths include analytics emission: one outbox row per ping via post_save
+        # for per-ping writes, one bulk outbox insert per flush for the buffer.
+        with transaction.atomic():
+            tenant_id = uuid.uuid4()
+            couriers = Courier.objects.bulk_create(
+                [
+                    Courier(tenant_id=tenant_id, user_id=uuid.uuid4(), name=f"bench-{i}", phone=f"+000{i}")
+                    for i in range(options["couriers"])
+                ]
+            )
+            courier_ids = [str(c.id) for c in couriers]
+            pings = [
+                (random.choice(courier_ids), 6.45 + random.random() * 0.1, 3.38 + random.random() * 0.1)
+                for _ in range(options["pings"])
+            ]
+
+            legacy_rate = self._run_legacy(pings)
+            batched_rate = self._run_batched(pings, options["max_rows"])
+
+            self.stdout.write(f"pings:            {len(pings)}")
+            self.stdout.write(f"per-ping writes:  {legacy_rate:,.0f} pings/sec")
+            self.stdout.write(f"batched buffer:   {batched_rate:,.0f} pings/sec")
+            self.stdout.write(f"speedup:          {batched_rate / legacy_rate:.1f}x")
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def _run_legacy(self, pings):
+        """Replicates the previous save path: get, INSERT, UPDATE per ping."""
+        started = time.perf_counter()
+        for courier_id, lat, lon in pings:
+            courier = Courier.objects.get(id=courier_id)
+            CourierLocation.objects.create(
+                courier=courier, location=Point(lon, lat), timestamp=timezone.now()
+            )
+            courier.last_reported = timezone.now()
+            courier.save(update_fields=["last_reported"])
+        return len(pings) / (time.perf_counter() - started)
+
+    def _run_batched(self, pings, max_rows):
+        buffer = _NoTaskBuffer(max_rows=max_rows)
+        started = time.perf_counter()
+        for courier_id, lat, lon in pings:
+            buffer.add(courier_id, lat, lon)
+        buffer.flush()
+        return len(pings) / (time.perf_counter() - started)
@@ -0,0 +1,109 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from app.models.tracking import Courier
+from app.utils import location_partitions
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic courier history server-side and measure typical CourierLocation query latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed-rows", type=int, default=0, help="Rows to generate, e.g. 100000000.")
+        parser.add_argument("--couriers", type=int, default=20000)
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--cleanup", action="store_true", help="Delete benchmark couriers and their rows.")
+
+    def handle(self, *args, **options):
+        table = location_partitions.TABLE
+        courier_table = Courier._meta.db_table
+        if options["cleanup"]:
+            deleted, _ = Courier.objects.filter(name__startswith="bench-loc-").delete()
+            self.stdout.write(f"Deleted {deleted} rows.")
+            return
+        if options["seed_rows"]:
+            self._seed(table, courier_table, options)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM \"{courier_table}\" WHERE name LIKE 'bench-loc-%%' LIMIT 1")
+            row = cursor.fetchone()
+        if row is None:
+            self.stderr.write("No benchmark couriers found; run with --seed-rows first.")
+            return
+        courier_id = row[0]
+
+        queries = {
+            "latest point of a courier": (
+                f'SELECT location, "timestamp" FROM "{table}" WHERE courier_id = %s ORDER BY "timestamp" DESC LIMIT 1',
+                [courier_id],
+            ),
+            "1h trace of a courier (yesterday)": (
+                f'SELECT location, "timestamp" FROM "{table}" WHERE courier_id = %s '
+                "AND \"timestamp\" >= now() - interval '25 hours' AND \"timestamp\" < now() - interval '24 hours'",
+                [courier_id],
+            ),
+            "last-hour updates per courier": (
+                f'SELECT courier_id, count(*) FROM "{table}" WHERE "timestamp" >= now() - interval \'1 hour\' '
+                "GROUP BY courier_id",
+                [],
+            ),
+            "30-day rollup trace of a courier": (
+                f'SELECT location, bucket_start FROM "{location_partitions.ROLLUP_TABLE}" WHERE courier_id = %s '
+                "AND bucket_start >= now() - interval '30 days'",
+                [courier_id],
+            ),
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{table}"')
+            self.stdout.write(f"{cursor.fetchone()[0]:,} rows, partitioned={location_partitions.is_partitioned()}")
+            for label, (sql, params) in queries.items():
+                samples = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    samples.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:<36} median {statistics.median(samples):9.2f} ms   max {max(samples):9.2f} ms"
+                )
+
+    def _seed(self, table, courier_table, options):
+        """Generate couriers and evenly spread pings over the last N days entirely inside Postgres."""
+        couriers, rows, days = options["couriers"], options["seed_rows"], options["days"]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO "{courier_table}" (id, tenant_id, user_id, name, phone, vehicle_type, is_active, last_reported) '
+                "SELECT gen_random_uuid(), gen_random_uuid(), gen_random_uuid(), 'bench-loc-' || g, '', '', true, now() "
+                "FROM generate_series(1, %s) g",
+                [couriers],
+            )
+            if location_partitions.is_partitioned():
+                location_partitions.ensure_partitions()
+            per_day = rows // days
+            for day in range(days):
+                started = time.perf_counter()
+                cursor.execute(
+                    f"""
+                    INSERT INTO "{table}" (courier_id, location, speed, accuracy, "timestamp")
+                    SELECT c.ids[1 + (g %% array_length(c.ids, 1))],
+                           ST_SetSRID(ST_MakePoint(3.3 + random() * 0.3, 6.4 + random() * 0.3), 4326)::geography,
+                           random() * 15, 5 + random() * 20,
+                           now() - make_interval(days => %s) - random() * interval '1 day'
+                    FROM generate_series(1, %s) g,
+                         (SELECT array_agg(id) AS ids FROM "{courier_table}" WHERE name LIKE 'bench-loc-%%') c
+                    """,
+                    [day, per_day],
+                )
+                self.stdout.write(f"seeded day -{day}: {per_day:,} rows in {time.perf_counter() - started:.1f}s")
+            if location_partitions.is_partitioned():
+                today = timezone.now().date()
+                for offset in range(days + 1):
+                    location_partitions.rollup_day(today - timedelta(days=offset))
+                location_partitions.brin_cold_partitions()
+            cursor.execute(f'ANALYZE "{table}"')
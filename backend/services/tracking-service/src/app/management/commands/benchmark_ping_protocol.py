@@ -0,0 +1,78 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.utils import ping_codec
+
+
+def ws_frame_overhead(payload_len):
+    """Client-to-server WebSocket header: 2 bytes, extended length, 4-byte mask."""
+    if payload_len < 126:
+        return 6
+    if payload_len < 65536:
+        return 8
+    return 14
+
+
+class Command(BaseCommand):
+    help = "Compare wire size and server decode CPU of JSON vs msgpack courier uploads, per 1M pings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pings", type=int, default=1000000)
+        parser.add_argument("--batch", type=int, default=20, help="Points per frame for buffered uploads.")
+
+    def handle(self, *args, **options):
+        n = options["pings"]
+        start_ts = timezone.now().timestamp()
+        points = [
+            (
+                6.4 + random.random() * 0.3,
+                3.3 + random.random() * 0.3,
+                start_ts + i * 5,
+                random.uniform(0, 15),
+                random.uniform(3, 30),
+            )
+            for i in range(n)
+        ]
+        scale = 1_000_000 / n
+
+        json_frames = [
+            json.dumps({"latitude": lat, "longitude": lon, "speed": speed, "accuracy": acc}).encode()
+            for lat, lon, _, speed, acc in points
+        ]
+        single_frames = [ping_codec.encode_frame([point]) for point in points]
+        batch = options["batch"]
+        batch_frames = [ping_codec.encode_frame(points[i : i + batch]) for i in range(0, n, batch)]
+
+        baseline = self._decode_seconds(json_frames, self._decode_json)
+        baseline_bytes = self._wire_bytes(json_frames)
+        self._report("json text, 1 point/frame", json_frames, baseline_bytes, baseline, scale, baseline_bytes, baseline)
+        for label, frames in (
+            ("msgpack, 1 point/frame", single_frames),
+            (f"msgpack, {batch} points/frame", batch_frames),
+        ):
+            seconds = self._decode_seconds(frames, ping_codec.decode_frame)
+            self._report(label, frames, self._wire_bytes(frames), seconds, scale, baseline_bytes, baseline)
+
+    def _decode_json(self, frame):
+        data = json.loads(frame)
+        return float(data["latitude"]), float(data["longitude"]), timezone.now()
+
+    def _decode_seconds(self, frames, decode):
+        started = time.process_time()
+        for frame in frames:
+            decode(frame)
+        return time.process_time() - started
+
+    def _wire_bytes(self, frames):
+        return sum(len(frame) + ws_frame_overhead(len(frame)) for frame in frames)
+
+    def _report(self, label, frames, wire_bytes, seconds, scale, baseline_bytes, baseline_seconds):
+        self.stdout.write(
+            f"{label:<28} {len(frames):>9,} frames  "
+            f"{wire_bytes * scale / 1e6:8.1f} MB/1M pings ({1 - wire_bytes / baseline_bytes:.0%} saved)  "
+            f"decode {seconds * scale:6.2f} CPU s/1M pings ({1 - seconds / baseline_seconds:.0%} saved)"
+        )
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from app.utils import http_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Keep-alive endpoint that accepts any POST with 202, like the analytics event sink."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(202)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Compare per-call requests.post against pooled sync/async service clients on a local stub server."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=5000)
+        parser.add_argument("--concurrency", type=int, default=16)
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        path = "/api/v1/analytics/events/"
+        payload = {"event_type": "courier_location", "data": {"latitude": 6.5, "longitude": 3.4}}
+        calls, concurrency = options["calls"], options["concurrency"]
+
+        def unpooled(_):
+            requests.post(f"{base_url}{path}", json=payload, timeout=5).raise_for_status()
+
+        client = http_client.get_client("benchmark-stub", base_url)
+
+        def pooled(_):
+            client.post(path, json=payload)
+
+        try:
+            baseline = self._threaded("requests.post per call", unpooled, calls, concurrency)
+            self._threaded("pooled ServiceClient", pooled, calls, concurrency, baseline)
+            if http_client.httpx is not None:
+                self._async("pooled AsyncServiceClient", base_url, path, payload, calls, concurrency, baseline)
+            else:
+                self.stdout.write("httpx not installed; skipping the async client")
+            latency = http_client.get_metrics()["benchmark-stub"]["latency"][path]
+            self.stdout.write(f"pooled latency histogram: p50<={latency['p50_ms']} ms p99<={latency['p99_ms']} ms")
+        finally:
+            server.shutdown()
+
+    def _threaded(self, label, call, calls, concurrency, baseline=None):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(call, range(calls)))
+        return self._report(label, calls, time.perf_counter() - started, baseline)
+
+    def _async(self, label, base_url, path, payload, calls, concurrency, baseline):
+        async def run():
+            client = http_client.get_async_client("benchmark-stub", base_url)
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with semaphore:
+                    await client.post(path, json=payload)
+
+            try:
+                await asyncio.gather(*(one() for _ in range(calls)))
+            finally:
+                await client.aclose()
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        self._report(label, calls, time.perf_counter() - started, baseline)
+
+    def _report(self, label, calls, elapsed, baseline):
+        rate = calls / elapsed
+        gain = f"  ({rate / baseline:.1f}x)" if baseline else ""
+        self.stdout.write(f"{label:<28} {rate:>8,.0f} calls/s{gain}")
+        return rate
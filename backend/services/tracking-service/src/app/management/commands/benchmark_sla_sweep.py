@@ -0,0 +1,92 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app.models.tracking import Courier, OrderRoute, SLAEvent
+from app.tasks.tracking_tasks import ACTIVE_ROUTE_STATUS, evaluate_sla
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the fleet-wide SLA sweep over synthetic active routes, notifications on. Alerts go "
+        "out on commit, which the rolled-back runs never reach; outbox rows are included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000")
+        parser.add_argument("--breach-ratio", type=float, default=0.1)
+        parser.add_argument("--routes-per-courier", type=int, default=20)
+        parser.add_argument(
+            "--legacy-limit",
+            type=int,
+            default=100000,
+            help="Also time the old per-route loop for sizes up to this many routes.",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        for size in sizes:
+            self.stdout.write(f"--- {size:,} active routes")
+            self.stdout.write(f"vectorized sweep: {self._time(size, options, self._sweep):.2f}s")
+            if size <= options["legacy_limit"]:
+                self.stdout.write(f"per-route loop:   {self._time(size, options, self._legacy):.2f}s")
+
+    def _time(self, size, options, runner):
+        with transaction.atomic():
+            self._seed(size, options["breach_ratio"], options["routes_per_courier"])
+            started = time.perf_counter()
+            runner()
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return elapsed
+
+    def _seed(self, size, breach_ratio, routes_per_courier):
+        now = timezone.now()
+        origin = Point(3.38, 6.45)
+        couriers = Courier.objects.bulk_create(
+            [
+                Courier(tenant_id=uuid.uuid4(), user_id=uuid.uuid4(), name=f"Courier {i}", phone=f"+234{i:010d}")
+                for i in range(max(1, size // routes_per_courier))
+            ],
+            batch_size=10000,
+        )
+        batch = []
+        for i in range(size):
+            overdue = random.random() < breach_ratio
+            batch.append(
+                OrderRoute(
+                    order_id=uuid.uuid4(),
+                    courier=couriers[i % len(couriers)],
+                    start_point=origin,
+                    end_point=origin,
+                    status=ACTIVE_ROUTE_STATUS,
+                    expected_sla_minutes=60,
+                    started_at=now - timedelta(minutes=90 if overdue else 30),
+                )
+            )
+            if len(batch) == 10000:
+                OrderRoute.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            OrderRoute.objects.bulk_create(batch)
+
+    def _sweep(self):
+        evaluate_sla()
+
+    def _legacy(self):
+        """The previous implementation: iterate, compare, save one route at a time (signals fired)."""
+        now = timezone.now()
+        for route in OrderRoute.objects.filter(status=ACTIVE_ROUTE_STATUS):
+            elapsed = (now - route.started_at).total_seconds() / 60
+            if elapsed > (route.expected_sla_minutes or 60):
+                SLAEvent.objects.create(
+                    route=route, event_type="SLA_BREACH", notes=f"Exceeded SLA: {elapsed:.1f} minutes"
+                )
+                route.status = "delayed"
+                route.save(update_fields=["status"])
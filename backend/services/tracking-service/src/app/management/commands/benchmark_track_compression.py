@@ -0,0 +1,73 @@
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.utils import track_codec
+
+# Approximate on-disk cost of one CourierLocation row: tuple header, id, courier uuid,
+# geography point, speed, accuracy, timestamp, plus its share of the (courier, timestamp) btree.
+ROW_BYTES_ESTIMATE = 24 + 8 + 16 + 32 + 8 + 8 + 8 + 40
+
+
+class Command(BaseCommand):
+    help = "Report compression ratio and replay throughput of track blobs on a synthetic fleet week."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--couriers", type=int, default=100)
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--trips-per-day", type=int, default=12)
+        parser.add_argument("--trip-minutes", type=int, default=40)
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between pings.")
+        parser.add_argument("--tolerance", type=float, default=3.0, help="Simplification tolerance (m).")
+
+    def handle(self, *args, **options):
+        trips = list(self._synthetic_trips(options))
+        raw_points = sum(len(trip) for trip in trips)
+
+        started = time.perf_counter()
+        blobs = [track_codec.encode(trip, options["tolerance"]) for trip in trips]
+        encode_seconds = time.perf_counter() - started
+        lossless = [track_codec.encode(trip, 0)[0] for trip in trips[:200]]
+        lossless_points = sum(len(trip) for trip in trips[:200])
+
+        stored_bytes = sum(len(blob) for blob, _ in blobs)
+        kept_points = sum(kept for _, kept in blobs)
+
+        started = time.perf_counter()
+        replayed = sum(1 for blob, _ in blobs for _ in track_codec.iter_points(blob))
+        replay_seconds = time.perf_counter() - started
+
+        self.stdout.write(f"trips:                 {len(trips):,}")
+        self.stdout.write(f"raw points:            {raw_points:,} (~{raw_points * ROW_BYTES_ESTIMATE / 1e6:,.1f} MB as rows)")
+        self.stdout.write(f"kept after DP ({options['tolerance']} m): {kept_points:,} ({kept_points / raw_points:.1%})")
+        self.stdout.write(f"stored:                {stored_bytes / 1e6:,.2f} MB ({stored_bytes / raw_points:.2f} B/raw point)")
+        self.stdout.write(f"ratio vs rows:         {raw_points * ROW_BYTES_ESTIMATE / stored_bytes:,.0f}x")
+        self.stdout.write(f"ratio vs 3x float64:   {raw_points * 24 / stored_bytes:,.0f}x")
+        self.stdout.write(
+            f"lossless delta/varint: {sum(len(b) for b in lossless) / lossless_points:.2f} B/point"
+        )
+        self.stdout.write(f"encode throughput:     {raw_points / encode_seconds:,.0f} points/sec")
+        self.stdout.write(f"replay throughput:     {replayed / replay_seconds:,.0f} points/sec")
+
+    def _synthetic_trips(self, options):
+        """Random-walk trips with mostly straight legs and turns, like street driving."""
+        pings = int(options["trip_minutes"] * 60 / options["interval"])
+        start_ts = 1_700_000_000
+        for _ in range(options["couriers"]):
+            for day in range(options["days"]):
+                for trip in range(options["trips_per_day"]):
+                    lat, lon = 6.4 + random.random() * 0.3, 3.3 + random.random() * 0.3
+                    heading = random.random() * 2 * math.pi
+                    ts = start_ts + day * 86400 + trip * 3600
+                    points = []
+                    for _ in range(pings):
+                        if random.random() < 0.05:
+                            heading += random.choice((-1, 1)) * math.pi / 2
+                        step = random.uniform(0, 8) * options["interval"] / 111_000
+                        lat += step * math.cos(heading) + random.gauss(0, 0.00002)
+                        lon += step * math.sin(heading) + random.gauss(0, 0.00002)
+                        ts += options["interval"] + random.uniform(-0.5, 0.5)
+                        points.append((lat, lon, ts))
+                    yield points
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.middleware import jwt_auth_middleware
+from app.middleware.jwt_auth_middleware import JWTAuthMiddleware, token_cache
+
+User = get_user_model()
+USERNAME_PREFIX = "bench-ws-"
+
+
+class Command(BaseCommand):
+    help = "Replay a post-deploy WebSocket reconnect storm through JWTAuthMiddleware and count DB lookups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=20000)
+        parser.add_argument("--attempts", type=int, default=3, help="Connects per client (flapping reconnects).")
+        parser.add_argument("--concurrency", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.bulk_create(
+            [User(username=f"{USERNAME_PREFIX}{i}") for i in range(options["clients"])]
+        )
+        tokens = []
+        for user in users:
+            token = AccessToken.for_user(user)
+            token["tenant_id"] = "bench"
+            token["role"] = "customer"
+            tokens.append(str(token))
+        self.stdout.write(f"{len(tokens):,} clients x {options['attempts']} connects, cold cache each run")
+
+        try:
+            for label, stateless, cached in (
+                ("uncached (DB per connect)", False, False),
+                ("jti cache, DB on miss", False, True),
+                ("jti cache, stateless claims", True, True),
+            ):
+                with override_settings(WS_AUTH_STATELESS=stateless):
+                    self._run(label, tokens, options, cached)
+        finally:
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def _run(self, label, tokens, options, cached):
+        token_cache.clear()
+        db_lookups = 0
+        lookup = jwt_auth_middleware.get_user_from_token
+
+        async def counting_lookup(token_key):
+            nonlocal db_lookups
+            db_lookups += 1
+            return await lookup(token_key)
+
+        async def inner(scope, receive, send):
+            if not cached:
+                token_cache.clear()
+            return scope["user"].is_authenticated
+
+        middleware = JWTAuthMiddleware(inner)
+
+        async def storm():
+            semaphore = asyncio.Semaphore(options["concurrency"])
+
+            async def connect(token):
+                async with semaphore:
+                    scope = {"type": "websocket", "query_string": f"token={token}".encode()}
+                    return await middleware(scope, None, None)
+
+            attempts = [token for _ in range(options["attempts"]) for token in tokens]
+            return await asyncio.gather(*(connect(token) for token in attempts))
+
+        jwt_auth_middleware.get_user_from_token = counting_lookup
+        try:
+            started = time.perf_counter()
+            results = asyncio.run(storm())
+            elapsed = time.perf_counter() - started
+        finally:
+            jwt_auth_middleware.get_user_from_token = lookup
+
+        self.stdout.write(
+            f"{label:<30} {len(results) / elapsed:>9,.0f} handshakes/s  "
+            f"{sum(results):,}/{len(results):,} authenticated  {db_lookups:,} DB lookups  "
+            f"cache hits {token_cache.hits:,}"
+        )
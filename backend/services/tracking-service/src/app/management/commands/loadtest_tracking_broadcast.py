@@ -0,0 +1,76 @@
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.consumers.tracking_consumer import location_message
+from app.routing import websocket_urlpatterns
+
+
+class Command(BaseCommand):
+    help = "Fan live courier positions out to N in-process WebSocket subscribers and report delivery latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=10000)
+        parser.add_argument("--pings", type=int, default=30)
+        parser.add_argument("--rate", type=float, default=2.0, help="Pings per second published.")
+        parser.add_argument("--mode", default="ops", help="Subscriber broadcast mode (map/ops).")
+        parser.add_argument("--connect-batch", type=int, default=500)
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        application = URLRouter(websocket_urlpatterns)
+        courier_id = uuid.uuid4()
+        path = f"/ws/tracking/{courier_id}/?mode={options['mode']}"
+        communicators = []
+
+        started = time.perf_counter()
+        for start in range(0, options["subscribers"], options["connect_batch"]):
+            batch = [
+                WebsocketCommunicator(application, path)
+                for _ in range(min(options["connect_batch"], options["subscribers"] - start))
+            ]
+            await asyncio.gather(*(c.connect() for c in batch))
+            await asyncio.gather(*(c.receive_from() for c in batch))  # connection greeting
+            communicators.extend(batch)
+        self.stdout.write(f"connected {len(communicators):,} subscribers in {time.perf_counter() - started:.1f}s")
+
+        latencies = []
+        listeners = [asyncio.ensure_future(self._listen(c, latencies)) for c in communicators]
+
+        channel_layer = get_channel_layer()
+        started = time.perf_counter()
+        for i in range(options["pings"]):
+            await channel_layer.group_send(f"tracking_{courier_id}", location_message(6.45 + i * 1e-4, 3.38))
+            await asyncio.sleep(1 / options["rate"])
+        await asyncio.sleep(2)
+        publish_seconds = time.perf_counter() - started
+
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*(c.disconnect() for c in communicators), return_exceptions=True)
+
+        if not latencies:
+            self.stderr.write("No frames delivered.")
+            return
+        latencies.sort()
+        expected = options["pings"] * len(communicators)
+        self.stdout.write(f"frames delivered:  {len(latencies):,} of {expected:,} published ({len(latencies) / expected:.1%})")
+        self.stdout.write(f"throughput:        {len(latencies) / publish_seconds:,.0f} frames/sec")
+        for label, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            self.stdout.write(f"{label} latency:       {latencies[int(len(latencies) * q) - 1]:.1f} ms")
+
+    async def _listen(self, communicator, latencies):
+        while True:
+            frame = json.loads(await communicator.receive_from(timeout=60))
+            sent = datetime.fromisoformat(frame["timestamp"])
+            latencies.append((timezone.now() - sent).total_seconds() * 1000)
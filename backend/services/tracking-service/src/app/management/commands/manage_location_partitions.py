@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.utils import location_partitions
+
+
+class Command(BaseCommand):
+    help = "Convert, extend and prune the day-partitioned CourierLocation table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--convert", action="store_true", help="One-time conversion to a partitioned table.")
+        parser.add_argument("--rollup-day", type=date.fromisoformat, help="Downsample one day (YYYY-MM-DD).")
+        parser.add_argument("--list", action="store_true", help="List partitions and their bounds.")
+
+    def handle(self, *args, **options):
+        if options["convert"]:
+            converted = location_partitions.convert_to_partitioned()
+            self.stdout.write("Converted." if converted else "Already partitioned.")
+
+        if not location_partitions.is_partitioned():
+            raise CommandError("CourierLocation is not partitioned; run with --convert first.")
+
+        if options["rollup_day"]:
+            rows = location_partitions.rollup_day(options["rollup_day"])
+            self.stdout.write(f"Rolled up {rows} buckets for {options['rollup_day']}.")
+        elif options["list"]:
+            for name, lower, upper in location_partitions.partitions():
+                self.stdout.write(f"{name:<40} {lower or 'MINVALUE'} -> {upper}")
+        else:
+            for step, result in location_partitions.maintain().items():
+                self.stdout.write(f"{step}: {result}")
@@ -1,10 +1,83 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from urllib.parse import parse_qs
+
 from channels.db import database_sync_to_async
-from rest_framework_simplejwt.tokens import AccessToken
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.tokens import AccessToken
 
 User = get_user_model()
 
+
+class TokenPrincipal:
+    """User stand-in built from token claims alone (stateless claims mode)."""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, claims):
+        self.id = self.pk = claims.get("user_id")
+        self.tenant_id = claims.get("tenant_id")
+        self.role = claims.get("role")
+
+    def __repr__(self):
+        return f"<TokenPrincipal {self.id} tenant={self.tenant_id} role={self.role}>"
+
+
+class TokenPrincipalCache:
+    """
+    Per-process LRU of validated tokens keyed by `jti`.
+
+    Entries expire with the token's `exp`, capped at `max_ttl` so revocations
+    still take effect within a bounded delay. The raw token is fingerprinted so
+    a cache hit is only served for the exact token that was verified.
+    """
+
+    def __init__(self, max_entries=None, max_ttl=None):
+        self.max_entries = max_entries or getattr(settings, "WS_AUTH_CACHE_SIZE", 50000)
+        self.max_ttl = max_ttl or getattr(settings, "WS_AUTH_CACHE_MAX_TTL_SECONDS", 300)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def fingerprint(token_key):
+        return hashlib.blake2b(token_key.encode(), digest_size=16).digest()
+
+    def get(self, jti, token_key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry and entry[2] > now and entry[1] == self.fingerprint(token_key):
+                self._entries.move_to_end(jti)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[jti]
+            self.misses += 1
+        return None
+
+    def set(self, jti, token_key, principal, exp):
+        expires_at = min(exp, time.time() + self.max_ttl)
+        with self._lock:
+            self._entries[jti] = (principal, self.fingerprint(token_key), expires_at)
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+token_cache = TokenPrincipalCache()
+
+
 @database_sync_to_async
 def get_user_from_token(token_key):
     try:
@@ -15,26 +88,50 @@ def get_user_from_token(token_key):
         return None
 
 
+async def authenticate_token(token_key):
+    """
+    Resolve a WebSocket token to a principal, or None.
+
+    Cached tokens skip signature checks and the DB. In stateless mode
+    (WS_AUTH_STATELESS) a cache miss builds a TokenPrincipal from the claims
+    instead of loading the User, so handshakes never touch the database.
+    """
+    if not token_key:
+        return None
+    try:
+        unverified = AccessToken(token_key, verify=False)
+        jti, exp = unverified["jti"], unverified["exp"]
+    except Exception:
+        return None
+
+    principal = token_cache.get(jti, token_key)
+    if principal is not None:
+        return principal
+
+    if getattr(settings, "WS_AUTH_STATELESS", False):
+        try:
+            principal = TokenPrincipal(AccessToken(token_key).payload)
+        except Exception:
+            return None
+    else:
+        principal = await get_user_from_token(token_key)
+        if principal is None:
+            return None
+
+    token_cache.set(jti, token_key, principal, exp)
+    return principal
+
+
 class JWTAuthMiddleware:
     """Middleware for authenticating WebSocket connections using JWT."""
 
     def __init__(self, inner):
         self.inner = inner
 
-    def __call__(self, scope):
-        return JWTAuthMiddlewareInstance(scope, self)
-
-
-class JWTAuthMiddlewareInstance:
-    def __init__(self, scope, middleware):
-        self.scope = scope
-        self.middleware = middleware
-
-    async def __call__(self, receive, send):
-        query_string = self.scope.get("query_string", b"").decode()
+    async def __call__(self, scope, receive, send):
+        query_string = scope.get("query_string", b"").decode()
         params = parse_qs(query_string)
         token_key = params.get("token", [None])[0]
 
-        self.scope["user"] = await get_user_from_token(token_key)
-        inner = self.middleware.inner(self.scope)
-        return await inner(receive, send)
+        scope = dict(scope, user=await authenticate_token(token_key) or AnonymousUser())
+        return await self.inner(scope, receive, send)
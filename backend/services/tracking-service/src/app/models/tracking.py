@@ -28,16 +28,33 @@ class CourierLocation(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
-        indexes = [
-            models.Index(fields=["courier", "timestamp"]),
-            models.Index(fields=["timestamp"]),
-        ]
+        # Range-partitioned by day on `timestamp`; indexes are created per partition
+        # (btree while hot, BRIN once cold) by app.utils.location_partitions.
         ordering = ["-timestamp"]
 
     def __str__(self):
         return f"Location of {self.courier_id} at {self.timestamp}"
 
 
+class CourierLocationRollup(models.Model):
+    """Downsampled courier history: one point per courier per bucket, kept after raw data expires."""
+    id = models.BigAutoField(primary_key=True)
+    courier = models.ForeignKey(Courier, on_delete=models.CASCADE, related_name="location_rollups")
+    bucket_start = models.DateTimeField()
+    location = models.PointField(geography=True)
+    avg_speed = models.FloatField(null=True, blank=True)
+    point_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["courier", "bucket_start"], name="uniq_courier_rollup_bucket"),
+        ]
+        ordering = ["-bucket_start"]
+
+    def __str__(self):
+        return f"Rollup of {self.courier_id} at {self.bucket_start}"
+
+
 class OrderRoute(models.Model):
     """Tracks route-level details of an active order."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -46,8 +63,10 @@ class OrderRoute(models.Model):
     start_point = models.PointField(geography=True)
     end_point = models.PointField(geography=True)
     current_point = models.PointField(geography=True, null=True, blank=True)
+    planned_route = models.LineStringField(geography=True, null=True, blank=True)
     distance_covered = models.FloatField(default=0.0)
     total_distance = models.FloatField(default=0.0)
+    expected_sla_minutes = models.PositiveIntegerField(default=60)
     status = models.CharField(
         max_length=32,
         choices=[
@@ -72,6 +91,32 @@ class OrderRoute(models.Model):
         return f"OrderRoute for {self.order_id}"
 
 
+class CompressedTrack(models.Model):
+    """Compacted GPS trace of a completed route (simplified, delta/varint-encoded)."""
+    id = models.BigAutoField(primary_key=True)
+    route = models.OneToOneField(OrderRoute, on_delete=models.CASCADE, related_name="compressed_track")
+    courier = models.ForeignKey(Courier, on_delete=models.SET_NULL, null=True)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    original_point_count = models.PositiveIntegerField()
+    point_count = models.PositiveIntegerField()
+    tolerance_m = models.FloatField(default=0.0)
+    encoding_version = models.PositiveSmallIntegerField(default=1)
+    data = models.BinaryField()
+    # Set on marker rows (no data) for routes whose trace could not be compacted, so the
+    # compaction job does not pick them up again.
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["courier", "started_at"]),
+        ]
+
+    def __str__(self):
+        return f"Track of {self.route_id} ({self.point_count} points)"
+
+
 class SLAEvent(models.Model):
     """Tracks SLA performance and breach events."""
     id = models.BigAutoField(primary_key=True)
@@ -110,3 +155,75 @@ class TrackingIntegrationLog(models.Model):
 
     def __str__(self):
         return f"{self.service} → {self.event_type} ({self.status_code})"
+
+
+class OutboxEvent(models.Model):
+    """Analytics event written in the producing transaction and shipped by the outbox relay."""
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=64)
+    tenant_id = models.UUIDField(null=True, blank=True)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["available_at", "id"])]
+
+    def __str__(self):
+        return f"Outbox {self.event_type} #{self.id} (attempts={self.attempts})"
+
+
+class OutboxDeadLetter(models.Model):
+    """Outbox event the relay gave up on: rejected by analytics or out of retry attempts."""
+    id = models.BigAutoField(primary_key=True)
+    outbox_id = models.BigIntegerField()
+    event_type = models.CharField(max_length=64)
+    tenant_id = models.UUIDField(null=True, blank=True)
+    payload = models.JSONField()
+    created_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    failed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-failed_at"]
+
+    def __str__(self):
+        return f"Dead letter {self.event_type} #{self.outbox_id}"
+
+
+class TravelSpeedCell(models.Model):
+    """Observed travel per grid cell and hour of week, aggregated from CourierLocation segments."""
+    id = models.BigAutoField(primary_key=True)
+    cell_lat = models.IntegerField()
+    cell_lon = models.IntegerField()
+    hour_of_week = models.PositiveSmallIntegerField()
+    distance_km = models.FloatField(default=0.0)
+    duration_h = models.FloatField(default=0.0)
+    samples = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cell_lat", "cell_lon", "hour_of_week"], name="uniq_travel_speed_cell_hour"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Cell ({self.cell_lat}, {self.cell_lon}) h{self.hour_of_week}"
+
+
+class TravelSpeedBuild(models.Model):
+    """One row per day of CourierLocation already folded into TravelSpeedCell."""
+    day = models.DateField(primary_key=True)
+    cells = models.PositiveIntegerField(default=0)
+    built_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-day"]
+
+    def __str__(self):
+        return f"Travel speeds for {self.day} ({self.cells} cells)"
@@ -36,6 +36,7 @@ class OrderRouteSerializer(serializers.ModelSerializer):
             "start_point",
             "end_point",
             "current_point",
+            "planned_route",
             "distance_covered",
             "total_distance",
             "status",
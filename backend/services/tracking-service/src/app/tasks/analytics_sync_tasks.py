@@ -1,26 +1,34 @@
 from celery import shared_task
+from django.db.models import Count
 from django.utils import timezone
 from app.models.tracking import CourierLocation
 from app.integrations.analytics_client import AnalyticsClient
+from app.utils import outbox
 
 analytics = AnalyticsClient()
 
+
+@shared_task(name="tracking.relay_analytics_outbox")
+def relay_analytics_outbox():
+    """Ship queued analytics events to the Analytics Service in batches."""
+    return outbox.relay(analytics)
+
 @shared_task(name="tracking.sync_hourly_courier_stats")
 def sync_hourly_courier_stats():
     """Sync hourly courier performance summary to analytics service."""
     from datetime import timedelta
     since = timezone.now() - timedelta(hours=1)
-    recent_locations = CourierLocation.objects.filter(timestamp__gte=since)
-
-    grouped = {}
-    for loc in recent_locations:
-        courier_id = str(loc.courier.id)
-        grouped.setdefault(courier_id, []).append(loc)
+    counts = (
+        CourierLocation.objects.filter(timestamp__gte=since)
+        .order_by()
+        .values("courier_id")
+        .annotate(num_updates=Count("id"))
+    )
 
-    for courier_id, locations in grouped.items():
+    for row in counts:
         payload = {
-            "courier_id": courier_id,
-            "num_updates": len(locations),
-            "active_duration_minutes": len(locations) * 2,  # assuming 2-min GPS interval
+            "courier_id": str(row["courier_id"]),
+            "num_updates": row["num_updates"],
+            "active_duration_minutes": row["num_updates"] * 2,  # assuming 2-min GPS interval
         }
         analytics.send_event("hourly_courier_summary", payload)
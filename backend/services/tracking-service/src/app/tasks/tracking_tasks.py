@@ -1,14 +1,37 @@
+import logging
 import requests
 import math
+import time
+from datetime import timedelta
 from celery import shared_task
+from django.db import transaction
+from django.db.models import (
+    DateTimeField, DurationField, Exists, ExpressionWrapper, F, FloatField, Func, OuterRef, Value,
+)
 from django.utils import timezone
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import D
 from django.conf import settings
-from app.models.tracking import Courier, OrderRoute, SLAEvent
+from app.integrations.notification_client import NotificationClient
+from app.models.tracking import OrderRoute, SLAEvent
+from app.utils import (
+    eta_grid, fleet_state, location_partitions, outbox, route_progress, sla_scheduler, track_compaction,
+)
+from app.utils.http_client import get_client
+from app.utils.route_geometry import route_geometry_cache
 
-NOTIFICATION_URL = f"{settings.NOTIFICATION_SERVICE_URL}/api/v1/notify/sla/"
-SERVICE_TOKEN = settings.SERVICE_TOKENS.get("notification-service")
+NOTIFICATION_PATH = "/api/v1/notify/sla/"
+ACTIVE_ROUTE_STATUS = "in_transit"
+SLA_AT_RISK = "SLA_AT_RISK"
+# Summary alert per event type of a sweep chunk: (title, what happened, severity).
+SLA_ALERTS = {
+    "SLA_BREACH": ("SLA Breach Detected", "exceeded their SLA", "critical"),
+    SLA_AT_RISK: ("SLA Breach Predicted", "are predicted to miss their SLA", "warning"),
+}
+SLA_ALERT_MAX_LISTED = 20
+COURIER_FIELDS = ("courier_id", "courier__tenant_id", "courier__name")
+
+logger = logging.getLogger(__name__)
 
 
 def haversine_distance(lat1, lon1, lat2, lon2):
@@ -21,30 +44,207 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     return R * 2 * math.asin(math.sqrt(a))
 
 
+def sla_deadline():
+    """SQL expression for the moment a route breaches its SLA."""
+    return ExpressionWrapper(
+        F("started_at")
+        + ExpressionWrapper(
+            F("expected_sla_minutes") * Value(timedelta(minutes=1), output_field=DurationField()),
+            output_field=DurationField(),
+        ),
+        output_field=DateTimeField(),
+    )
+
+
+def evaluate_sla(courier_ids=None, chunk_size=None, notify=True):
+    """
+    Flag active routes that exceeded their SLA. The breach test runs as a single SQL
+    predicate; each chunk of breached routes costs one SLAEvent bulk INSERT, one status
+    UPDATE and, with `notify`, one outbox INSERT and one summary alert. Pass
+    courier_ids=None to sweep the whole fleet. Routes without a courier are skipped.
+    """
+    chunk_size = chunk_size or settings.SLA_FLEET_SWEEP_CHUNK_SIZE
+    now = timezone.now()
+    routes = (
+        OrderRoute.objects.filter(status=ACTIVE_ROUTE_STATUS, started_at__isnull=False, courier__isnull=False)
+        .annotate(sla_deadline=sla_deadline())
+        .filter(sla_deadline__lt=now)
+    )
+    if courier_ids is not None:
+        routes = routes.filter(courier_id__in=courier_ids)
+
+    breaches = 0
+    chunk = []
+    for row in routes.values_list("id", "started_at", *COURIER_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            breaches += _record_sla_breaches(chunk, now, notify)
+            chunk = []
+    if chunk:
+        breaches += _record_sla_breaches(chunk, now, notify)
+    return breaches
+
+
+def _record_sla_breaches(rows, now, notify=True):
+    events = [
+        SLAEvent(
+            route_id=route_id,
+            event_type="SLA_BREACH",
+            event_time=now,
+            notes=f"Exceeded SLA: {(now - started_at).total_seconds() / 60:.1f} minutes",
+        )
+        for route_id, started_at, *_ in rows
+    ]
+    couriers = {route_id: courier for route_id, _, *courier in rows}
+    return _create_sla_events(events, couriers, notify, delayed=list(couriers))
+
+
+def _create_sla_events(events, couriers, notify=True, delayed=()):
+    """
+    Insert SLA events in one statement (marking `delayed` routes). bulk_create bypasses the
+    post_save receiver, so with `notify` its work is done here in bulk: the analytics outbox
+    rows go in with one more INSERT in this transaction, and one summary alert per event
+    type is sent once committed. `couriers` maps route id to (courier_id, tenant_id, name).
+    """
+    with transaction.atomic():
+        created = SLAEvent.objects.bulk_create(events)
+        if delayed:
+            OrderRoute.objects.filter(id__in=delayed).update(status="delayed")
+        if notify:
+            outbox.enqueue_many(
+                [outbox.sla_event(event, *couriers[event.route_id][:2]) for event in created]
+            )
+            transaction.on_commit(lambda: send_sla_alerts(created, couriers))
+    return len(created)
+
+
+def send_sla_alerts(events, couriers):
+    """One alert per event type for a batch of SLA events, listing the first few routes."""
+    client = NotificationClient()
+    by_type = {}
+    for event in events:
+        by_type.setdefault(event.event_type, []).append(event)
+    for event_type, group in by_type.items():
+        title, happened, severity = SLA_ALERTS[event_type]
+        listed = ", ".join(
+            f"{couriers[event.route_id][2]} on route {event.route_id}" for event in group[:SLA_ALERT_MAX_LISTED]
+        )
+        more = f" and {len(group) - SLA_ALERT_MAX_LISTED} more" if len(group) > SLA_ALERT_MAX_LISTED else ""
+        client.send_alert(
+            title=title,
+            message=f"{len(group)} routes {happened}: {listed}{more}.",
+            severity=severity,
+        )
+
+
+def _coordinate(function, *fields):
+    """ST_Y/ST_X of the first non-null geography field, computed in SQL."""
+    return Func(
+        *[F(field) for field in fields],
+        function=function,
+        template="%(function)s(COALESCE(%(expressions)s)::geometry)",
+        output_field=FloatField(),
+    )
+
+
+def predict_sla_breaches(courier_ids=None, chunk_size=None, notify=True):
+    """
+    Flag active routes that will miss their SLA before they do. The remaining trip from the
+    courier's current position (the start point before the first ping) to the drop-off is
+    priced by the ETA grid in one vectorized call per chunk; a route whose predicted arrival
+    lands past its deadline gets one SLA_AT_RISK event. Routes already past the deadline are
+    left to evaluate_sla, routes without a courier are skipped.
+    """
+    chunk_size = chunk_size or settings.SLA_FLEET_SWEEP_CHUNK_SIZE
+    now = timezone.now()
+    routes = (
+        OrderRoute.objects.filter(status=ACTIVE_ROUTE_STATUS, started_at__isnull=False, courier__isnull=False)
+        .annotate(sla_deadline=sla_deadline())
+        .filter(sla_deadline__gte=now)
+        .filter(~Exists(SLAEvent.objects.filter(route=OuterRef("pk"), event_type=SLA_AT_RISK)))
+        .annotate(
+            from_lat=_coordinate("ST_Y", "current_point", "start_point"),
+            from_lon=_coordinate("ST_X", "current_point", "start_point"),
+            to_lat=_coordinate("ST_Y", "end_point"),
+            to_lon=_coordinate("ST_X", "end_point"),
+        )
+    )
+    if courier_ids is not None:
+        routes = routes.filter(courier_id__in=courier_ids)
+
+    at_risk = 0
+    chunk = []
+    rows = routes.values_list("id", "sla_deadline", "from_lat", "from_lon", "to_lat", "to_lon", *COURIER_FIELDS)
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            at_risk += _record_sla_risks(chunk, now, notify)
+            chunk = []
+    if chunk:
+        at_risk += _record_sla_risks(chunk, now, notify)
+    return at_risk
+
+
+def _record_sla_risks(rows, now, notify=True):
+    route_ids, deadlines, from_lat, from_lon, to_lat, to_lon, *courier_columns = zip(*rows)
+    eta = eta_grid.eta_minutes_many(from_lat, from_lon, to_lat, to_lon, depart=now)
+    margin = settings.SLA_AT_RISK_MARGIN_MINUTES
+    events = []
+    for route_id, deadline, minutes in zip(route_ids, deadlines, eta.tolist()):
+        late_by = minutes - (deadline - now).total_seconds() / 60
+        if late_by > -margin:
+            events.append(
+                SLAEvent(
+                    route_id=route_id,
+                    event_type=SLA_AT_RISK,
+                    event_time=now,
+                    notes=f"Predicted arrival {late_by:.1f} minutes after SLA deadline (ETA {minutes:.1f} minutes)",
+                )
+            )
+    if not events:
+        return 0
+    couriers = dict(zip(route_ids, zip(*courier_columns)))
+    return _create_sla_events(events, couriers, notify)
+
+
+def evaluate_route_deviation(courier_ids):
+    """
+    Detect couriers outside the corridor around their planned route. Distances are
+    computed in memory against cached, pre-indexed route geometry.
+    """
+    routes = list(
+        OrderRoute.objects.filter(
+            courier_id__in=courier_ids, status=ACTIVE_ROUTE_STATUS, current_point__isnull=False
+        ).only("id", "current_point")
+    )
+    geometries = route_geometry_cache.get_many([route.id for route in routes])
+    threshold = settings.ROUTE_DEVIATION_THRESHOLD_M
+    deviations = 0
+
+    for route in routes:
+        geometry = geometries.get(route.id)
+        if geometry is None:
+            continue
+        deviation_distance = geometry.distance(route.current_point.x, route.current_point.y)
+
+        if deviation_distance > threshold:
+            event = SLAEvent.objects.create(
+                route=route,
+                event_type="ROUTE_DEVIATION",
+                deviation_distance=deviation_distance,
+                notes=f"Courier deviated {deviation_distance:.2f}m from path",
+            )
+            send_sla_alert(event)
+            deviations += 1
+    return deviations
+
+
 @shared_task(name="tracking.check_sla_compliance")
 def check_sla_compliance(courier_id):
     """Check SLA compliance for all active orders of a courier."""
     try:
-        courier = Courier.objects.get(id=courier_id)
-        routes = OrderRoute.objects.filter(courier=courier, status="in_progress")
-        now = timezone.now()
-
-        for route in routes:
-            if route.started_at:
-                elapsed = (now - route.started_at).total_seconds() / 60
-                sla_minutes = route.expected_sla_minutes or 60
-                if elapsed > sla_minutes:
-                    event = SLAEvent.objects.create(
-                        route=route,
-                        event_type="SLA_BREACH",
-                        notes=f"Exceeded SLA: {elapsed:.1f} minutes",
-                    )
-                    send_sla_alert(event)
-                    route.status = "delayed"
-                    route.save(update_fields=["status"])
-
-    except Courier.DoesNotExist:
-        pass
+        evaluate_sla([courier_id])
+        predict_sla_breaches([courier_id])
     except Exception as e:
         print(f"[SLA_CHECK_ERROR] {e}")
 
@@ -53,27 +253,86 @@ def check_sla_compliance(courier_id):
 def detect_route_deviation(courier_id):
     """Detect route deviation using geospatial distance checks."""
     try:
-        courier = Courier.objects.get(id=courier_id)
-        route = OrderRoute.objects.filter(courier=courier, status="in_progress").first()
-        if not route or not route.current_point or not route.end_point:
-            return
+        evaluate_route_deviation([courier_id])
+    except Exception as e:
+        print(f"[ROUTE_DEVIATION_ERROR] {e}")
 
-        # Distance from expected path
-        current = route.current_point
-        end = route.end_point
-        deviation_distance = current.distance(end) * 100  # in meters
 
-        if deviation_distance > 300:  # 300m deviation threshold
-            event = SLAEvent.objects.create(
-                route=route,
-                event_type="ROUTE_DEVIATION",
-                deviation_distance=deviation_distance,
-                notes=f"Courier deviated {deviation_distance:.2f}m from path",
-            )
-            send_sla_alert(event)
+@shared_task(name="tracking.sweep_fleet_sla")
+def sweep_fleet_sla():
+    """Fleet-wide SLA sweep over every active route."""
+    started = time.perf_counter()
+    breaches = evaluate_sla()
+    at_risk = predict_sla_breaches()
+    logger.info(
+        f"[SLA_FLEET_SWEEP] {breaches} breaches, {at_risk} predicted in {time.perf_counter() - started:.2f}s"
+    )
+    return breaches
 
-    except Exception as e:
-        print(f"[ROUTE_DEVIATION_ERROR] {e}")
+
+@shared_task(name="tracking.persist_route_progress")
+def persist_route_progress():
+    """Flush incrementally accumulated route distance and position to OrderRoute."""
+    persisted = 0
+    while True:
+        count = route_progress.persist_dirty()
+        persisted += count
+        if count < settings.ROUTE_PROGRESS_PERSIST_BATCH_SIZE:
+            break
+    return persisted
+
+
+@shared_task(name="tracking.prune_fleet_state")
+def prune_fleet_state():
+    """Drop couriers that stopped reporting from the live fleet state."""
+    offline = fleet_state.stale(settings.FLEET_STATE_OFFLINE_SECONDS)
+    fleet_state.remove(offline)
+    return len(offline)
+
+
+@shared_task(name="tracking.maintain_location_partitions")
+def maintain_location_partitions():
+    """Create upcoming CourierLocation partitions, roll up, BRIN cold data and drop expired."""
+    return location_partitions.maintain()
+
+
+@shared_task(name="tracking.compact_completed_tracks")
+def compact_completed_tracks():
+    """Turn raw traces of delivered routes into compressed track blobs."""
+    return track_compaction.compact_completed_routes()
+
+
+@shared_task(name="tracking.rebuild_eta_grid")
+def rebuild_eta_grid():
+    """Learn travel speeds of the days not in the ETA grid yet and publish a fresh snapshot."""
+    return eta_grid.rebuild()
+
+
+@shared_task(name="tracking.sweep_dirty_couriers")
+def sweep_dirty_couriers():
+    """Evaluate SLA and route deviation for every courier flagged since the last sweep."""
+    started = time.perf_counter()
+    claimed = []
+    while True:
+        batch = sla_scheduler.claim_due()
+        if not batch:
+            break
+        claimed.extend(batch)
+        courier_ids = [courier_id for courier_id, _ in batch]
+        try:
+            evaluate_sla(courier_ids)
+            predict_sla_breaches(courier_ids)
+        except Exception as e:
+            print(f"[SLA_CHECK_ERROR] {e}")
+        try:
+            evaluate_route_deviation(courier_ids)
+        except Exception as e:
+            print(f"[ROUTE_DEVIATION_ERROR] {e}")
+        if len(batch) < settings.SLA_SWEEP_BATCH_SIZE:
+            break
+
+    sla_scheduler.record_sweep(claimed, time.perf_counter() - started)
+    return len(claimed)
 
 
 def send_sla_alert(event):
@@ -85,14 +344,13 @@ def send_sla_alert(event):
         "timestamp": str(event.event_time),
     }
 
-    headers = {
-        "Content-Type": "application/json",
-        "X-Service-Token": SERVICE_TOKEN,
-    }
-
+    client = get_client(
+        "notification-service",
+        settings.NOTIFICATION_SERVICE_URL,
+        token=settings.SERVICE_TOKENS.get("notification-service"),
+    )
     try:
-        response = requests.post(NOTIFICATION_URL, json=payload, headers=headers, timeout=5)
-        response.raise_for_status()
+        client.post(NOTIFICATION_PATH, json=payload)
         print(f"[SLA_ALERT_SENT] {payload}")
     except requests.RequestException as e:
         print(f"[SLA_ALERT_FAILED] {e}")
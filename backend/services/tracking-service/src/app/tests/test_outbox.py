@@ -0,0 +1,38 @@
+import uuid
+
+from django.test import TestCase
+
+from app.models.tracking import OutboxDeadLetter, OutboxEvent
+from app.utils import outbox
+
+
+class FakeAnalyticsClient:
+    """Stands in for AnalyticsClient: rejects events without a tenant, like the bulk endpoint."""
+
+    def __init__(self):
+        self.calls = []
+
+    def send_events(self, events):
+        self.calls.append(events)
+        return [(index, "tenant_id must be a UUID") for index, event in enumerate(events) if not event["tenant_id"]]
+
+
+class RelayBatchTests(TestCase):
+    def test_one_bad_event_in_a_full_batch_is_dead_lettered(self):
+        tenant_id = uuid.uuid4()
+        events = OutboxEvent.objects.bulk_create(
+            [OutboxEvent(event_type="courier_location", tenant_id=tenant_id, payload={"n": n}) for n in range(500)]
+        )
+        bad = events[137]
+        OutboxEvent.objects.filter(id=bad.id).update(tenant_id=None)
+        client = FakeAnalyticsClient()
+
+        relayed = outbox.relay_batch(client, batch_size=500)
+
+        self.assertEqual(relayed, 500)
+        self.assertEqual(len(client.calls), 1)
+        self.assertFalse(OutboxEvent.objects.exists())
+        dead = OutboxDeadLetter.objects.get()
+        self.assertEqual(dead.outbox_id, bad.id)
+        self.assertEqual(dead.payload, {"n": 137})
+        self.assertEqual(dead.error, "tenant_id must be a UUID")
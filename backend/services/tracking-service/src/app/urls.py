@@ -5,6 +5,13 @@ from app.views.tracking_views import (
     CourierLocationViewSet,
     OrderRouteViewSet,
     SLAEventViewSet,
+    SLASweeperMetricsView,
+    ServiceClientMetricsView,
+    OutboxMetricsView,
+    IngestMetricsView,
+    FleetNearbyView,
+    CourierLiveStateView,
+    EtaView,
 )
 
 router = DefaultRouter()
@@ -14,5 +21,12 @@ router.register("routes", OrderRouteViewSet)
 router.register("sla-events", SLAEventViewSet)
 
 urlpatterns = [
+    path("api/v1/tracking/sla-sweeper/metrics/", SLASweeperMetricsView.as_view(), name="sla_sweeper_metrics"),
+    path("api/v1/tracking/service-clients/metrics/", ServiceClientMetricsView.as_view(), name="service_client_metrics"),
+    path("api/v1/tracking/outbox/metrics/", OutboxMetricsView.as_view(), name="outbox_metrics"),
+    path("api/v1/tracking/ingest/metrics/", IngestMetricsView.as_view(), name="ingest_metrics"),
+    path("api/v1/tracking/fleet/nearby/", FleetNearbyView.as_view(), name="fleet_nearby"),
+    path("api/v1/tracking/fleet/<uuid:courier_id>/", CourierLiveStateView.as_view(), name="courier_live_state"),
+    path("api/v1/tracking/eta/", EtaView.as_view(), name="eta"),
     path("api/v1/tracking/", include(router.urls)),
 ]
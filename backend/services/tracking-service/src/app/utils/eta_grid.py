@@ -0,0 +1,339 @@
+"""
+ETA prediction from a travel-speed grid learned from CourierLocation traces.
+
+Consecutive pings of a courier form segments; each segment's distance and duration are
+added to the grid cell of its midpoint (ETA_GRID_CELL_DEG square) and the local hour of
+week it ended in. The nightly build folds in only the days not learned yet (one row per
+day in TravelSpeedBuild), decaying a cell's history by age whenever new data lands on it.
+
+The cell table is then exported into a compact snapshot: sorted cell keys and a float16
+cells x 168 speed matrix in which sparse hours are already blended towards the cell's
+average shaped by the fleet-wide hourly profile. The snapshot is published through Redis
+and cached per process, so a query is a straight-line walk over the cells between origin
+and destination with one array lookup per step and no I/O.
+"""
+import io
+import logging
+import math
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.models.tracking import CourierLocation, TravelSpeedBuild, TravelSpeedCell
+from app.utils import geodesy
+
+logger = logging.getLogger(__name__)
+
+r = redis.StrictRedis.from_url(settings.CELERY_BROKER_URL)
+
+GRID_KEY = "tracking:eta:grid"
+VERSION_KEY = "tracking:eta:grid:version"
+HOURS_PER_WEEK = 168
+KM_PER_DEGREE = 111.32
+WEEK_SECONDS = 7 * 86400
+
+LOCATION_TABLE = CourierLocation._meta.db_table
+CELL_TABLE = TravelSpeedCell._meta.db_table
+
+# Segments end inside [start, end); points from max_gap earlier are read so the first
+# segment of the day has its predecessor. Too sparse, inaccurate, stationary or impossibly
+# fast segments are dropped. Cells hold decayed sums, so the speed is distance / duration.
+BUILD_SQL = f"""
+    WITH points AS (
+        SELECT "timestamp" AS ts, location::geometry AS geom,
+               lag("timestamp") OVER w AS prev_ts, lag(location::geometry) OVER w AS prev_geom
+        FROM "{LOCATION_TABLE}"
+        WHERE "timestamp" >= %(read_from)s AND "timestamp" < %(end)s
+          AND (accuracy IS NULL OR accuracy <= %(max_accuracy)s)
+        WINDOW w AS (PARTITION BY courier_id ORDER BY "timestamp")
+    ),
+    segments AS (
+        SELECT ts,
+               (ST_Y(geom) + ST_Y(prev_geom)) / 2 AS lat,
+               (ST_X(geom) + ST_X(prev_geom)) / 2 AS lon,
+               ST_DistanceSphere(prev_geom, geom) / 1000.0 AS km,
+               extract(epoch FROM ts - prev_ts) / 3600.0 AS hours
+        FROM points
+        WHERE prev_ts IS NOT NULL AND ts >= %(start)s
+          AND ts > prev_ts AND ts - prev_ts <= %(max_gap)s
+    )
+    INSERT INTO "{CELL_TABLE}" AS c (cell_lat, cell_lon, hour_of_week, distance_km, duration_h, samples, updated_at)
+    SELECT floor(lat / %(cell_deg)s)::int, floor(lon / %(cell_deg)s)::int,
+           (extract(isodow FROM ts AT TIME ZONE %(tz)s)::int - 1) * 24 + extract(hour FROM ts AT TIME ZONE %(tz)s)::int,
+           sum(km), sum(hours), count(*), %(end)s
+    FROM segments
+    WHERE km / hours BETWEEN %(min_kmh)s AND %(max_kmh)s
+    GROUP BY 1, 2, 3
+    ON CONFLICT (cell_lat, cell_lon, hour_of_week) DO UPDATE SET
+        distance_km = c.distance_km * power(%(decay)s, greatest(extract(epoch FROM EXCLUDED.updated_at - c.updated_at), 0) / {WEEK_SECONDS}) + EXCLUDED.distance_km,
+        duration_h = c.duration_h * power(%(decay)s, greatest(extract(epoch FROM EXCLUDED.updated_at - c.updated_at), 0) / {WEEK_SECONDS}) + EXCLUDED.duration_h,
+        samples = c.samples * power(%(decay)s, greatest(extract(epoch FROM EXCLUDED.updated_at - c.updated_at), 0) / {WEEK_SECONDS}) + EXCLUDED.samples,
+        updated_at = greatest(c.updated_at, EXCLUDED.updated_at)
+"""
+
+
+def _day_start(day):
+    return datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+
+
+def _cell_keys(cell_lat, cell_lon):
+    """Pack signed (cell_lat, cell_lon) into one sortable int64 key."""
+    return (np.asarray(cell_lat, dtype=np.int64) << 32) | (np.asarray(cell_lon, dtype=np.int64) & 0xFFFFFFFF)
+
+
+def minute_of_week(moment):
+    """Minutes since Monday 00:00 in the grid's time zone."""
+    local = moment.astimezone(ZoneInfo(settings.ETA_GRID_TIME_ZONE))
+    return local.weekday() * 1440 + local.hour * 60 + local.minute + local.second / 60
+
+
+class Grid:
+    """Immutable speed snapshot: `keys` (sorted cell keys), `speeds` (km/h per key x hour of week)."""
+
+    def __init__(self, cell_deg, keys, speeds, profile, version=None):
+        self.cell_deg = float(cell_deg)
+        self.step_km = self.cell_deg * KM_PER_DEGREE
+        self.keys = keys
+        self.speeds = speeds.astype(np.float32)
+        self.profile = profile.astype(np.float32)
+        self.version = version
+        self.rows = dict(zip(keys.tolist(), range(len(keys))))
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            settings.ETA_GRID_CELL_DEG,
+            np.zeros(0, dtype=np.int64),
+            np.zeros((0, HOURS_PER_WEEK), dtype=np.float16),
+            np.full(HOURS_PER_WEEK, settings.ETA_DEFAULT_SPEED_KMH, dtype=np.float32),
+        )
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            cell_deg=np.float64(self.cell_deg),
+            keys=self.keys,
+            speeds=self.speeds.astype(np.float16),
+            profile=self.profile,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, blob, version=None):
+        with np.load(io.BytesIO(blob)) as data:
+            return cls(float(data["cell_deg"]), data["keys"], data["speeds"], data["profile"], version)
+
+    def _steps(self, km):
+        return min(max(math.ceil(km / self.step_km), 1), settings.ETA_GRID_MAX_STEPS)
+
+    def minutes(self, origin_lat, origin_lon, dest_lat, dest_lon, start_minute):
+        """
+        Travel minutes for one trip leaving at `start_minute` of the week. The straight line
+        is cut into cell-sized steps of road distance (detour-factor scaled); each step is
+        priced at the speed of its cell in the hour the courier reaches it.
+        """
+        dlat, dlon = math.radians(dest_lat - origin_lat), math.radians(dest_lon - origin_lon)
+        a = (
+            math.sin(dlat / 2) ** 2
+            + math.cos(math.radians(origin_lat)) * math.cos(math.radians(dest_lat)) * math.sin(dlon / 2) ** 2
+        )
+        km = 2 * geodesy.EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+        steps = self._steps(km)
+        leg_km = km * settings.ETA_DETOUR_FACTOR / steps
+        clock = start_minute
+        for j in range(steps):
+            fraction = (j + 0.5) / steps
+            lat = origin_lat + (dest_lat - origin_lat) * fraction
+            lon = origin_lon + (dest_lon - origin_lon) * fraction
+            key = (math.floor(lat / self.cell_deg) << 32) | (math.floor(lon / self.cell_deg) & 0xFFFFFFFF)
+            hour = int(clock // 60) % HOURS_PER_WEEK
+            row = self.rows.get(key)
+            speed = self.speeds[row, hour] if row is not None else self.profile[hour]
+            clock += leg_km / float(speed) * 60
+        return clock - start_minute
+
+    def minutes_many(self, origin_lat, origin_lon, dest_lat, dest_lon, start_minute):
+        """
+        Vectorized `minutes` for N trips with a common departure. The hour of week of each
+        step comes from a first pass priced at the departure hour, which only differs from
+        the sequential walk when that estimate and the final one straddle an hour boundary.
+        """
+        origin_lat, origin_lon, dest_lat, dest_lon = (
+            np.asarray(v, dtype=np.float64) for v in (origin_lat, origin_lon, dest_lat, dest_lon)
+        )
+        km = geodesy.haversine(origin_lat, origin_lon, dest_lat, dest_lon)
+        if not km.size:
+            return km
+        steps = np.clip(np.ceil(km / self.step_km), 1, settings.ETA_GRID_MAX_STEPS).astype(np.int64)
+        j = np.arange(steps.max())
+        valid = j[None, :] < steps[:, None]
+        fraction = (j[None, :] + 0.5) / steps[:, None]
+        lats = origin_lat[:, None] + (dest_lat - origin_lat)[:, None] * fraction
+        lons = origin_lon[:, None] + (dest_lon - origin_lon)[:, None] * fraction
+        keys = _cell_keys(np.floor(lats / self.cell_deg), np.floor(lons / self.cell_deg))
+        if len(self.keys):
+            rows = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            found = self.keys[rows] == keys
+        else:
+            rows = found = None
+        leg_minutes = (km * settings.ETA_DETOUR_FACTOR / steps * 60)[:, None]
+
+        def price(hours):
+            speed = self.profile[hours]
+            if found is not None:
+                speed = np.where(found, self.speeds[rows, hours], speed)
+            return np.where(valid, leg_minutes / speed, 0.0)
+
+        first = price(np.full(keys.shape, int(start_minute // 60) % HOURS_PER_WEEK))
+        reached = start_minute + np.cumsum(first, axis=1) - first
+        return price((reached // 60).astype(np.int64) % HOURS_PER_WEEK).sum(axis=1)
+
+
+def build_day(day):
+    """Fold one day of CourierLocation segments into TravelSpeedCell; False if already built."""
+    start = _day_start(day)
+    end = start + timedelta(days=1)
+    with transaction.atomic():
+        _, created = TravelSpeedBuild.objects.get_or_create(day=day)
+        if not created:
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                BUILD_SQL,
+                {
+                    "read_from": start - timedelta(seconds=settings.ETA_GRID_MAX_GAP_SECONDS),
+                    "start": start,
+                    "end": end,
+                    "max_gap": timedelta(seconds=settings.ETA_GRID_MAX_GAP_SECONDS),
+                    "max_accuracy": settings.ROUTE_PROGRESS_MAX_ACCURACY_M,
+                    "min_kmh": settings.ETA_GRID_MIN_SPEED_KMH,
+                    "max_kmh": settings.ROUTE_PROGRESS_MAX_SPEED_KMH,
+                    "cell_deg": settings.ETA_GRID_CELL_DEG,
+                    "tz": settings.ETA_GRID_TIME_ZONE,
+                    "decay": settings.ETA_GRID_DECAY_PER_WEEK,
+                },
+            )
+            cells = cursor.rowcount
+        TravelSpeedBuild.objects.filter(day=day).update(cells=cells, built_at=timezone.now())
+    return True
+
+
+def build_pending(today=None):
+    """Build every finished day within the backfill window that is not in the grid yet, oldest first."""
+    today = today or timezone.now().astimezone(dt_timezone.utc).date()
+    first = today - timedelta(days=min(settings.ETA_GRID_BACKFILL_DAYS, settings.LOCATION_RAW_RETENTION_DAYS))
+    built = set(TravelSpeedBuild.objects.filter(day__gte=first).values_list("day", flat=True))
+    days = []
+    day = first
+    while day < today:
+        if day not in built and build_day(day):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def compile_grid(cell_lat, cell_lon, hour_of_week, distance_km, duration_h, samples, version=None):
+    """
+    Turn per cell-hour sums into a Grid. Cells with fewer than ETA_GRID_MIN_SAMPLES segments
+    in total are left to the fleet-wide hourly profile; within a kept cell, each hour's own
+    speed is blended with the cell average (shaped by the profile) by its sample count.
+    """
+    min_samples = settings.ETA_GRID_MIN_SAMPLES
+    keys, inverse = np.unique(_cell_keys(cell_lat, cell_lon), return_inverse=True)
+    hour_of_week = np.asarray(hour_of_week, dtype=np.int64)
+    distance = np.zeros((len(keys), HOURS_PER_WEEK))
+    duration = np.zeros_like(distance)
+    count = np.zeros_like(distance)
+    distance[inverse, hour_of_week] = distance_km
+    duration[inverse, hour_of_week] = duration_h
+    count[inverse, hour_of_week] = samples
+
+    hourly_distance, hourly_duration = distance.sum(axis=0), duration.sum(axis=0)
+    profile = np.full(HOURS_PER_WEEK, float(settings.ETA_DEFAULT_SPEED_KMH))
+    np.divide(hourly_distance, hourly_duration, out=profile, where=hourly_duration > 0)
+
+    cell_duration = duration.sum(axis=1)
+    keep = (count.sum(axis=1) >= min_samples) & (cell_duration > 0)
+    keys, distance, duration, count = keys[keep], distance[keep], duration[keep], count[keep]
+    cell_speed = distance.sum(axis=1) / cell_duration[keep]
+    prior = cell_speed[:, None] * (profile / profile.mean())[None, :]
+    own = prior.copy()
+    np.divide(distance, duration, out=own, where=duration > 0)
+    weight = count / (count + min_samples)
+    speeds = np.clip(
+        weight * own + (1 - weight) * prior, settings.ETA_GRID_MIN_SPEED_KMH, settings.ROUTE_PROGRESS_MAX_SPEED_KMH
+    )
+    return Grid(settings.ETA_GRID_CELL_DEG, keys, speeds.astype(np.float16), profile, version)
+
+
+def export():
+    """Compile the cell table into a snapshot and publish it to every worker."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT cell_lat, cell_lon, hour_of_week, distance_km, duration_h, samples FROM \"{CELL_TABLE}\""
+        )
+        rows = cursor.fetchall()
+    columns = list(zip(*rows)) if rows else [()] * 6
+    version = timezone.now().isoformat()
+    grid = compile_grid(*columns, version=version)
+    blob = grid.to_bytes()
+    pipe = r.pipeline()
+    pipe.set(GRID_KEY, blob)
+    pipe.set(VERSION_KEY, version)
+    pipe.execute()
+    _cache.update(grid=grid, version=version, checked=time.monotonic())
+    logger.info(f"[EtaGrid] Published {len(grid.keys)} cells ({len(blob) / 1024:.0f} KiB), version {version}")
+    return grid
+
+
+def rebuild():
+    """Nightly job: learn the missing days, then publish a fresh snapshot."""
+    days = build_pending()
+    grid = export()
+    return {"days": [day.isoformat() for day in days], "cells": len(grid.keys), "version": grid.version}
+
+
+_cache = {"grid": None, "version": None, "checked": 0.0}
+_lock = threading.Lock()
+
+
+def current():
+    """The process-local snapshot, re-checked against Redis at most every ETA_GRID_REFRESH_SECONDS."""
+    grid = _cache["grid"]
+    if grid is not None and time.monotonic() - _cache["checked"] < settings.ETA_GRID_REFRESH_SECONDS:
+        return grid
+    with _lock:
+        if _cache["grid"] is not None and time.monotonic() - _cache["checked"] < settings.ETA_GRID_REFRESH_SECONDS:
+            return _cache["grid"]
+        try:
+            version = r.get(VERSION_KEY)
+            version = version.decode() if version else None
+            if version != _cache["version"] or _cache["grid"] is None:
+                blob = r.get(GRID_KEY) if version else None
+                _cache["grid"] = Grid.from_bytes(blob, version) if blob else Grid.empty()
+                _cache["version"] = version
+        except redis.RedisError as e:
+            logger.warning(f"[EtaGrid] Snapshot refresh failed, keeping the current one: {e}")
+            _cache["grid"] = _cache["grid"] or Grid.empty()
+        _cache["checked"] = time.monotonic()
+        return _cache["grid"]
+
+
+def eta_minutes(origin, destination, depart=None):
+    """Predicted travel minutes from origin (lat, lon) to destination (lat, lon) leaving at `depart`."""
+    start = minute_of_week(depart or timezone.now())
+    return current().minutes(origin[0], origin[1], destination[0], destination[1], start)
+
+
+def eta_minutes_many(origin_lats, origin_lons, dest_lats, dest_lons, depart=None):
+    """Predicted travel minutes for N origin/destination pairs sharing one departure time."""
+    start = minute_of_week(depart or timezone.now())
+    return current().minutes_many(origin_lats, origin_lons, dest_lats, dest_lons, start)
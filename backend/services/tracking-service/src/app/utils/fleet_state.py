@@ -0,0 +1,130 @@
+import time
+
+import redis
+from django.conf import settings
+
+r = redis.StrictRedis.from_url(settings.CELERY_BROKER_URL)
+
+GEO_KEY = "tracking:fleet:geo:{}"
+COURIER_KEY = "tracking:fleet:courier:{}"
+LAST_SEEN_KEY = "tracking:fleet:last_seen"
+
+
+def update(pings, tenants, active_routes=None):
+    """
+    Store the latest position of every courier in a flushed batch.
+
+    `tenants` maps courier_id -> tenant_id and `active_routes` courier_id -> route_id.
+    Positions go into a per-tenant GEO set for radius/nearest queries, attributes into
+    a hash per courier and the report time into a sorted set for staleness checks.
+    """
+    latest = {}
+    for ping in pings:
+        current = latest.get(ping.courier_id)
+        if current is None or ping.timestamp > current.timestamp:
+            latest[ping.courier_id] = ping
+    if not latest:
+        return 0
+
+    active_routes = active_routes or {}
+    pipe = r.pipeline(transaction=False)
+    for courier_id, ping in latest.items():
+        tenant_id = str(tenants[courier_id])
+        ts = ping.timestamp.timestamp()
+        pipe.geoadd(GEO_KEY.format(tenant_id), (ping.longitude, ping.latitude, courier_id))
+        pipe.hset(
+            COURIER_KEY.format(courier_id),
+            mapping={
+                "tenant_id": tenant_id,
+                "lat": ping.latitude,
+                "lon": ping.longitude,
+                "speed": "" if ping.speed is None else ping.speed,
+                "ts": ts,
+                "route_id": str(active_routes.get(courier_id) or ""),
+            },
+        )
+        pipe.zadd(LAST_SEEN_KEY, {courier_id: ts})
+    pipe.execute()
+    return len(latest)
+
+
+def _parse(courier_id, state):
+    if not state:
+        return None
+    state = {key.decode(): value.decode() for key, value in state.items()}
+    return {
+        "courier_id": courier_id,
+        "tenant_id": state["tenant_id"],
+        "latitude": float(state["lat"]),
+        "longitude": float(state["lon"]),
+        "speed": float(state["speed"]) if state.get("speed") else None,
+        "timestamp": float(state["ts"]),
+        "route_id": state.get("route_id") or None,
+    }
+
+
+def get_position(courier_id):
+    """Latest known state of one courier, or None."""
+    return _parse(str(courier_id), r.hgetall(COURIER_KEY.format(courier_id)))
+
+
+def get_positions(courier_ids):
+    pipe = r.pipeline(transaction=False)
+    for courier_id in courier_ids:
+        pipe.hgetall(COURIER_KEY.format(courier_id))
+    states = pipe.execute()
+    return [state for state in (_parse(str(cid), s) for cid, s in zip(courier_ids, states)) if state]
+
+
+def nearest(tenant_id, latitude, longitude, count=10, radius_km=None):
+    """Up to `count` couriers of a tenant closest to the point, as (courier_id, distance_km)."""
+    results = r.geosearch(
+        GEO_KEY.format(tenant_id),
+        longitude=longitude,
+        latitude=latitude,
+        radius=radius_km or settings.FLEET_STATE_MAX_SEARCH_RADIUS_KM,
+        unit="km",
+        sort="ASC",
+        count=count,
+        withdist=True,
+    )
+    return [(member.decode(), distance) for member, distance in results]
+
+
+def within_radius(tenant_id, latitude, longitude, radius_km):
+    """All couriers of a tenant within `radius_km`, nearest first, as (courier_id, distance_km)."""
+    results = r.geosearch(
+        GEO_KEY.format(tenant_id),
+        longitude=longitude,
+        latitude=latitude,
+        radius=radius_km,
+        unit="km",
+        sort="ASC",
+        withdist=True,
+    )
+    return [(member.decode(), distance) for member, distance in results]
+
+
+def stale(older_than_seconds):
+    """Courier ids whose last report is older than the given age."""
+    cutoff = time.time() - older_than_seconds
+    return [member.decode() for member in r.zrangebyscore(LAST_SEEN_KEY, "-inf", cutoff)]
+
+
+def remove(courier_ids):
+    """Drop couriers from the live store (e.g. gone offline)."""
+    courier_ids = [str(cid) for cid in courier_ids]
+    if not courier_ids:
+        return
+    pipe = r.pipeline(transaction=False)
+    for courier_id in courier_ids:
+        pipe.hget(COURIER_KEY.format(courier_id), "tenant_id")
+    tenant_ids = pipe.execute()
+
+    pipe = r.pipeline(transaction=False)
+    for courier_id, tenant_id in zip(courier_ids, tenant_ids):
+        if tenant_id:
+            pipe.zrem(GEO_KEY.format(tenant_id.decode()), courier_id)
+        pipe.delete(COURIER_KEY.format(courier_id))
+    pipe.zrem(LAST_SEEN_KEY, *courier_ids)
+    pipe.execute()
@@ -0,0 +1,340 @@
+import asyncio
+import bisect
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # async variant is optional
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {502, 503, 504}
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without touching the network while a target's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; after `reset_timeout`
+    seconds one trial call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of traffic: every call deposits `ratio`
+    tokens, every retry spends one. `min_per_second` keeps low-traffic targets retryable.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, max_tokens=100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.max_tokens, self.tokens + (now - self._refilled_at) * self.min_per_second)
+            self._refilled_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class LatencyHistogram:
+    """Cumulative per-call latency histogram with fixed millisecond buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed_ms):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, elapsed_ms)] += 1
+            self.total_ms += elapsed_ms
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th quantile (None if no samples)."""
+        total = sum(self.counts)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        count = sum(self.counts)
+        return {
+            "count": count,
+            "mean_ms": round(self.total_ms / count, 2) if count else None,
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip([f"le_{b}" for b in self.buckets] + ["le_inf"], self.counts)),
+        }
+
+
+class _Target:
+    """Breaker, retry budget and histograms shared by the sync and async clients of a target."""
+
+    def __init__(self, name):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            failure_threshold=getattr(settings, "SERVICE_CLIENT_BREAKER_THRESHOLD", 5),
+            reset_timeout=getattr(settings, "SERVICE_CLIENT_BREAKER_RESET_SECONDS", 30),
+        )
+        self.budget = RetryBudget(ratio=getattr(settings, "SERVICE_CLIENT_RETRY_RATIO", 0.2))
+        self.histograms = {}
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def histogram(self, path):
+        with self._lock:
+            if path not in self.histograms:
+                self.histograms[path] = LatencyHistogram()
+            return self.histograms[path]
+
+    def before_call(self):
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit open for {self.name}")
+        self.budget.deposit()
+
+    def should_retry(self, attempt, max_retries):
+        return attempt < max_retries and self.budget.try_spend()
+
+    def metrics(self):
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "rejected": self.rejected,
+            "retry_tokens": round(self.budget.tokens, 1),
+            "latency": {path: h.snapshot() for path, h in self.histograms.items()},
+        }
+
+
+def _backoff(attempt):
+    return min(2.0, 0.05 * 2**attempt) * random.uniform(0.5, 1.0)
+
+
+class ServiceClient:
+    """
+    Pooled keep-alive HTTP client for one downstream service.
+
+    Connection errors, timeouts and 502/503/504 responses are retried while the
+    target's retry budget allows; they also count against its circuit breaker.
+    """
+
+    def __init__(self, target, base_url, token=None, timeout=5, max_retries=2):
+        self.target = target
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        pool_size = getattr(settings, "SERVICE_CLIENT_POOL_SIZE", 20)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        if token:
+            self.session.headers["X-Service-Token"] = token
+
+    def post(self, path, json=None, **kwargs):
+        return self.request("POST", path, json=json, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def request(self, method, path, **kwargs):
+        """Send a request; raises requests.RequestException (incl. CircuitOpenError) on failure."""
+        kwargs.setdefault("timeout", self.timeout)
+        histogram = self.target.histogram(path)
+        attempt = 0
+        while True:
+            self.target.before_call()
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+                failed = response.status_code in RETRYABLE_STATUS
+            except requests.RequestException:
+                response, failed = None, True
+                if not self.target.should_retry(attempt, self.max_retries):
+                    self.target.breaker.record_failure()
+                    raise
+            except BaseException:
+                # Anything else (bad URL, encoding error, cancellation) must still end a
+                # half-open trial, or the breaker would reject every later call.
+                self.target.breaker.record_failure()
+                raise
+            finally:
+                histogram.observe((time.perf_counter() - started) * 1000)
+
+            if not failed:
+                self.target.breaker.record_success()
+                response.raise_for_status()
+                return response
+            self.target.breaker.record_failure()
+            if response is not None and not self.target.should_retry(attempt, self.max_retries):
+                response.raise_for_status()
+            attempt += 1
+            logger.warning(f"[ServiceClient] {self.target.name} {method} {path} failed, retry {attempt}")
+            time.sleep(_backoff(attempt))
+
+
+class AsyncServiceClient:
+    """httpx-based async counterpart of ServiceClient for consumers and other async code."""
+
+    def __init__(self, target, base_url, token=None, timeout=5, max_retries=2):
+        if httpx is None:
+            raise ImportError("httpx is required for AsyncServiceClient")
+        self.target = target
+        self.max_retries = max_retries
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["X-Service-Token"] = token
+        pool_size = getattr(settings, "SERVICE_CLIENT_POOL_SIZE", 20)
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def post(self, path, json=None, **kwargs):
+        return await self.request("POST", path, json=json, **kwargs)
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def request(self, method, path, **kwargs):
+        histogram = self.target.histogram(path)
+        attempt = 0
+        while True:
+            self.target.before_call()
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, path, **kwargs)
+                failed = response.status_code in RETRYABLE_STATUS
+            except httpx.TransportError:
+                response, failed = None, True
+                if not self.target.should_retry(attempt, self.max_retries):
+                    self.target.breaker.record_failure()
+                    raise
+            except BaseException:
+                # Anything else (bad URL, encoding error, cancellation) must still end a
+                # half-open trial, or the breaker would reject every later call.
+                self.target.breaker.record_failure()
+                raise
+            finally:
+                histogram.observe((time.perf_counter() - started) * 1000)
+
+            if not failed:
+                self.target.breaker.record_success()
+                response.raise_for_status()
+                return response
+            self.target.breaker.record_failure()
+            if response is not None and not self.target.should_retry(attempt, self.max_retries):
+                response.raise_for_status()
+            attempt += 1
+            logger.warning(f"[ServiceClient] {self.target.name} {method} {path} failed, retry {attempt}")
+            await asyncio.sleep(_backoff(attempt))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_targets = {}
+_clients = {}
+_registry_lock = threading.Lock()
+
+
+def _target(name):
+    with _registry_lock:
+        if name not in _targets:
+            _targets[name] = _Target(name)
+        return _targets[name]
+
+
+def get_client(name, base_url, token=None, **kwargs):
+    """Process-wide pooled client for a downstream service."""
+    with _registry_lock:
+        client = _clients.get(name)
+    if client is None:
+        client = ServiceClient(_target(name), base_url, token=token, **kwargs)
+        with _registry_lock:
+            client = _clients.setdefault(name, client)
+    return client
+
+
+def get_async_client(name, base_url, token=None, **kwargs):
+    """Async client sharing the breaker, retry budget and histograms of `name`. Close it when done."""
+    return AsyncServiceClient(_target(name), base_url, token=token, **kwargs)
+
+
+def get_metrics():
+    """Breaker state, retry budget and latency histograms per target."""
+    with _registry_lock:
+        targets = dict(_targets)
+    return {name: target.metrics() for name, target in targets.items()}
@@ -0,0 +1,201 @@
+import atexit
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from app.models.tracking import Courier, CourierLocation
+from app.utils import fleet_state, outbox, route_progress, sla_scheduler
+
+logger = logging.getLogger(__name__)
+
+PendingPing = namedtuple(
+    "PendingPing", ["courier_id", "latitude", "longitude", "speed", "accuracy", "timestamp", "attempts"],
+    defaults=[0],
+)
+
+
+class LocationIngestBuffer:
+    """
+    Collects courier pings per worker and writes them in batches.
+
+    A flush happens when `max_rows` pings are pending or every `flush_interval_ms`,
+    whichever comes first. Each flush costs one courier lookup, one bulk INSERT into
+    CourierLocation, one into the analytics outbox and one `last_reported` UPDATE,
+    regardless of the batch size.
+
+    A batch the database rejects is bisected so only the offending rows are dropped. When
+    the write fails otherwise (connection lost, database down), the batch goes back to the
+    front of the queue and flushes back off exponentially; a ping is dropped after
+    `max_retries` attempts or when the queue exceeds `max_pending`. Drops are counted in
+    get_metrics().
+    """
+
+    def __init__(self, flush_interval_ms=None, max_rows=None):
+        self.flush_interval_ms = flush_interval_ms or getattr(
+            settings, "LOCATION_INGEST_FLUSH_INTERVAL_MS", 250
+        )
+        self.max_rows = max_rows or getattr(settings, "LOCATION_INGEST_MAX_ROWS", 500)
+        self.max_retries = getattr(settings, "LOCATION_INGEST_MAX_RETRIES", 8)
+        self.max_pending = getattr(settings, "LOCATION_INGEST_MAX_PENDING", 50000)
+        self.max_backoff = getattr(settings, "LOCATION_INGEST_MAX_BACKOFF_SECONDS", 30)
+        self._pending = []
+        self._failures = 0
+        self._retry_at = 0.0
+        self._stats = {"written": 0, "requeued": 0, "dropped": 0}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flusher = None
+
+    def add(self, courier_id, latitude, longitude, speed=None, accuracy=None, timestamp=None):
+        """Queue a ping; flushes inline once the batch is full."""
+        ping = PendingPing(
+            courier_id=str(courier_id),
+            latitude=float(latitude),
+            longitude=float(longitude),
+            speed=float(speed) if speed is not None else None,
+            accuracy=float(accuracy) if accuracy is not None else None,
+            timestamp=timestamp or timezone.now(),
+        )
+        with self._lock:
+            self._pending.append(ping)
+            full = len(self._pending) >= self.max_rows
+        self._ensure_flusher()
+        if full:
+            self.flush()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write all pending pings. Returns the number of rows inserted."""
+        with self._lock:
+            if time.monotonic() < self._retry_at:
+                return 0
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        with self._write_lock:
+            failures = self._failures
+            written = self._write_isolating(batch)
+        with self._lock:
+            if self._failures == failures:
+                self._failures = 0
+            self._stats["written"] += written
+        return written
+
+    def _write_isolating(self, batch):
+        """
+        Write `batch`, bisecting on rows the database rejects; those are dropped one by one.
+        Any other failure re-queues only the part not written yet.
+        """
+        try:
+            return self._write(batch)
+        except (DataError, IntegrityError) as e:
+            if len(batch) == 1:
+                self._drop(batch, f"rejected by the database: {e}")
+                return 0
+            middle = len(batch) // 2
+            return self._write_isolating(batch[:middle]) + self._write_isolating(batch[middle:])
+        except Exception as e:
+            self._requeue(batch, e)
+            return 0
+
+    def _requeue(self, batch, error):
+        retry = [ping._replace(attempts=ping.attempts + 1) for ping in batch if ping.attempts < self.max_retries]
+        expired = len(batch) - len(retry)
+        with self._lock:
+            self._pending = retry + self._pending
+            overflow = max(len(self._pending) - self.max_pending, 0)
+            self._pending = self._pending[overflow:]
+            self._failures += 1
+            delay = min(self.flush_interval_ms / 1000.0 * 2 ** self._failures, self.max_backoff)
+            self._retry_at = time.monotonic() + delay
+            self._stats["requeued"] += len(retry)
+            self._stats["dropped"] += expired + overflow
+        logger.error(
+            f"[LocationIngestBuffer] Flush of {len(batch)} pings failed ({error}); "
+            f"re-queued {len(retry)}, dropped {expired + overflow}, next attempt in {delay:.1f}s"
+        )
+
+    def _drop(self, pings, reason):
+        with self._lock:
+            self._stats["dropped"] += len(pings)
+        logger.error(f"[LocationIngestBuffer] Dropped {len(pings)} pings: {reason}")
+
+    def get_metrics(self):
+        """Pending queue depth and written / re-queued / dropped counters of this worker."""
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending), consecutive_failures=self._failures)
+
+    def _write(self, batch):
+        courier_ids = {ping.courier_id for ping in batch}
+        tenants = {
+            str(pk): tenant_id
+            for pk, tenant_id in Courier.objects.filter(id__in=courier_ids).values_list("id", "tenant_id")
+        }
+        known_ids = set(tenants)
+        locations = [
+            CourierLocation(
+                courier_id=ping.courier_id,
+                location=Point(ping.longitude, ping.latitude),
+                speed=ping.speed,
+                accuracy=ping.accuracy,
+                timestamp=ping.timestamp,
+            )
+            for ping in batch
+            if ping.courier_id in known_ids
+        ]
+        if not locations:
+            return 0
+
+        # Analytics events go into the outbox in the same transaction as the rows
+        # (bulk_create bypasses the post_save receiver that does this for single saves).
+        with transaction.atomic():
+            created = CourierLocation.objects.bulk_create(locations, batch_size=self.max_rows)
+            Courier.objects.filter(id__in=known_ids).update(last_reported=timezone.now())
+            outbox.enqueue_many(
+                [outbox.location_event(location, tenants[location.courier_id]) for location in created]
+            )
+
+        self._after_flush(tenants, [ping for ping in batch if ping.courier_id in known_ids])
+        return len(created)
+
+    def _after_flush(self, tenants, pings):
+        """Flag couriers for the SLA/deviation sweep, advance route progress and live state."""
+        try:
+            sla_scheduler.mark_dirty(tenants.keys())
+            routes = route_progress.active_routes(tenants)
+            route_progress.accumulate(pings, routes)
+            fleet_state.update(pings, tenants, {str(courier_id): route_id for route_id, courier_id, _ in routes})
+        except Exception as e:
+            logger.error(f"[LocationIngestBuffer] Post-flush update failed: {e}")
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._run, name="location-ingest-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval_ms / 1000.0)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+location_buffer = LocationIngestBuffer()
+atexit.register(location_buffer.flush)
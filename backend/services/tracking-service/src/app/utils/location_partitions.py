@@ -0,0 +1,218 @@
+import logging
+import re
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.models.tracking import Courier, CourierLocation, CourierLocationRollup
+
+logger = logging.getLogger(__name__)
+
+TABLE = CourierLocation._meta.db_table
+ROLLUP_TABLE = CourierLocationRollup._meta.db_table
+_BOUND_RE = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \('([^']+)'\)")
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def _partition_name(day):
+    return f"{TABLE}_p{day:%Y%m%d}"
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def partitions():
+    """[(name, lower_bound or None, upper_bound)] of the CourierLocation partitions, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+
+    result = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound)
+        if not match:
+            continue
+        lower = None if match.group(1) == "MINVALUE" else datetime.fromisoformat(match.group(1).strip("'"))
+        upper = datetime.fromisoformat(match.group(2))
+        result.append((name, lower, upper))
+    return sorted(result, key=lambda p: p[2])
+
+
+def convert_to_partitioned():
+    """
+    One-time conversion of CourierLocation into a table range-partitioned by day on
+    `timestamp`. Existing rows are kept as a single legacy partition ending at the day
+    after the newest row (or at the retention horizon for an empty table); daily
+    partitions start there. Its primary key is widened to (id, timestamp) to match the
+    parent's, as ATTACH requires.
+    """
+    if is_partitioned():
+        return False
+
+    legacy = f"{TABLE}_legacy"
+    courier_table = Courier._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0), MAX("timestamp") FROM "{TABLE}"')
+        max_id, max_ts = cursor.fetchone()
+        if max_ts is not None:
+            boundary = _day_start(max_ts.astimezone(dt_timezone.utc).date() + timedelta(days=1))
+        else:
+            today = timezone.now().astimezone(dt_timezone.utc).date()
+            boundary = _day_start(today - timedelta(days=settings.LOCATION_RAW_RETENTION_DAYS))
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+        cursor.execute(f'ALTER TABLE "{legacy}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [f'"{legacy}"']
+        )
+        for (primary_key,) in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE "{legacy}" DROP CONSTRAINT "{primary_key}"')
+        cursor.execute(f'ALTER TABLE "{legacy}" ADD PRIMARY KEY (id, "timestamp")')
+        cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+        cursor.execute(f'CREATE SEQUENCE "{TABLE}_id_seq" START WITH {max_id + 1} OWNED BY "{TABLE}".id')
+        cursor.execute(f"""ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval('"{TABLE}_id_seq"')""")
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, "timestamp")')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD FOREIGN KEY (courier_id) REFERENCES "{courier_table}" (id) '
+            "DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{legacy}" FOR VALUES FROM (MINVALUE) TO (%s)',
+            [boundary],
+        )
+    ensure_partitions()
+    logger.info(f"[LocationPartitions] Converted {TABLE}; legacy partition ends at {boundary.isoformat()}")
+    return True
+
+
+def ensure_partitions(days_ahead=None):
+    """Create daily partitions from the newest existing bound through today + days_ahead."""
+    days_ahead = settings.LOCATION_PARTITION_DAYS_AHEAD if days_ahead is None else days_ahead
+    existing = partitions()
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    day = existing[-1][2].astimezone(dt_timezone.utc).date() if existing else today
+    created = []
+    with connection.cursor() as cursor:
+        while day <= today + timedelta(days=days_ahead):
+            name = _partition_name(day)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)',
+                [_day_start(day), _day_start(day + timedelta(days=1))],
+            )
+            # Hot partitions get a btree for per-courier lookups; it is swapped for BRIN once cold.
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS "{name}_courier_ts" ON "{name}" (courier_id, "timestamp")')
+            created.append(name)
+            day += timedelta(days=1)
+    return created
+
+
+def _btree_indexes(cursor, table):
+    """Non-unique btree indexes of a table, whatever their name (the legacy partition keeps Django's)."""
+    cursor.execute(
+        """
+        SELECT indexname FROM pg_indexes
+        WHERE tablename = %s AND indexdef LIKE '%% USING btree %%' AND indexdef NOT LIKE 'CREATE UNIQUE %%'
+        """,
+        [table],
+    )
+    return [name for (name,) in cursor.fetchall()]
+
+
+def brin_cold_partitions(after_days=None):
+    """Replace the btree indexes of partitions older than `after_days` with a BRIN index on timestamp."""
+    after_days = settings.LOCATION_BRIN_AFTER_DAYS if after_days is None else after_days
+    cutoff = _day_start(timezone.now().astimezone(dt_timezone.utc).date() - timedelta(days=after_days))
+    converted = []
+    with connection.cursor() as cursor:
+        for name, _, upper in partitions():
+            if upper > cutoff:
+                continue
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS "{name}_ts_brin" ON "{name}" USING brin ("timestamp")')
+            for index in _btree_indexes(cursor, name):
+                cursor.execute(f'DROP INDEX IF EXISTS "{index}"')
+            converted.append(name)
+    return converted
+
+
+def rollup_range(start, end, bucket_seconds=None):
+    """Downsample raw points in [start, end) to one point per courier per bucket."""
+    bucket_seconds = bucket_seconds or settings.LOCATION_ROLLUP_BUCKET_SECONDS
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO "{ROLLUP_TABLE}" (courier_id, bucket_start, location, avg_speed, point_count)
+            SELECT courier_id,
+                   to_timestamp(floor(extract(epoch FROM "timestamp") / %s) * %s) AS bucket,
+                   (array_agg(location ORDER BY "timestamp" DESC))[1],
+                   avg(speed),
+                   count(*)
+            FROM "{TABLE}"
+            WHERE "timestamp" >= %s AND "timestamp" < %s
+            GROUP BY courier_id, bucket
+            ON CONFLICT (courier_id, bucket_start) DO NOTHING
+            """,
+            [bucket_seconds, bucket_seconds, start, end],
+        )
+        return cursor.rowcount
+
+
+def rollup_day(day):
+    return rollup_range(_day_start(day), _day_start(day + timedelta(days=1)))
+
+
+def _has_rollup(start, end):
+    return CourierLocationRollup.objects.filter(
+        bucket_start__gte=start or datetime.min.replace(tzinfo=dt_timezone.utc), bucket_start__lt=end
+    ).exists()
+
+
+def drop_expired_partitions(retention_days=None):
+    """Drop raw partitions older than the retention window, rolling them up first if needed."""
+    retention_days = settings.LOCATION_RAW_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = _day_start(timezone.now().astimezone(dt_timezone.utc).date() - timedelta(days=retention_days))
+    dropped = []
+    for name, lower, upper in partitions():
+        if upper > cutoff:
+            continue
+        if not _has_rollup(lower, upper):
+            rollup_range(lower or datetime.min.replace(tzinfo=dt_timezone.utc), upper)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+        dropped.append(name)
+    return dropped
+
+
+def maintain():
+    """Daily maintenance: create upcoming partitions, roll up, BRIN cold data, drop expired."""
+    if not is_partitioned():
+        logger.warning(f"[LocationPartitions] {TABLE} is not partitioned; run manage_location_partitions --convert")
+        return {}
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    result = {
+        "created": ensure_partitions(),
+        "rolled_up": rollup_day(today - timedelta(days=settings.LOCATION_ROLLUP_AFTER_DAYS)),
+        "brin": brin_cold_partitions(),
+        "dropped": drop_expired_partitions(),
+    }
+    logger.info(f"[LocationPartitions] Maintenance: {result}")
+    return result
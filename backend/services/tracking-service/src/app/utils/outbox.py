@@ -0,0 +1,241 @@
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+import redis
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from app.models.tracking import OutboxDeadLetter, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+r = redis.StrictRedis.from_url(settings.CELERY_BROKER_URL)
+
+METRICS_KEY = "tracking:outbox:metrics"
+# Stable per-row event ids let analytics drop the duplicates an at-least-once relay can send.
+EVENT_ID_NAMESPACE = uuid.UUID("6f1c2b1e-4a0d-4f43-9a53-3e7d8a9c0b21")
+
+_backlog = {"pending": 0, "checked_at": 0.0}
+
+
+def event_id(outbox_id):
+    return str(uuid.uuid5(EVENT_ID_NAMESPACE, f"tracking:{outbox_id}"))
+
+
+def _pending_estimate():
+    """Backlog size last recorded by the relay, re-read from Redis at most every few seconds."""
+    now = time.monotonic()
+    if now - _backlog["checked_at"] > settings.OUTBOX_BACKLOG_CHECK_SECONDS:
+        _backlog["checked_at"] = now
+        try:
+            _backlog["pending"] = int(float(r.hget(METRICS_KEY, "pending") or 0))
+        except redis.RedisError:
+            pass
+    return _backlog["pending"]
+
+
+def _admit(events):
+    """
+    Backpressure: once the backlog exceeds OUTBOX_MAX_PENDING, sheddable event types
+    (high-volume telemetry) are dropped and counted; everything else is always kept.
+    """
+    if _pending_estimate() <= settings.OUTBOX_MAX_PENDING:
+        return events
+    kept = [e for e in events if e.event_type not in settings.OUTBOX_SHEDDABLE_EVENT_TYPES]
+    if len(kept) < len(events):
+        try:
+            r.hincrby(METRICS_KEY, "shed", len(events) - len(kept))
+        except redis.RedisError:
+            pass
+    return kept
+
+
+def location_event(location, tenant_id):
+    """Unsaved outbox row for a CourierLocation; shared by the signal and the batched ingest path."""
+    return OutboxEvent(
+        event_type="courier_location",
+        tenant_id=tenant_id,
+        payload={
+            "courier_id": str(location.courier_id),
+            "lat": location.location.y,
+            "lon": location.location.x,
+            "timestamp": str(location.timestamp),
+        },
+    )
+
+
+def sla_event(event, courier_id, tenant_id):
+    """Unsaved outbox row for an SLAEvent; shared by the signal and the bulk SLA sweeps."""
+    return OutboxEvent(
+        event_type="sla_event",
+        tenant_id=tenant_id,
+        payload={
+            "route_id": str(event.route_id),
+            "courier_id": str(courier_id) if courier_id else None,
+            "type": event.event_type,
+            "notes": event.notes,
+            "timestamp": str(event.event_time),
+        },
+    )
+
+
+def enqueue(event_type, payload, tenant_id=None):
+    """Record one event; call inside the transaction that produced it."""
+    return enqueue_many([OutboxEvent(event_type=event_type, payload=payload, tenant_id=tenant_id)])
+
+
+def enqueue_many(events):
+    """Bulk-record unsaved OutboxEvent instances; call inside the producing transaction."""
+    events = _admit(events)
+    if events:
+        OutboxEvent.objects.bulk_create(events)
+    return len(events)
+
+
+def _incr(field, amount=1):
+    """Bump a relay counter; metrics must never fail (or roll back) the relay itself."""
+    try:
+        r.hincrby(METRICS_KEY, field, amount)
+    except redis.RedisError as e:
+        logger.warning(f"[Outbox] Could not record {field}: {e}")
+
+
+def _is_rejection(error):
+    """A 4xx answer (other than timeout / rate limit) means the events themselves are bad."""
+    response = getattr(error, "response", None)
+    return response is not None and 400 <= response.status_code < 500 and response.status_code not in (408, 429)
+
+
+def _ship(client, events):
+    """
+    Send `events`; returns (shipped, rejected) where rejected is [(event, error)]. Analytics
+    reports the index of each event it skipped; a batch refused outright without that
+    detail is bisected so only the offending events are singled out. Transient failures raise.
+    """
+    try:
+        rejected = client.send_events(
+            [
+                {
+                    "id": event_id(event.id),
+                    "event_type": event.event_type,
+                    "service_source": "tracking-service",
+                    "tenant_id": str(event.tenant_id) if event.tenant_id else None,
+                    "payload": event.payload,
+                    "created_at": event.created_at.isoformat(),
+                }
+                for event in events
+            ]
+        )
+    except requests.RequestException as e:
+        if not _is_rejection(e):
+            raise
+        if len(events) == 1:
+            return [], [(events[0], e)]
+    else:
+        bad = {index for index, _ in rejected}
+        shipped = [event for index, event in enumerate(events) if index not in bad]
+        return shipped, [(events[index], reason) for index, reason in rejected]
+    middle = len(events) // 2
+    shipped, rejected = _ship(client, events[:middle])
+    more_shipped, more_rejected = _ship(client, events[middle:])
+    return shipped + more_shipped, rejected + more_rejected
+
+
+def _dead_letter(failed, now):
+    """Move [(event, error)] out of the outbox into OutboxDeadLetter."""
+    OutboxDeadLetter.objects.bulk_create(
+        [
+            OutboxDeadLetter(
+                outbox_id=event.id,
+                event_type=event.event_type,
+                tenant_id=event.tenant_id,
+                payload=event.payload,
+                created_at=event.created_at,
+                attempts=event.attempts,
+                error=str(error),
+                failed_at=now,
+            )
+            for event, error in failed
+        ]
+    )
+    OutboxEvent.objects.filter(id__in=[event.id for event, _ in failed]).delete()
+    logger.error(f"[Outbox] Dead-lettered {len(failed)} events: {failed[0][1]}")
+
+
+def relay_batch(client, batch_size=None):
+    """
+    Ship the oldest available events in one request and delete them on success.
+    Rows stay locked (SKIP LOCKED) while in flight, so several relays can run side by side.
+    Failed batches are retried with exponential backoff, so delivery is at-least-once and
+    each event carries a stable id for de-duplication downstream. Events analytics rejects
+    are dead-lettered at once; the rest of their batch still ships. Events still failing after OUTBOX_MAX_ATTEMPTS are dead-lettered.
+    """
+    batch_size = batch_size or settings.OUTBOX_RELAY_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(available_at__lte=now)
+            .order_by("id")[:batch_size]
+        )
+        if not batch:
+            return 0
+        try:
+            shipped, rejected = _ship(client, batch)
+        except requests.RequestException as e:
+            for event in batch:
+                event.attempts += 1
+            attempts = max(event.attempts for event in batch)
+            delay = min(settings.OUTBOX_MAX_BACKOFF_SECONDS, 2**attempts)
+            exhausted = [(event, e) for event in batch if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS]
+            OutboxEvent.objects.filter(id__in=[event.id for event in batch]).update(
+                attempts=F("attempts") + 1, available_at=now + timedelta(seconds=delay)
+            )
+            if exhausted:
+                _dead_letter(exhausted, now)
+            logger.error(f"[Outbox] Batch of {len(batch)} failed (attempt {attempts}), retry in {delay}s: {e}")
+            _incr("failed_batches")
+            if exhausted:
+                _incr("dead_lettered", len(exhausted))
+            return 0
+        OutboxEvent.objects.filter(id__in=[event.id for event in shipped]).delete()
+        if rejected:
+            _dead_letter(rejected, now)
+    _incr("shipped", len(shipped))
+    if rejected:
+        _incr("dead_lettered", len(rejected))
+    return len(batch)
+
+
+def relay(client, max_batches=None):
+    """Drain the outbox until it is empty, a batch fails, or max_batches is reached."""
+    max_batches = max_batches or settings.OUTBOX_RELAY_MAX_BATCHES
+    shipped = 0
+    for _ in range(max_batches):
+        sent = relay_batch(client)
+        shipped += sent
+        if sent < settings.OUTBOX_RELAY_BATCH_SIZE:
+            break
+    record_backlog()
+    return shipped
+
+
+def record_backlog():
+    """Store backlog size and lag (age of the oldest unshipped event) for metrics and backpressure."""
+    stats = OutboxEvent.objects.aggregate(oldest=Min("created_at"), pending=Count("id"))
+    pending = stats["pending"]
+    lag = (timezone.now() - stats["oldest"]).total_seconds() if stats["oldest"] else 0
+    r.hset(
+        METRICS_KEY,
+        mapping={"pending": pending, "lag_seconds": round(lag, 3), "last_relay_at": time.time()},
+    )
+    return pending, lag
+
+
+def get_metrics():
+    return {k.decode(): float(v) for k, v in r.hgetall(METRICS_KEY).items()}
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import msgpack
+
+# Compact courier upload frame, negotiated with the "tracking.msgpack.v1" WebSocket
+# subprotocol (or ?protocol=msgpack). One binary frame is a MessagePack array of points:
+#   [lat_e7, lon_e7, ts_ms, speed_cms, accuracy_cm]
+# Coordinates are fixed-point 1e-7 degrees. ts_ms is absolute unix milliseconds on the
+# first point and a delta from the previous point after that. speed (cm/s) and accuracy (cm)
+# may be nil. Phones flush traces buffered while offline as one multi-point frame.
+SUBPROTOCOL = "tracking.msgpack.v1"
+COORD_SCALE = 10_000_000
+MAX_POINTS_PER_FRAME = 1000
+
+
+def encode_frame(points):
+    """Pack (lat, lon, unix_ts, speed, accuracy) tuples into one binary frame."""
+    rows = []
+    prev_ts = 0
+    for lat, lon, ts, speed, accuracy in points:
+        ts_ms = round(ts * 1000)
+        rows.append(
+            [
+                round(lat * COORD_SCALE),
+                round(lon * COORD_SCALE),
+                ts_ms - prev_ts,
+                round(speed * 100) if speed is not None else None,
+                round(accuracy * 100) if accuracy is not None else None,
+            ]
+        )
+        prev_ts = ts_ms
+    return msgpack.packb(rows)
+
+
+def decode_frame(data, now=None, max_age_s=None, max_skew_s=None):
+    """
+    Unpack a binary frame into (lat, lon, timestamp, speed, accuracy) tuples with an
+    aware datetime timestamp. Raises ValueError on malformed frames.
+
+    With `now`, client clocks are bounded: points older than `max_age_s` or more than
+    `max_skew_s` ahead are dropped, and points slightly ahead are clamped to `now`, so a
+    bad clock can neither land outside the existing partitions nor pin route progress
+    and live state to the future.
+    """
+    try:
+        rows = msgpack.unpackb(data, use_list=False)
+    except Exception as e:
+        raise ValueError(f"Invalid msgpack frame: {e}")
+    if not isinstance(rows, tuple) or not rows or len(rows) > MAX_POINTS_PER_FRAME:
+        raise ValueError(f"Frame must be a non-empty array of at most {MAX_POINTS_PER_FRAME} points")
+
+    points = []
+    ts_ms = 0
+    for row in rows:
+        if not isinstance(row, tuple) or len(row) != 5:
+            raise ValueError("Each point must be [lat_e7, lon_e7, ts_ms, speed_cms, accuracy_cm]")
+        lat_i, lon_i, ts_delta, speed, accuracy = row
+        try:
+            lat, lon = lat_i / COORD_SCALE, lon_i / COORD_SCALE
+            ts_ms += ts_delta
+            points.append(
+                (
+                    lat,
+                    lon,
+                    datetime.fromtimestamp(ts_ms / 1000, tz=dt_timezone.utc),
+                    speed / 100 if speed is not None else None,
+                    accuracy / 100 if accuracy is not None else None,
+                )
+            )
+        except (TypeError, OverflowError, OSError):
+            raise ValueError(f"Malformed point {row!r}")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"Coordinates out of range: {lat}, {lon}")
+    if now is None:
+        return points
+
+    oldest = now - timedelta(seconds=max_age_s) if max_age_s is not None else None
+    newest = now + timedelta(seconds=max_skew_s or 0)
+    bounded = []
+    for lat, lon, timestamp, speed, accuracy in points:
+        if timestamp > newest or (oldest is not None and timestamp < oldest):
+            continue
+        bounded.append((lat, lon, min(timestamp, now), speed, accuracy))
+    return bounded
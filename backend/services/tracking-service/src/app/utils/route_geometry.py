@@ -0,0 +1,179 @@
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+r = redis.StrictRedis.from_url(settings.CELERY_BROKER_URL)
+
+VERSION_KEY = "tracking:route_geometry:version:{}"
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def simplify_indices(points, tolerance):
+    """Indices kept by Douglas-Peucker simplification of planar points ((x, y, ...) tuples)."""
+    if len(points) < 3:
+        return list(range(len(points)))
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first][0], points[first][1]
+        x2, y2 = points[last][0], points[last][1]
+        max_dist, index = 0.0, None
+        for i in range(first + 1, last):
+            dist = _segment_distance(points[i][0], points[i][1], x1, y1, x2, y2)
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [i for i, kept in enumerate(keep) if kept]
+
+
+def simplify(points, tolerance):
+    """Douglas-Peucker simplification of planar (x, y) points."""
+    return [points[i] for i in simplify_indices(points, tolerance)]
+
+
+def _segment_distance(px, py, x1, y1, x2, y2):
+    dx, dy = x2 - x1, y2 - y1
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - x1, py - y1)
+    t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length_sq))
+    return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+
+class RouteGeometry:
+    """
+    Planned route projected onto a local metric plane, simplified and indexed by a
+    uniform grid of segment bounding boxes. Point-to-route distance only inspects
+    segments in the cells around the query point.
+    """
+
+    def __init__(self, coords, tolerance_m=None, cell_size_m=None):
+        # coords: sequence of (lon, lat)
+        tolerance_m = settings.ROUTE_SIMPLIFY_TOLERANCE_M if tolerance_m is None else tolerance_m
+        self.cell_size = cell_size_m or settings.ROUTE_DEVIATION_THRESHOLD_M
+        self.lon0 = coords[0][0]
+        self.lat0 = sum(lat for _, lat in coords) / len(coords)
+        self._ky = math.radians(1) * EARTH_RADIUS_M
+        self._kx = self._ky * math.cos(math.radians(self.lat0))
+
+        points = simplify([self.project(lon, lat) for lon, lat in coords], tolerance_m)
+        if len(points) == 1:
+            points = points * 2
+        self.segments = [(*points[i], *points[i + 1]) for i in range(len(points) - 1)]
+
+        self.grid = defaultdict(list)
+        for index, (x1, y1, x2, y2) in enumerate(self.segments):
+            for cx in range(self._cell(min(x1, x2)), self._cell(max(x1, x2)) + 1):
+                for cy in range(self._cell(min(y1, y2)), self._cell(max(y1, y2)) + 1):
+                    self.grid[(cx, cy)].append(index)
+
+    @classmethod
+    def from_route(cls, route):
+        """Build from OrderRoute.planned_route, falling back to the straight start-end line."""
+        if route.planned_route is not None and len(route.planned_route.coords) >= 2:
+            return cls(route.planned_route.coords)
+        return cls([route.start_point.coords, route.end_point.coords])
+
+    def project(self, lon, lat):
+        return ((lon - self.lon0) * self._kx, (lat - self.lat0) * self._ky)
+
+    def _cell(self, value):
+        return int(math.floor(value / self.cell_size))
+
+    def distance(self, lon, lat):
+        """
+        Distance in meters from (lon, lat) to the planned route. Exact up to one grid cell
+        (the deviation threshold by default); beyond that it may overestimate.
+        """
+        px, py = self.project(lon, lat)
+        cx, cy = self._cell(px), self._cell(py)
+        candidates = set()
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                candidates.update(self.grid.get((cx + dx, cy + dy), ()))
+        if not candidates:
+            # Farther than one cell from every segment: fall back to an exact scan.
+            candidates = range(len(self.segments))
+        return min(_segment_distance(px, py, *self.segments[i]) for i in candidates)
+
+
+class RouteGeometryCache:
+    """
+    Per-process LRU cache of RouteGeometry keyed by route id, with a TTL.
+
+    invalidate() writes a fresh version token for the route to Redis; every lookup compares
+    the tokens of the requested routes (one MGET) with the ones their entries were loaded
+    under, so an edit reaches the Celery workers' caches on their next sweep, not after the
+    TTL. The token keys expire with the TTL, by which time every entry loaded before the
+    edit has expired too. If Redis is unreachable, entries fall back to TTL-only expiry.
+    """
+
+    def __init__(self, max_entries=None, ttl_seconds=None):
+        self.max_entries = max_entries or getattr(settings, "ROUTE_GEOMETRY_CACHE_SIZE", 50000)
+        self.ttl = ttl_seconds or getattr(settings, "ROUTE_GEOMETRY_CACHE_TTL_SECONDS", 900)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _versions(self, route_ids):
+        try:
+            tokens = r.mget([VERSION_KEY.format(route_id) for route_id in route_ids]) if route_ids else []
+        except redis.RedisError as e:
+            logger.warning(f"[RouteGeometryCache] Version check failed, relying on TTL: {e}")
+            return None
+        return dict(zip(route_ids, tokens))
+
+    def get_many(self, route_ids):
+        """Return {route_id: RouteGeometry}, loading cache misses and invalidated routes with one query."""
+        from app.models.tracking import OrderRoute
+
+        route_ids = list(route_ids)
+        versions = self._versions(route_ids)
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for route_id in route_ids:
+                entry = self._entries.get(route_id)
+                if entry and entry[1] > now and (versions is None or entry[2] == versions[route_id]):
+                    self._entries.move_to_end(route_id)
+                    found[route_id] = entry[0]
+                else:
+                    missing.append(route_id)
+
+        if missing:
+            routes = OrderRoute.objects.filter(id__in=missing).only(
+                "id", "planned_route", "start_point", "end_point"
+            )
+            loaded = {route.id: RouteGeometry.from_route(route) for route in routes}
+            with self._lock:
+                for route_id, geometry in loaded.items():
+                    version = versions.get(route_id) if versions is not None else None
+                    self._entries[route_id] = (geometry, now + self.ttl, version)
+                    self._entries.move_to_end(route_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            found.update(loaded)
+        return found
+
+    def invalidate(self, route_id):
+        """Drop the route here and publish a new version so every other process reloads it."""
+        with self._lock:
+            self._entries.pop(route_id, None)
+        r.set(VERSION_KEY.format(route_id), uuid.uuid4().hex, ex=int(self.ttl))
+
+
+route_geometry_cache = RouteGeometryCache()
@@ -0,0 +1,156 @@
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+from django.contrib.gis.geos import Point
+
+from app.models.tracking import OrderRoute
+from app.utils import geodesy
+
+r = redis.StrictRedis.from_url(settings.CELERY_BROKER_URL)
+
+STATE_KEY = "tracking:route_progress:{}"
+DIRTY_KEY = "tracking:route_progress:dirty"
+ACTIVE_ROUTE_STATUS = "in_transit"
+WATCH_RETRIES = 5
+
+
+def _state_key(route_id):
+    return STATE_KEY.format(route_id)
+
+
+def _decode(state):
+    return {key.decode(): float(value) for key, value in state.items()}
+
+
+def active_routes(courier_ids):
+    """(route_id, courier_id, distance_covered) of the active routes of the given couriers."""
+    return list(
+        OrderRoute.objects.filter(courier_id__in=list(courier_ids), status=ACTIVE_ROUTE_STATUS).values_list(
+            "id", "courier_id", "distance_covered"
+        )
+    )
+
+
+def accumulate(pings, routes=None):
+    """
+    Add the distance of newly flushed pings to each courier's active route.
+
+    The last accepted point and running distance per route live in Redis, so every
+    ping costs one segment computation instead of re-reading the location history.
+    Pings are dropped as jitter when their reported accuracy is too poor, when the
+    courier reports standing still, when the move is within the accuracy radius, or
+    when the implied speed is impossible. The read-compute-write runs under WATCH, so
+    concurrent workers never overwrite each other's progress. Returns the number of
+    routes updated.
+    """
+    by_courier = defaultdict(list)
+    for ping in pings:
+        by_courier[str(ping.courier_id)].append(ping)
+    if not by_courier:
+        return 0
+
+    if routes is None:
+        routes = active_routes(by_courier)
+    if not routes:
+        return 0
+
+    keys = [_state_key(route_id) for route_id, _, _ in routes]
+    # Optimistic concurrency: another worker may advance the same route concurrently (REST
+    # pings land on any worker). Any write to a watched key after WATCH aborts EXEC, and the
+    # batch is recomputed from the fresh state.
+    with r.pipeline() as txn:
+        for _ in range(WATCH_RETRIES):
+            try:
+                txn.watch(*keys)
+                reader = r.pipeline(transaction=False)
+                for key in keys:
+                    reader.hgetall(key)
+                states = [_decode(state) for state in reader.execute()]
+
+                txn.multi()
+                updated = 0
+                for (route_id, courier_id, db_distance), key, state in zip(routes, keys, states):
+                    advanced = _advance(state, db_distance, by_courier[str(courier_id)])
+                    if advanced is None:
+                        continue
+                    anchor, distance = advanced
+                    txn.hset(key, mapping={"lat": anchor[0], "lon": anchor[1], "ts": anchor[2], "distance": distance})
+                    txn.expire(key, settings.ROUTE_PROGRESS_STATE_TTL_SECONDS)
+                    txn.sadd(DIRTY_KEY, str(route_id))
+                    updated += 1
+                txn.execute()
+                return updated
+            except redis.WatchError:
+                continue
+    raise redis.WatchError(f"Route progress of {len(keys)} routes kept changing; gave up after {WATCH_RETRIES} tries")
+
+
+def _advance(state, db_distance, pings):
+    """New (anchor, distance) of one route after `pings`, or None when no ping was accepted."""
+    anchor = (state["lat"], state["lon"], state["ts"]) if state else None
+    distance = state.get("distance", db_distance or 0.0)
+    accepted = 0
+
+    for ping in sorted(pings, key=lambda p: p.timestamp):
+        ts = ping.timestamp.timestamp()
+        if ping.accuracy is not None and ping.accuracy > settings.ROUTE_PROGRESS_MAX_ACCURACY_M:
+            continue
+        if anchor is None:
+            anchor = (ping.latitude, ping.longitude, ts)
+            accepted += 1
+            continue
+        if ts <= anchor[2]:
+            continue
+        if ping.speed is not None and ping.speed < settings.ROUTE_PROGRESS_STATIONARY_SPEED_MS:
+            continue
+
+        step_km = float(geodesy.haversine(anchor[0], anchor[1], ping.latitude, ping.longitude))
+        min_move_m = max(settings.ROUTE_PROGRESS_MIN_MOVE_M, ping.accuracy or 0.0)
+        if step_km * 1000 < min_move_m:
+            continue
+        if step_km / ((ts - anchor[2]) / 3600) > settings.ROUTE_PROGRESS_MAX_SPEED_KMH:
+            continue
+
+        distance += step_km
+        anchor = (ping.latitude, ping.longitude, ts)
+        accepted += 1
+
+    return (anchor, distance) if accepted else None
+
+
+def persist_dirty(batch_size=None):
+    """
+    Write accumulated distance and latest position of changed routes with one bulk UPDATE.
+    Routes popped but not written (e.g. on a database error) are re-queued. Returns the
+    number of routes popped, so a batch-sized result means more may be waiting.
+    """
+    batch_size = batch_size or settings.ROUTE_PROGRESS_PERSIST_BATCH_SIZE
+    route_ids = [route_id.decode() for route_id in r.spop(DIRTY_KEY, batch_size) or []]
+    if not route_ids:
+        return 0
+
+    pipe = r.pipeline()
+    for route_id in route_ids:
+        pipe.hgetall(_state_key(route_id))
+    routes = [
+        OrderRoute(
+            id=route_id,
+            distance_covered=state["distance"],
+            current_point=Point(state["lon"], state["lat"]),
+        )
+        for route_id, state in zip(route_ids, (_decode(s) for s in pipe.execute()))
+        if state
+    ]
+    try:
+        OrderRoute.objects.bulk_update(routes, ["distance_covered", "current_point"])
+    except Exception:
+        r.sadd(DIRTY_KEY, *route_ids)
+        raise
+    return len(route_ids)
+
+
+def get_progress(route_id):
+    """Live distance covered (km) and last accepted position, without touching the DB."""
+    state = _decode(r.hgetall(_state_key(route_id)))
+    return state or None
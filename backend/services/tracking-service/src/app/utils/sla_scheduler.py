@@ -0,0 +1,68 @@
+import time
+import redis
+from django.conf import settings
+
+r = redis.StrictRedis.from_url(settings.CELERY_BROKER_URL)
+
+DIRTY_KEY = "tracking:sla:dirty"
+METRICS_KEY = "tracking:sla:metrics"
+
+# Pop up to ARGV[2] couriers that have been dirty since at least ARGV[1].
+_claim_due = r.register_script(
+    """
+    local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+    for i = 1, #due, 2 do
+        redis.call('ZREM', KEYS[1], due[i])
+    end
+    return due
+    """
+)
+
+
+def mark_dirty(courier_ids):
+    """Flag couriers for the next SLA/deviation sweep; keeps the first-dirty time."""
+    courier_ids = [str(cid) for cid in courier_ids]
+    if not courier_ids:
+        return
+    now = time.time()
+    r.zadd(DIRTY_KEY, {cid: now for cid in courier_ids}, nx=True)
+
+
+def claim_due(debounce_seconds=None, limit=None):
+    """
+    Atomically remove and return couriers whose debounce window has elapsed.
+    Returns a list of (courier_id, dirty_since) tuples.
+    """
+    debounce_seconds = settings.SLA_EVAL_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+    limit = limit or settings.SLA_SWEEP_BATCH_SIZE
+    cutoff = time.time() - debounce_seconds
+    raw = _claim_due(keys=[DIRTY_KEY], args=[cutoff, limit])
+    return [(raw[i].decode(), float(raw[i + 1])) for i in range(0, len(raw), 2)]
+
+
+def queue_depth():
+    return r.zcard(DIRTY_KEY)
+
+
+def record_sweep(claimed, duration):
+    """Store queue depth and evaluation lag of the latest sweep."""
+    now = time.time()
+    lags = [now - dirty_since for _, dirty_since in claimed]
+    r.hset(
+        METRICS_KEY,
+        mapping={
+            "last_sweep_at": now,
+            "last_batch_size": len(claimed),
+            "last_duration_ms": round(duration * 1000, 2),
+            "last_max_lag_seconds": round(max(lags), 3) if lags else 0,
+            "last_avg_lag_seconds": round(sum(lags) / len(lags), 3) if lags else 0,
+        },
+    )
+
+
+def get_metrics():
+    metrics = {k.decode(): float(v) for k, v in r.hgetall(METRICS_KEY).items()}
+    metrics["queue_depth"] = queue_depth()
+    oldest = r.zrange(DIRTY_KEY, 0, 0, withscores=True)
+    metrics["oldest_pending_seconds"] = round(time.time() - oldest[0][1], 3) if oldest else 0
+    return metrics
@@ -0,0 +1,87 @@
+import math
+
+from app.utils.route_geometry import EARTH_RADIUS_M, simplify_indices
+
+# Blob layout (version 1):
+#   version byte, varint point count, then per point the zigzag-varint deltas of
+#   latitude and longitude in 1e-6 degrees and of the timestamp in milliseconds.
+VERSION = 1
+COORD_SCALE = 1_000_000
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def simplify_track(points, tolerance_m):
+    """Douglas-Peucker on (lat, lon, ts) points, measured in meters on a local plane."""
+    if len(points) < 3 or tolerance_m <= 0:
+        return list(points)
+    lat0 = points[0][0]
+    ky = math.radians(1) * EARTH_RADIUS_M
+    kx = ky * math.cos(math.radians(lat0))
+    planar = [((lon - points[0][1]) * kx, (lat - lat0) * ky) for lat, lon, _ in points]
+    return [points[i] for i in simplify_indices(planar, tolerance_m)]
+
+
+def encode(points, tolerance_m=0.0):
+    """
+    Compress a time-ordered track of (lat, lon, unix_ts) points into bytes.
+    Returns (blob, kept_point_count).
+    """
+    points = simplify_track(points, tolerance_m)
+    out = bytearray([VERSION])
+    _write_varint(out, len(points))
+    prev_lat = prev_lon = prev_ts = 0
+    for lat, lon, ts in points:
+        lat_i = round(lat * COORD_SCALE)
+        lon_i = round(lon * COORD_SCALE)
+        ts_i = round(ts * 1000)
+        _write_varint(out, _zigzag(lat_i - prev_lat))
+        _write_varint(out, _zigzag(lon_i - prev_lon))
+        _write_varint(out, _zigzag(ts_i - prev_ts))
+        prev_lat, prev_lon, prev_ts = lat_i, lon_i, ts_i
+    return bytes(out), len(points)
+
+
+def iter_points(blob):
+    """Stream (lat, lon, unix_ts) points back out of an encoded track."""
+    data = memoryview(blob)
+    if data[0] != VERSION:
+        raise ValueError(f"Unsupported track encoding version {data[0]}")
+    count, pos = _read_varint(data, 1)
+    lat = lon = ts = 0
+    for _ in range(count):
+        value, pos = _read_varint(data, pos)
+        lat += _unzigzag(value)
+        value, pos = _read_varint(data, pos)
+        lon += _unzigzag(value)
+        value, pos = _read_varint(data, pos)
+        ts += _unzigzag(value)
+        yield lat / COORD_SCALE, lon / COORD_SCALE, ts / 1000
+
+
+def decode(blob):
+    return list(iter_points(blob))
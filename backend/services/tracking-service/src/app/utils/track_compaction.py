@@ -0,0 +1,94 @@
+import logging
+
+from django.conf import settings
+
+from app.models.tracking import CompressedTrack, CourierLocation, OrderRoute
+from app.utils import track_codec
+
+logger = logging.getLogger(__name__)
+
+
+def compact_route(route, tolerance_m=None):
+    """Encode the raw trace of a delivered route into a CompressedTrack. Returns it, or None."""
+    tolerance_m = settings.TRACK_COMPACTION_TOLERANCE_M if tolerance_m is None else tolerance_m
+    rows = (
+        CourierLocation.objects.filter(
+            courier_id=route.courier_id,
+            timestamp__gte=route.started_at,
+            timestamp__lte=route.delivered_at,
+        )
+        .order_by("timestamp")
+        .values_list("location", "timestamp")
+        .iterator(chunk_size=5000)
+    )
+    points = [(location.y, location.x, timestamp.timestamp()) for location, timestamp in rows]
+    if not points:
+        return None
+
+    blob, kept = track_codec.encode(points, tolerance_m)
+    return CompressedTrack.objects.create(
+        route=route,
+        courier_id=route.courier_id,
+        started_at=route.started_at,
+        ended_at=route.delivered_at,
+        original_point_count=len(points),
+        point_count=kept,
+        tolerance_m=tolerance_m,
+        encoding_version=track_codec.VERSION,
+        data=blob,
+    )
+
+
+def mark_uncompactable(route, error):
+    """Store an empty marker track so the route leaves the compaction queue."""
+    return CompressedTrack.objects.create(
+        route=route,
+        courier_id=route.courier_id,
+        started_at=route.started_at,
+        ended_at=route.delivered_at,
+        original_point_count=0,
+        point_count=0,
+        encoding_version=track_codec.VERSION,
+        data=b"",
+        error=error,
+    )
+
+
+def compact_completed_routes(limit=None):
+    """
+    Compact delivered routes that do not have a compressed track yet. Routes without raw
+    points (e.g. partitions already dropped) or whose encoding fails get a marker row
+    instead, so they never hold the oldest slots of the batch.
+    """
+    limit = limit or settings.TRACK_COMPACTION_BATCH_SIZE
+    routes = OrderRoute.objects.filter(
+        status="delivered",
+        delivered_at__isnull=False,
+        courier__isnull=False,
+        compressed_track__isnull=True,
+    ).order_by("delivered_at")[:limit]
+
+    compacted = raw_points = stored_bytes = 0
+    for route in routes:
+        try:
+            track = compact_route(route)
+            if track is None:
+                mark_uncompactable(route, "No raw points in the route's time window")
+                continue
+        except Exception as e:
+            logger.error(f"[TrackCompaction] Route {route.id} failed: {e}")
+            try:
+                mark_uncompactable(route, str(e))
+            except Exception as marker_error:
+                logger.error(f"[TrackCompaction] Could not mark route {route.id}: {marker_error}")
+            continue
+        compacted += 1
+        raw_points += track.original_point_count
+        stored_bytes += len(track.data)
+
+    if compacted:
+        logger.info(
+            f"[TrackCompaction] {compacted} routes, {raw_points} points -> {stored_bytes} bytes "
+            f"({stored_bytes / raw_points:.2f} B/point)"
+        )
+    return compacted
@@ -1,10 +1,17 @@
+import math
+from datetime import timedelta
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.conf import settings
 from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from app.models.tracking import Courier, CourierLocation, OrderRoute, SLAEvent
+from django.utils.dateparse import parse_datetime
+from app.models.tracking import CompressedTrack, Courier, CourierLocation, OrderRoute, SLAEvent
 from app.serializers.tracking_serializers import (
     CourierSerializer,
     CourierLocationSerializer,
@@ -12,7 +19,9 @@ from app.serializers.tracking_serializers import (
     SLAEventSerializer,
 )
 from app.utils.auth import ServiceTokenAuthentication
-from app.tasks.tracking_tasks import check_sla_compliance, detect_route_deviation
+from app.utils import eta_grid, fleet_state, http_client, outbox, sla_scheduler, track_codec
+from app.utils.location_buffer import location_buffer
+from app.utils.route_geometry import route_geometry_cache
 
 
 class IsTenantOrService(permissions.BasePermission):
@@ -24,6 +33,10 @@ class IsTenantOrService(permissions.BasePermission):
         return bool(request.user and request.user.is_authenticated)
 
 
+def is_service_request(request):
+    return isinstance(request.successful_authenticator, ServiceTokenAuthentication)
+
+
 class CourierViewSet(viewsets.ModelViewSet):
     queryset = Courier.objects.all()
     serializer_class = CourierSerializer
@@ -43,16 +56,22 @@ class CourierLocationViewSet(viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
     permission_classes = [IsTenantOrService]
 
+    def create(self, request, *args, **kwargs):
+        """Queue the ping for the next batched write; the row is persisted on flush."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response({"detail": "Location queued"}, status=status.HTTP_202_ACCEPTED)
+
     def perform_create(self, serializer):
-        location_data = serializer.validated_data["location"]
-        courier = serializer.validated_data["courier"]
-        serializer.save()
-        courier.last_reported = timezone.now()
-        courier.save(update_fields=["last_reported"])
-        # Trigger Celery SLA check
-        check_sla_compliance.delay(str(courier.id))
-        detect_route_deviation.delay(str(courier.id))
-        return serializer
+        data = serializer.validated_data
+        location_buffer.add(
+            data["courier"].id,
+            data["location"].y,
+            data["location"].x,
+            speed=data.get("speed"),
+            accuracy=data.get("accuracy"),
+        )
 
 
 class OrderRouteViewSet(viewsets.ModelViewSet):
@@ -61,6 +80,11 @@ class OrderRouteViewSet(viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
     permission_classes = [IsTenantOrService]
 
+    def perform_update(self, serializer):
+        route = serializer.save()
+        # After commit, so no worker can reload the old geometry under the new version.
+        transaction.on_commit(lambda: route_geometry_cache.invalidate(route.id))
+
     @action(detail=True, methods=["post"], url_path="update-location")
     def update_location(self, request, pk=None):
         """Updates current point for a route and triggers SLA validation"""
@@ -70,15 +94,150 @@ class OrderRouteViewSet(viewsets.ModelViewSet):
             lon = float(request.data.get("longitude"))
             route.current_point = Point(lon, lat)
             route.save(update_fields=["current_point"])
-            check_sla_compliance.delay(str(route.courier.id))
-            detect_route_deviation.delay(str(route.courier.id))
+            sla_scheduler.mark_dirty([route.courier_id])
             return Response({"detail": "Location updated"}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=["get"], url_path="track")
+    def track(self, request, pk=None):
+        """Stream the compressed track of a delivered route as NDJSON points"""
+        route = self.get_object()
+        try:
+            track = route.compressed_track
+        except CompressedTrack.DoesNotExist:
+            return Response({"error": "Track not compacted yet"}, status=status.HTTP_404_NOT_FOUND)
+        if not track.point_count:
+            return Response({"error": f"No track recorded: {track.error}"}, status=status.HTTP_404_NOT_FOUND)
+        blob = bytes(track.data)
+        lines = (
+            f'{{"latitude":{lat},"longitude":{lon},"timestamp":{ts}}}\n'
+            for lat, lon, ts in track_codec.iter_points(blob)
+        )
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
 
 class SLAEventViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = SLAEvent.objects.select_related("route").all()
     serializer_class = SLAEventSerializer
     authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
     permission_classes = [IsTenantOrService]
+
+
+class SLASweeperMetricsView(APIView):
+    """Queue depth and evaluation lag of the coalesced SLA/deviation sweeper."""
+    authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
+    permission_classes = [IsTenantOrService]
+
+    def get(self, request):
+        return Response(sla_scheduler.get_metrics())
+
+
+class ServiceClientMetricsView(APIView):
+    """Circuit breaker state, retry budget and call latency per downstream service (this worker)."""
+    authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
+    permission_classes = [IsTenantOrService]
+
+    def get(self, request):
+        return Response(http_client.get_metrics())
+
+
+class OutboxMetricsView(APIView):
+    """Analytics outbox backlog, lag, shipped/shed counters and failed relay batches."""
+    authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
+    permission_classes = [IsTenantOrService]
+
+    def get(self, request):
+        return Response(outbox.get_metrics())
+
+
+class IngestMetricsView(APIView):
+    """Location ingest buffer queue depth and written / re-queued / dropped pings (this worker)."""
+    authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
+    permission_classes = [IsTenantOrService]
+
+    def get(self, request):
+        return Response(location_buffer.get_metrics())
+
+
+class FleetNearbyView(APIView):
+    """Nearest couriers to a point from the live fleet state (no CourierLocation scan)."""
+    authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
+    permission_classes = [IsTenantOrService]
+
+    def get(self, request):
+        try:
+            # Only other services may pick the tenant; users are confined to their own.
+            if is_service_request(request):
+                tenant_id = request.query_params["tenant_id"]
+            else:
+                tenant_id = getattr(request.user, "tenant_id", None)
+                if not tenant_id:
+                    return Response({"error": "User has no tenant"}, status=status.HTTP_403_FORBIDDEN)
+            lat = float(request.query_params["latitude"])
+            lon = float(request.query_params["longitude"])
+            limit = int(request.query_params.get("limit", 10))
+            if not 1 <= limit <= settings.FLEET_STATE_MAX_NEARBY_LIMIT:
+                raise ValueError(f"limit must be between 1 and {settings.FLEET_STATE_MAX_NEARBY_LIMIT}")
+            radius_km = request.query_params.get("radius_km")
+            radius_km = float(radius_km) if radius_km else None
+            if radius_km is not None and not (math.isfinite(radius_km) and radius_km > 0):
+                raise ValueError("radius_km must be a positive number")
+        except (KeyError, ValueError) as e:
+            return Response({"error": f"Invalid query: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = fleet_state.nearest(tenant_id, lat, lon, count=limit, radius_km=radius_km)
+        positions = {p["courier_id"]: p for p in fleet_state.get_positions([cid for cid, _ in matches])}
+        return Response(
+            [dict(positions[cid], distance_km=distance) for cid, distance in matches if cid in positions]
+        )
+
+
+class CourierLiveStateView(APIView):
+    """Latest position, speed and active route of one courier from the live fleet state."""
+    authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
+    permission_classes = [IsTenantOrService]
+
+    def get(self, request, courier_id):
+        state = fleet_state.get_position(courier_id)
+        if state is not None and not is_service_request(request):
+            if state["tenant_id"] != str(getattr(request.user, "tenant_id", None)):
+                state = None
+        if state is None:
+            return Response({"error": "Courier not live"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(state)
+
+
+class EtaView(APIView):
+    """Predicted travel time between two points from the learned travel-speed grid."""
+    authentication_classes = [JWTAuthentication, ServiceTokenAuthentication]
+    permission_classes = [IsTenantOrService]
+
+    def get(self, request):
+        try:
+            origin = tuple(float(v) for v in request.query_params["origin"].split(","))
+            destination = tuple(float(v) for v in request.query_params["destination"].split(","))
+            if len(origin) != 2 or len(destination) != 2:
+                raise ValueError("origin and destination must be 'latitude,longitude'")
+            for lat, lon in (origin, destination):
+                if not (math.isfinite(lat) and math.isfinite(lon)):
+                    raise ValueError("coordinates must be finite numbers")
+                if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                    raise ValueError(f"coordinates out of range: {lat}, {lon}")
+            depart = request.query_params.get("depart")
+            depart = parse_datetime(depart) if depart else timezone.now()
+            if depart is None:
+                raise ValueError("depart must be an ISO 8601 datetime")
+            if timezone.is_naive(depart):
+                depart = timezone.make_aware(depart)
+        except (KeyError, ValueError) as e:
+            return Response({"error": f"Invalid query: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        minutes = eta_grid.eta_minutes(origin, destination, depart=depart)
+        return Response(
+            {
+                "eta_minutes": round(minutes, 1),
+                "arrival": (depart + timedelta(minutes=minutes)).isoformat(),
+                "grid_version": eta_grid.current().version,
+            }
+        )
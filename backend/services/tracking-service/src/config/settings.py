@@ -2,6 +2,8 @@ import os
 from pathlib import Path
 from datetime import timedelta
 
+from celery.schedules import crontab
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "super-secure-tracking-key")
@@ -62,6 +64,55 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TIMEZONE = "UTC"
 
+# Coalesced SLA / route-deviation evaluation: couriers are flagged dirty on ingest and
+# evaluated by the periodic sweeper once they have been dirty for the debounce window.
+SLA_EVAL_DEBOUNCE_SECONDS = int(os.getenv("SLA_EVAL_DEBOUNCE_SECONDS", "15"))
+SLA_SWEEP_INTERVAL_SECONDS = int(os.getenv("SLA_SWEEP_INTERVAL_SECONDS", "10"))
+SLA_SWEEP_BATCH_SIZE = int(os.getenv("SLA_SWEEP_BATCH_SIZE", "1000"))
+SLA_FLEET_SWEEP_INTERVAL_SECONDS = int(os.getenv("SLA_FLEET_SWEEP_INTERVAL_SECONDS", "60"))
+SLA_FLEET_SWEEP_CHUNK_SIZE = int(os.getenv("SLA_FLEET_SWEEP_CHUNK_SIZE", "5000"))
+
+# Route corridor deviation: planned routes are simplified and grid-indexed in memory
+ROUTE_DEVIATION_THRESHOLD_M = float(os.getenv("ROUTE_DEVIATION_THRESHOLD_M", "300"))
+ROUTE_SIMPLIFY_TOLERANCE_M = float(os.getenv("ROUTE_SIMPLIFY_TOLERANCE_M", "5"))
+ROUTE_GEOMETRY_CACHE_SIZE = int(os.getenv("ROUTE_GEOMETRY_CACHE_SIZE", "50000"))
+ROUTE_GEOMETRY_CACHE_TTL_SECONDS = int(os.getenv("ROUTE_GEOMETRY_CACHE_TTL_SECONDS", "900"))
+
+CELERY_BEAT_SCHEDULE = {
+    "sweep_dirty_couriers": {
+        "task": "tracking.sweep_dirty_couriers",
+        "schedule": timedelta(seconds=SLA_SWEEP_INTERVAL_SECONDS),
+    },
+    "sweep_fleet_sla": {
+        "task": "tracking.sweep_fleet_sla",
+        "schedule": timedelta(seconds=SLA_FLEET_SWEEP_INTERVAL_SECONDS),
+    },
+    "persist_route_progress": {
+        "task": "tracking.persist_route_progress",
+        "schedule": timedelta(seconds=int(os.getenv("ROUTE_PROGRESS_PERSIST_INTERVAL_SECONDS", "30"))),
+    },
+    "prune_fleet_state": {
+        "task": "tracking.prune_fleet_state",
+        "schedule": timedelta(minutes=5),
+    },
+    "maintain_location_partitions": {
+        "task": "tracking.maintain_location_partitions",
+        "schedule": timedelta(hours=6),
+    },
+    "compact_completed_tracks": {
+        "task": "tracking.compact_completed_tracks",
+        "schedule": timedelta(minutes=10),
+    },
+    "rebuild_eta_grid": {
+        "task": "tracking.rebuild_eta_grid",
+        "schedule": crontab(hour=int(os.getenv("ETA_GRID_BUILD_HOUR", "2")), minute=30),
+    },
+    "relay_analytics_outbox": {
+        "task": "tracking.relay_analytics_outbox",
+        "schedule": timedelta(seconds=float(os.getenv("OUTBOX_RELAY_INTERVAL_SECONDS", "2"))),
+    },
+}
+
 # JWT Authentication
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
@@ -80,6 +131,12 @@ SIMPLE_JWT = {
     "SIGNING_KEY": SECRET_KEY,
 }
 
+# WebSocket handshake auth: validated tokens are cached per process by jti; stateless
+# mode takes tenant_id/role from the token claims and never loads the User.
+WS_AUTH_STATELESS = os.getenv("WS_AUTH_STATELESS", "False") == "True"
+WS_AUTH_CACHE_SIZE = int(os.getenv("WS_AUTH_CACHE_SIZE", "50000"))
+WS_AUTH_CACHE_MAX_TTL_SECONDS = int(os.getenv("WS_AUTH_CACHE_MAX_TTL_SECONDS", "300"))
+
 # Static Files
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
@@ -92,6 +149,7 @@ ORDER_SERVICE_URL = os.getenv("ORDER_SERVICE_URL", "http://lmdsp-order-service:8
 SERVICE_TOKENS = {
     "notification-service": os.getenv("SERVICE_TOKEN_NOTIFICATION", "notif-secure-token"),
     "lmdsp-order-service": os.getenv("SERVICE_TOKEN_LMDSP_ORDER", "order-secure-token"),
+    "analytics-service": os.getenv("SERVICE_TOKEN_ANALYTICS", "analytics-secure-token"),
 }
 
 # Logging (JSON for centralized ELK ingestion)
@@ -128,8 +186,84 @@ CHANNEL_LAYERS = {
 }
 
 
+# Live broadcast modes: minimum seconds between frames per subscriber (?mode=...)
+TRACKING_BROADCAST_MODES = {
+    "map": float(os.getenv("TRACKING_BROADCAST_MAP_INTERVAL", "1.0")),
+    "ops": 0.0,
+}
+TRACKING_BROADCAST_DEFAULT_MODE = os.getenv("TRACKING_BROADCAST_DEFAULT_MODE", "map")
+
+
 ANALYTICS_SERVICE_URL = os.getenv("ANALYTICS_SERVICE_URL", "http://analytics-service:8000")
 
+# Outbound service clients (app.utils.http_client): keep-alive pool per target,
+# circuit breaker and a retry budget as a fraction of calls
+SERVICE_CLIENT_POOL_SIZE = int(os.getenv("SERVICE_CLIENT_POOL_SIZE", "20"))
+SERVICE_CLIENT_BREAKER_THRESHOLD = int(os.getenv("SERVICE_CLIENT_BREAKER_THRESHOLD", "5"))
+SERVICE_CLIENT_BREAKER_RESET_SECONDS = float(os.getenv("SERVICE_CLIENT_BREAKER_RESET_SECONDS", "30"))
+SERVICE_CLIENT_RETRY_RATIO = float(os.getenv("SERVICE_CLIENT_RETRY_RATIO", "0.2"))
+
+
+# Location ingest buffer (per worker): flush every N ms or M rows, whichever comes first
+LOCATION_INGEST_FLUSH_INTERVAL_MS = int(os.getenv("LOCATION_INGEST_FLUSH_INTERVAL_MS", "250"))
+LOCATION_INGEST_MAX_ROWS = int(os.getenv("LOCATION_INGEST_MAX_ROWS", "500"))
+# Failed flushes are re-queued with exponential backoff; pings are dropped (and counted)
+# after N attempts or once the per-worker queue is over its cap.
+LOCATION_INGEST_MAX_RETRIES = int(os.getenv("LOCATION_INGEST_MAX_RETRIES", "8"))
+LOCATION_INGEST_MAX_PENDING = int(os.getenv("LOCATION_INGEST_MAX_PENDING", "50000"))
+LOCATION_INGEST_MAX_BACKOFF_SECONDS = float(os.getenv("LOCATION_INGEST_MAX_BACKOFF_SECONDS", "30"))
+# Client timestamps of binary ping frames: points older than the max age (keep it well
+# inside LOCATION_RAW_RETENTION_DAYS) or further ahead than the skew are dropped.
+PING_MAX_AGE_SECONDS = int(os.getenv("PING_MAX_AGE_SECONDS", "86400"))
+PING_MAX_CLOCK_SKEW_SECONDS = int(os.getenv("PING_MAX_CLOCK_SKEW_SECONDS", "60"))
+
+# Incremental OrderRoute.distance_covered: per-route state in Redis, persisted in batches.
+# Pings are treated as GPS jitter when too inaccurate, stationary, too small or impossibly fast.
+ROUTE_PROGRESS_MAX_ACCURACY_M = float(os.getenv("ROUTE_PROGRESS_MAX_ACCURACY_M", "50"))
+ROUTE_PROGRESS_MIN_MOVE_M = float(os.getenv("ROUTE_PROGRESS_MIN_MOVE_M", "10"))
+ROUTE_PROGRESS_STATIONARY_SPEED_MS = float(os.getenv("ROUTE_PROGRESS_STATIONARY_SPEED_MS", "0.5"))
+ROUTE_PROGRESS_MAX_SPEED_KMH = float(os.getenv("ROUTE_PROGRESS_MAX_SPEED_KMH", "160"))
+ROUTE_PROGRESS_STATE_TTL_SECONDS = int(os.getenv("ROUTE_PROGRESS_STATE_TTL_SECONDS", "86400"))
+ROUTE_PROGRESS_PERSIST_BATCH_SIZE = int(os.getenv("ROUTE_PROGRESS_PERSIST_BATCH_SIZE", "2000"))
+
+# Live fleet state (Redis GEO per tenant), kept in sync from the ingest buffer
+FLEET_STATE_MAX_SEARCH_RADIUS_KM = float(os.getenv("FLEET_STATE_MAX_SEARCH_RADIUS_KM", "50"))
+FLEET_STATE_OFFLINE_SECONDS = int(os.getenv("FLEET_STATE_OFFLINE_SECONDS", "900"))
+FLEET_STATE_MAX_NEARBY_LIMIT = int(os.getenv("FLEET_STATE_MAX_NEARBY_LIMIT", "100"))
+
+# CourierLocation daily partitions, retention and 30s rollups
+LOCATION_PARTITION_DAYS_AHEAD = int(os.getenv("LOCATION_PARTITION_DAYS_AHEAD", "3"))
+LOCATION_BRIN_AFTER_DAYS = int(os.getenv("LOCATION_BRIN_AFTER_DAYS", "2"))
+LOCATION_ROLLUP_AFTER_DAYS = int(os.getenv("LOCATION_ROLLUP_AFTER_DAYS", "7"))
+LOCATION_ROLLUP_BUCKET_SECONDS = int(os.getenv("LOCATION_ROLLUP_BUCKET_SECONDS", "30"))
+LOCATION_RAW_RETENTION_DAYS = int(os.getenv("LOCATION_RAW_RETENTION_DAYS", "30"))
+
+# Compressed tracks for delivered routes (Douglas-Peucker + delta/varint encoding)
+TRACK_COMPACTION_TOLERANCE_M = float(os.getenv("TRACK_COMPACTION_TOLERANCE_M", "3"))
+TRACK_COMPACTION_BATCH_SIZE = int(os.getenv("TRACK_COMPACTION_BATCH_SIZE", "500"))
 
+# Analytics outbox: events are written with the producing transaction and shipped in
+# batches by the relay. Past OUTBOX_MAX_PENDING unshipped rows, sheddable types are dropped.
+OUTBOX_RELAY_BATCH_SIZE = int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", "500"))
+OUTBOX_RELAY_MAX_BATCHES = int(os.getenv("OUTBOX_RELAY_MAX_BATCHES", "50"))
+OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "300"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "50"))
+OUTBOX_MAX_PENDING = int(os.getenv("OUTBOX_MAX_PENDING", "1000000"))
+OUTBOX_SHEDDABLE_EVENT_TYPES = {"courier_location"}
+OUTBOX_BACKLOG_CHECK_SECONDS = float(os.getenv("OUTBOX_BACKLOG_CHECK_SECONDS", "5"))
 
-"analytics-service": os.getenv("SERVICE_TOKEN_ANALYTICS", "analytics-secure-token"),
+# ETA prediction: travel speeds per grid cell and local hour of week, learned nightly from
+# CourierLocation segments and served from a compact per-process snapshot published in Redis.
+ETA_GRID_CELL_DEG = float(os.getenv("ETA_GRID_CELL_DEG", "0.01"))
+ETA_GRID_TIME_ZONE = os.getenv("ETA_GRID_TIME_ZONE", "UTC")
+ETA_GRID_MAX_GAP_SECONDS = int(os.getenv("ETA_GRID_MAX_GAP_SECONDS", "120"))
+ETA_GRID_MIN_SPEED_KMH = float(os.getenv("ETA_GRID_MIN_SPEED_KMH", "2"))
+ETA_GRID_MIN_SAMPLES = int(os.getenv("ETA_GRID_MIN_SAMPLES", "20"))
+ETA_GRID_DECAY_PER_WEEK = float(os.getenv("ETA_GRID_DECAY_PER_WEEK", "0.9"))
+ETA_GRID_BACKFILL_DAYS = int(os.getenv("ETA_GRID_BACKFILL_DAYS", "28"))
+ETA_GRID_MAX_STEPS = int(os.getenv("ETA_GRID_MAX_STEPS", "64"))
+ETA_GRID_REFRESH_SECONDS = float(os.getenv("ETA_GRID_REFRESH_SECONDS", "60"))
+ETA_DEFAULT_SPEED_KMH = float(os.getenv("ETA_DEFAULT_SPEED_KMH", "25"))
+ETA_DETOUR_FACTOR = float(os.getenv("ETA_DETOUR_FACTOR", "1.3"))
+# Active routes whose predicted arrival lands later than deadline - margin get an SLA_AT_RISK event.
+SLA_AT_RISK_MARGIN_MINUTES = float(os.getenv("SLA_AT_RISK_MARGIN_MINUTES", "0"))